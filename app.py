@@ -1,19 +1,43 @@
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import numpy as np
 import pandas as pd
 import math
 import io
-import re
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots 
-import json
-from datetime import datetime
-import asyncio
-import concurrent.futures
-from functools import lru_cache
+import functools
 import gc
-import threading
 import os
+import uuid
+
+from azimuth_core import (
+    PARALLEL_MIN_LEGS,
+    AsyncProcessor,
+    BatchJournal,
+    ComputationCache,
+    LEG_COLUMNS,
+    MemoryManager,
+    POINT_COLUMNS,
+    IncrementalTraverse,
+    PointStore,
+    SpatialIndex,
+    adjust_traverse,
+    calculate_traverse,
+    calculate_traverses,
+    decimate_polyline,
+    estimate_nbytes,
+    fingerprint,
+    metrics,
+    open_project,
+    polygon_geometry,
+    round_coordinates,
+    save_project,
+    snap_window,
+    split_leg_lines,
+    thin_points,
+    traverse_misclosure,
+    validate_legs,
+)
 
 # Optional imports for performance monitoring
 try:
@@ -326,276 +350,331 @@ TRANSLATIONS = {
 }
 # 🚀 PERFORMANCE: Smart Caching & Memory Management
 class PerformanceManager:
-    """Gestión inteligente de caché y memoria"""
+    """Gestión inteligente de caché y memoria.
+
+    Las cachés de cálculos comparten un presupuesto de bytes (MemoryManager):
+    al superarlo se expulsan solo las entradas de menor valor, nunca se vacían
+    las cachés de todos los usuarios ni se fuerza gc.collect() en el camino
+    crítico.
+    """
     
     def __init__(self):
-        self._cache_stats = {}
-        self._memory_threshold = 100 * 1024 * 1024  # 100MB threshold
-        self._cache_lock = threading.Lock()
+        self._memory_pressure = 80  # % de memoria del sistema
     
     def optimize_memory(self):
-        """Optimizar uso de memoria"""
-        if gc.isenabled():
-            gc.collect()
-        
-        # Limpiar cachés grandes si es necesario
-        if self._should_clear_cache():
-            with self._cache_lock:
-                st.cache_data.clear()
-                self._cache_stats.clear()
+        """Optimizar uso de memoria (acción explícita del usuario, no del camino crítico)"""
+        manager = get_memory_manager()
+        # Bajo presión de memoria se recorta a la mitad del presupuesto
+        evicted = manager.trim(0.5) if self._under_pressure() else manager.enforce()
+        # Solo la generación joven: barata y sin pausar a las demás sesiones
+        gc.collect(0)
+        return evicted
     
-    def _should_clear_cache(self):
-        """Determinar si se debe limpiar el caché"""
-        # Implementar lógica basada en uso de memoria
+    def _under_pressure(self):
+        """Determinar si el sistema está bajo presión de memoria"""
         if PSUTIL_AVAILABLE and psutil is not None:
-            memory_info = psutil.virtual_memory()
-            return memory_info.percent > 80  # Limpiar si uso > 80%
-        else:
-            # Fallback simple: limpiar cada 50 operaciones
-            return len(self._cache_stats) > 50
+            return psutil.virtual_memory().percent > self._memory_pressure
+        return False
     
     def get_cache_stats(self):
-        """Obtener estadísticas de caché"""
-        return {
-            'cache_hits': len(self._cache_stats),
-            'memory_usage': self._get_memory_usage()
-        }
+        """Obtener estadísticas de caché: contadores sumados y uso por caché"""
+        manager = get_memory_manager()
+        per_cache = {name: cache.stats() for name, cache in manager.caches.items()}
+        stats = {key: sum(cache[key] for cache in per_cache.values())
+                 for key in ('entries', 'bytes', 'hits', 'misses', 'evictions', 'expirations')}
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['budget'] = manager.budget_bytes
+        stats['caches'] = per_cache
+        stats['memory_usage'] = self._get_memory_usage()
+        return stats
+    
+    @staticmethod
+    def memory_bytes():
+        """Memoria residente del proceso en bytes (0 sin psutil)"""
+        if PSUTIL_AVAILABLE and psutil is not None:
+            return psutil.Process().memory_info().rss
+        return 0
     
     def _get_memory_usage(self):
         """Obtener uso de memoria actual"""
         if PSUTIL_AVAILABLE and psutil is not None:
-            return psutil.Process().memory_info().rss / 1024 / 1024  # MB
+            return self.memory_bytes() / 1024 / 1024  # MB
         else:
-            # Fallback: estimar uso basado en operaciones
-            return len(self._cache_stats) * 0.5  # Estimación simple
+            # Fallback: memoria retenida por las cachés de cálculos
+            return get_memory_manager().nbytes / 1024 / 1024
 
 # Instancia global del gestor de rendimiento
 perf_manager = PerformanceManager()
+if PSUTIL_AVAILABLE:
+    metrics.memory_hook = PerformanceManager.memory_bytes
 
-# 🚀 PERFORMANCE: Async Processing Pool
-class AsyncProcessor:
-    """Procesamiento asíncrono para operaciones pesadas"""
-    
-    def __init__(self, max_workers=None):
-        self.max_workers = max_workers or min(32, (threading.cpu_count() or 1) + 4)
-        self._executor = None
-        self._loop = None
-    
-    def __enter__(self):
-        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
-        self._loop = asyncio.new_event_loop()
-        return self
-    
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        if self._executor:
-            self._executor.shutdown(wait=True)
-        if self._loop:
-            self._loop.close()
-    
-    async def process_batch_async(self, batch_data, ref_x, ref_y, azimuth_convention):
-        """Procesar lote de coordenadas de forma asíncrona"""
-        tasks = []
-        
-        for index, row in batch_data.iterrows():
-            task = self._loop.run_in_executor(
-                self._executor,
-                self._process_single_point,
-                row, ref_x, ref_y, azimuth_convention
-            )
-            tasks.append(task)
-        
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Filtrar resultados válidos
-        valid_results = [r for r in results if not isinstance(r, Exception)]
-        return pd.DataFrame(valid_results)
-    
-    def _process_single_point(self, row, ref_x, ref_y, azimuth_convention):
-        """Procesar punto individual"""
-        try:
-            azimuth = parse_dms_to_decimal(str(row['Azimuth']))
-            if azimuth is None:
-                return None
-                
-            distance = float(row['Distance'])
-            x, y = azimuth_to_coordinates(azimuth, distance, ref_x, ref_y, azimuth_convention)
-            
-            return {
-                'Row': row.name + 1,
-                'X': x,
-                'Y': y
-            }
-        except Exception:
-            return None
+@st.cache_resource(show_spinner=False)
+def get_memory_manager():
+    """Presupuesto de memoria de las cachés, compartido entre ejecuciones y sesiones"""
+    manager = MemoryManager(CACHE_BUDGET_MB * 1024 * 1024)
+    ttl = CACHE_TTL_MIN * 60 or None
+    manager.register('traverse', ComputationCache(max_bytes=manager.budget_bytes, ttl=ttl))
+    manager.register('figures', ComputationCache(max_entries=16, max_bytes=manager.budget_bytes, ttl=ttl))
+    return manager
+
+def get_computation_cache():
+    """Caché de poligonales (por huella de contenido)"""
+    return get_memory_manager().caches['traverse']
 
-# 🚀 PERFORMANCE: LRU Cache para funciones críticas
-@lru_cache(maxsize=128)
-def cached_parse_dms_to_decimal(dms_string):
-    """Versión cacheada de parse_dms_to_decimal"""
-    return parse_dms_to_decimal(dms_string)
+def get_figure_cache():
+    """Caché de figuras del gráfico"""
+    return get_memory_manager().caches['figures']
 
-@lru_cache(maxsize=256)
-def cached_azimuth_to_coordinates(azimuth, distance, ref_x, ref_y, azimuth_convention):
-    """Versión cacheada de azimuth_to_coordinates"""
-    return azimuth_to_coordinates(azimuth, distance, ref_x, ref_y, azimuth_convention)
+@st.cache_resource(show_spinner=False)
+def get_parallel_processor():
+    """Pool de procesos compartido entre ejecuciones y sesiones"""
+    return AsyncProcessor()
 
 def get_text(key, lang='es'):
     """Get translated text for the given key and language"""
     return TRANSLATIONS['es'].get(key, key)
-@st.cache_data(show_spinner=False, ttl=3600)  # Cache por 1 hora
-def calculate_polygon_area(coordinates):
-    """Calculate polygon area using the Shoelace formula - OPTIMIZADO"""
-    if len(coordinates) < 3:
-        return 0.0
-    
-    # Convertir a numpy array para mejor rendimiento
-    coords = np.array(coordinates, dtype=np.float64)
-    n = len(coords)
-    
-    # Usar vectorización de numpy para cálculo más rápido
-    i = np.arange(n)
-    j = (i + 1) % n
-    
-    # Optimización con operaciones vectorizadas
-    area = np.sum(coords[i, 0] * coords[j, 1]) - np.sum(coords[i, 1] * coords[j, 0])
-    
-    # Liberar memoria temporal
-    del coords, i, j
-    
-    return abs(area) / 2.0
+def get_polygon_geometry(name, version, points):
+    """Geometría del polígono memoizada por versión del conjunto de datos.
 
-@st.cache_data(show_spinner=False, ttl=3600)  # Cache por 1 hora
-def batch_calculate_coordinates(batch_data, ref_x, ref_y, azimuth_convention):
-    """Procesar lotes de cálculos con caché - MEJORADO CON PERFORMANCE"""
-    
-    # 🚀 PERFORMANCE: Optimización de memoria
-    perf_manager.optimize_memory()
-    
-    # 🚀 PERFORMANCE: Procesamiento asíncrono para lotes grandes
-    if len(batch_data) > 100:  # Usar async para lotes grandes
-        try:
-            with AsyncProcessor() as processor:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                results_df = loop.run_until_complete(
-                    processor.process_batch_async(batch_data, ref_x, ref_y, azimuth_convention)
-                )
-                loop.close()
-                return results_df
-        except Exception:
-            # Fallback a procesamiento síncrono
-            pass
-    
-    # 🚀 PERFORMANCE: Procesamiento vectorizado para lotes pequeños/medianos
-    results = []
-    current_ref_x, current_ref_y = ref_x, ref_y
-    
-    # Pre-allocar memoria para mejor rendimiento
-    results = [None] * len(batch_data)
-    valid_count = 0
-    
-    for index, row in batch_data.iterrows():
-        try:
-            # Usar versión cacheada para mejor rendimiento
-            azimuth = cached_parse_dms_to_decimal(str(row['Azimuth']))
-            if azimuth is None:
-                continue
-                
-            distance = float(row['Distance'])
-            
-            # Usar versión cacheada de cálculo de coordenadas
-            x, y = cached_azimuth_to_coordinates(
-                azimuth, distance, current_ref_x, current_ref_y, azimuth_convention
-            )
-            
-            results[valid_count] = {
-                'Row': index + 1,
-                'X': x,
-                'Y': y
-            }
-            valid_count += 1
-            
-            current_ref_x, current_ref_y = x, y
-            
-        except Exception:
-            continue
-    
-    # Crear DataFrame solo con resultados válidos
-    final_results = results[:valid_count]
-    
-    # Liberar memoria temporal
-    del results
-    perf_manager.optimize_memory()
-    
-    return pd.DataFrame(final_results)
-def azimuth_to_coordinates(azimuth, distance, ref_x=0.0, ref_y=0.0, azimuth_convention="north"):
-    """Convert azimuth and distance to X,Y coordinates using Excel formulas - MEJORADO"""
-    
-    # Validación de entrada mejorada
-    if not isinstance(azimuth, (int, float)) or not isinstance(distance, (int, float)):
-        raise ValueError("Azimuth y distancia deben ser números")
-    
-    if distance < 0:
-        raise ValueError("La distancia no puede ser negativa")
-    
-    # Normalizar azimuth al rango 0-360 grados
-    azimuth = azimuth % 360
-    
-    # Manejo de casos especiales para distancias muy pequeñas
-    if distance < 1e-10:
-        return round(ref_x, 6), round(ref_y, 6)
-    
-    azimuth_rad = math.radians(azimuth)
-    
-    # Cálculo con precisión mejorada
-    x_offset = math.sin(azimuth_rad) * distance
-    y_offset = distance * math.cos(azimuth_rad)
-    
-    x = ref_x + x_offset
-    y = ref_y + y_offset
-    
-    # Redondeo adaptativo basado en la magnitud
-    if abs(x) > 1000 or abs(y) > 1000:
-        precision = 3
-    else:
-        precision = 6
-    
-    return round(x, precision), round(y, precision)
-def parse_dms_to_decimal(dms_string):
-    """Convert degrees-minutes-seconds format to decimal degrees"""
+    `points` es una función que devuelve los arrays (x, y); solo se llama cuando
+    la versión cambió, así que en cada recarga no se copian ni se hashean las
+    coordenadas.
+    """
+    memo = st.session_state.setdefault('geometry_memo', {})
+    cached = memo.get(name)
+    if cached is None or cached[0] != version:
+        with metrics.stage('geometry'):
+            cached = memo[name] = (version, polygon_geometry(*points()))
+    return cached[1]
+
+def get_single_points_geometry():
+    """Geometría de los puntos ingresados (se recalcula solo si el almacén cambió)"""
+    store = st.session_state.single_points
+    return get_polygon_geometry('single_points', store.version, lambda: (store['X'], store['Y']))
+
+def get_azimuth_geometry(results_df, ref_x, ref_y):
+    """Geometría del polígono de azimuts (referencia + vértices), memoizada por versión de resultados"""
+    return get_polygon_geometry(
+        'azimuth', (st.session_state.get('results_version', 0), ref_x, ref_y),
+        lambda: (np.concatenate(([ref_x], results_df['X_Coordinate'].to_numpy())),
+                 np.concatenate(([ref_y], results_df['Y_Coordinate'].to_numpy())))
+    )
+
+def get_azimuth_misclosure(results_df, ref_x, ref_y, precision):
+    """Error de cierre (X, Y) de la poligonal con los vértices sin redondear (como
+    adjust_traverse), memoizado por versión de resultados"""
+    key = (st.session_state.get('results_version', 0), ref_x, ref_y, precision)
+    memo = st.session_state.get('misclosure_memo')
+    if memo is None or memo[0] != key:
+        with metrics.stage('geometry'):
+            misclosure = traverse_misclosure(results_df, ref_x, ref_y, precision=precision)
+        memo = st.session_state.misclosure_memo = (key, misclosure)
+    return memo[1]
+
+def get_point_index():
+    """Índice espacial de los puntos ingresados.
+
+    Si desde la última consulta solo se agregaron puntos (cada cambio de versión
+    sumó una fila) se insertan solo los nuevos; cualquier otro cambio lo reconstruye.
+    """
+    store = st.session_state.single_points
+    memo = st.session_state.get('point_index')
+    if memo is None or memo[0] is not store or store.version - memo[1] != len(store) - len(memo[2]):
+        with metrics.stage('spatial_index', rows=len(store)):
+            memo = st.session_state.point_index = [store, store.version, SpatialIndex(store['X'], store['Y'])]
+    elif store.version != memo[1]:
+        count = len(memo[2])
+        memo[2].extend(store['X'][count:], store['Y'][count:])
+        memo[1] = store.version
+    return memo[2]
+
+def get_vertex_index(results_df):
+    """Índice espacial de los vértices calculados (uno por versión de resultados)"""
+    version = st.session_state.get('results_version', 0)
+    memo = st.session_state.get('vertex_index')
+    if memo is None or memo[0] != version:
+        with metrics.stage('spatial_index', rows=len(results_df)):
+            index = (SpatialIndex(results_df['X_Coordinate'].to_numpy(), results_df['Y_Coordinate'].to_numpy())
+                     if not results_df.empty else SpatialIndex())
+        memo = st.session_state.vertex_index = (version, index)
+    return memo[1]
+
+def timed_fragment(name):
+    """`st.fragment` que registra cada ejecución de la sección como etapa `fragment_<name>`.
+
+    Las recargas de un fragmento no pasan por la etapa `rerun` de la página completa.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            with metrics.stage(f'fragment_{name}'):
+                return func(*args, **kwargs)
+        return st.fragment(run)
+    return decorator
+
+def rerun_fragment():
+    """Recargar solo el fragmento actual (o la página, si se está ejecutando completa)"""
     try:
-        dms_string = str(dms_string).strip()
-        dms_string = dms_string.replace(',', '.')
-       
-        patterns = [
-            r'(\d+(?:\.\d+)?)[°d]\s*(\d+(?:\.\d+)?)[\'m]\s*(\d+(?:\.\d+)?)[\"\'s]?',
-            r'^(\d+(?:\.\d+)?)\s+(\d+(?:\.\d+)?)\s+(\d+(?:\.\d+)?)$',
-            r'^(\d+(?:\.\d+)?)-(\d+(?:\.\d+)?)-(\d+(?:\.\d+)?)$',
-            r'^(\d+(?:\.\d+)?):(\d+(?:\.\d+)?):(\d+(?:\.\d+)?)$',
-            r'^(\d+(?:\.\d+)?)_(\d+(?:\.\d+)?)_(\d+(?:\.\d+)?)$'
-        ]
-       
-        for pattern in patterns:
-            match = re.search(pattern, dms_string)
-            if match and len(match.groups()) == 3:
-                degrees = float(match.group(1))
-                minutes = float(match.group(2))
-                seconds = float(match.group(3))
-                decimal_degrees = (((seconds / 60.0) + minutes) / 60.0) + degrees
-                return decimal_degrees
-       
-        return float(dms_string.replace(',', '.'))
-    except (ValueError, AttributeError):
-        return None
-def validate_azimuth(azimuth):
-    """Validate azimuth value is within 0-360 degrees"""
-    return 0 <= azimuth <= 360
-@st.cache_data(show_spinner=False, ttl=1800)  # Cache por 30 minutos
-def create_multi_point_plot(single_points, results_df, ref_x, ref_y, x_coord, y_coord, lang='es', bg_color='Blanco'):
-    """Create interactive plot for multiple points and polygon - OPTIMIZADO"""
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+def get_results_tables(key, build):
+    """Tabla de resultados y descargas CSV/TXT memoizadas por versión de resultados y ajuste.
+
+    `build` devuelve (tabla, csv, txt); solo se llama cuando cambian los resultados,
+    el punto de referencia o el método de ajuste.
+    """
+    memo = st.session_state.get('results_tables')
+    if memo is None or memo[0] != key:
+        memo = st.session_state.results_tables = (key, build())
+    return memo[1]
+
+def render_spatial_search(x, y):
+    """Punto ingresado y vértice más cercanos a (x, y) y puntos dentro de un radio"""
+    results_df = st.session_state.get('results_df', pd.DataFrame())
+    if st.session_state.single_points.empty and results_df.empty:
+        return
+    with st.expander("🔎 Búsqueda Espacial", expanded=False):
+        radius = st.number_input("Radio de búsqueda (m)", min_value=0.0, value=1.0, step=0.1,
+                                 format="%.3f", key="search_radius")
+        col_points, col_vertices = st.columns(2)
+        for column, label, prefix, index in (
+                (col_points, "Punto ingresado más cercano", "P", get_point_index()),
+                (col_vertices, "Vértice más cercano", "A", get_vertex_index(results_df))):
+            with column:
+                found = index.nearest(x, y)
+                if found is None:
+                    continue
+                st.metric(label, f"{prefix}{found[0] + 1}", f"{found[1]:.3f} m", delta_color="off")
+                inside = index.within_radius(x, y, radius)
+                st.caption(f"{len(inside)} dentro de {radius:.3f} m" +
+                           (": " + ", ".join(f"{prefix}{k + 1}" for k in inside[:20].tolist()) if len(inside) else ""))
+
+def set_results(results_df, precision='standard'):
+    """Guardar los resultados de la poligonal (y su modo de precisión) y avanzar su versión"""
+    st.session_state['results_df'] = results_df
+    st.session_state.results_precision = precision
+    st.session_state.results_version = st.session_state.get('results_version', 0) + 1
+    # Versión de batch_data de la que salen estos resultados (ver current_batch_results)
+    st.session_state.results_batch_version = st.session_state.batch_data.version
+
+def current_batch_results():
+    """Resultados si corresponden a los tramos actuales; vacío si batch_data cambió
+    después de calcularlos (p. ej. tras limpiar o agregar tramos sin convertir)"""
+    if st.session_state.get('results_batch_version') != st.session_state.batch_data.version:
+        return pd.DataFrame()
+    return st.session_state.get('results_df', pd.DataFrame())
+
+def data_versions():
+    """Versiones de los puntos ingresados y de los resultados de esta sesión.
+
+    Clave O(1) para las cachés compartidas en lugar de hashear las coordenadas en
+    cada recarga; lleva el identificador de la sesión porque los contadores son
+    de cada sesión.
+    """
+    return (st.session_state.session_token, st.session_state.single_points.version,
+            st.session_state.get('results_version', 0))
+
+def cached_traverse(batch_data, ref_x, ref_y, azimuth_convention, processor=None, precision='standard'):
+    """calculate_traverse con caché por huella de contenido: devuelve (results_df, errors).
+
+    `batch_data` puede ser un PointStore (huella memoizada por versión) o un DataFrame.
+    """
+    key = ('traverse', fingerprint(batch_data), ref_x, ref_y, azimuth_convention, precision)
+
+    def compute():
+        frame = batch_data.to_frame() if isinstance(batch_data, PointStore) else batch_data
+        return calculate_traverse(frame, ref_x, ref_y, azimuth_convention, processor, precision)
+
+    return get_computation_cache().get_or_compute(key, compute)
+
+def batch_calculate_coordinates(batch_data, ref_x, ref_y, azimuth_convention, parallel=False, precision='standard'):
+    """Procesar lotes de cálculos con caché - motor vectorizado"""
+    processor = get_parallel_processor() if parallel else None
+    results_df, _ = cached_traverse(batch_data, ref_x, ref_y, azimuth_convention, processor, precision)
+    return results_df
+
+def _array_nbytes(values):
+    """Bytes de un array de una traza: lista/array o dict {'dtype', 'bdata'} (base64) de Figure.to_dict()"""
+    if isinstance(values, dict):
+        return len(values.get('bdata', ''))
+    return estimate_nbytes(np.asarray(values))
+
+def _figure_nbytes(plot):
+    """Bytes aproximados de una figura base (dict): los arrays de sus trazas"""
+    fig, _ = plot
+    return sum(
+        _array_nbytes(values)
+        for trace in fig['data']
+        for values in (trace.get('x'), trace.get('y'))
+        if values is not None
+    )
+
+def create_multi_point_plot(single_points, results_df, ref_x, ref_y, x_coord, y_coord, lang='es', bg_color='Blanco',
+                            webgl_threshold=None, max_points=None, window=None, versions=None):
+    """Figura del gráfico combinado: base cacheada + capa con el punto de vista previa.
+
+    La base (referencia, puntos, polígonos, flechas y layout) se cachea sin
+    depender de x_coord/y_coord; cambiar el punto de vista previa solo agrega su
+    trazo a la base ya construida. La clave usa `versions` (ver data_versions) o,
+    si no se indican, la huella de las coordenadas que dibuja. Con nivel de
+    detalle (ver build_base_plot) hay una base por ventana, es decir, por nivel
+    de zoom y tesela (ver snap_window).
+    """
+    if versions is None:
+        versions = (
+            fingerprint(single_points['X'], single_points['Y']) if not single_points.empty else None,
+            fingerprint(results_df['X_Coordinate'], results_df['Y_Coordinate']) if not results_df.empty else None,
+        )
+    key = ('plot', versions, ref_x, ref_y, lang, bg_color, webgl_threshold, max_points, window)
+    base, config = get_figure_cache().get_or_compute(
+        key,
+        lambda: build_base_plot(single_points, results_df, ref_x, ref_y, lang, bg_color, webgl_threshold,
+                                max_points, window),
+        nbytes=_figure_nbytes
+    )
+    return overlay_preview_point(base, x_coord, y_coord, bg_color), config
+
+def overlay_preview_point(base, x_coord, y_coord, bg_color='Blanco'):
+    """Figura nueva = base (dict ya validado) + trazo del punto actual, sin copiar ni validar la base"""
+    data = base['data']
+    if x_coord != 0 or y_coord != 0:
+        preview_color = 'green' if bg_color == 'Blanco' else 'lightgreen'
+        data = data + [{
+            'type': 'scatter',
+            'x': [x_coord],
+            'y': [y_coord],
+            'mode': 'markers',
+            'name': 'Punto Actual (Vista Previa)',
+            'marker': {'color': preview_color, 'size': 14, 'symbol': 'x'},
+            'hovertemplate': '<b>Punto Actual</b><br>X: %{x:.3f}<br>Y: %{y:.3f}<extra></extra>'
+        }]
+    return go.Figure({'data': data, 'layout': base['layout']}, _validate=False)
+
+def build_base_plot(single_points, results_df, ref_x, ref_y, lang='es', bg_color='Blanco', webgl_threshold=None,
+                    max_points=None, window=None):
+    """Create interactive plot for multiple points and polygon - OPTIMIZADO
+
+    Construye la parte estática del gráfico (todo salvo el punto de vista previa)
+    y la devuelve como (dict de la figura, config). Por encima de `webgl_threshold`
+    puntos (WEBGL_POINT_THRESHOLD por defecto) se usa el modo de muchos datos:
+    trazas WebGL (Scattergl) y un único trazo para todos los puntos ingresados.
+
+    Con más de `max_points` puntos se dibuja un nivel de detalle: polilíneas
+    simplificadas y puntos agrupados por celdas, limitados a `window`
+    (x_min, y_min, x_max, y_max) si se da. Áreas y cierre usan siempre todos los datos.
+    """
     
-    # 🚀 PERFORMANCE: Optimización de memoria antes de crear el gráfico
-    perf_manager.optimize_memory()
+    if webgl_threshold is None:
+        webgl_threshold = WEBGL_POINT_THRESHOLD
+    total_points = len(single_points) + len(results_df)
+    large_mode = total_points > webgl_threshold
+    scatter = go.Scattergl if large_mode else go.Scatter
+    lod = bool(max_points) and large_mode and total_points > max_points
+    if not lod:
+        window = None
     
     fig = go.Figure()
    
@@ -620,75 +699,98 @@ def create_multi_point_plot(single_points, results_df, ref_x, ref_y, x_coord, y_
         if bg_color == 'Negro':
             colors = ['lightcoral', 'gold', 'violet', 'sienna', 'lightpink', 'lightgray', 'lightgreen', 'lightcyan']
        
-        # Plot individual points
-        for i, (_, row) in enumerate(single_points.iterrows()):
-            color = colors[i % len(colors)]
-            point_name = f'P{i+1}'
-           
-            fig.add_trace(go.Scatter(
-                x=[row['X']],
-                y=[row['Y']],
-                mode='markers+text',
-                name=point_name,
-                marker=dict(color=color, size=12, symbol='diamond'),
-                text=[point_name],
-                textposition='top center',
-                textfont=dict(size=12, color=color),
-                hovertemplate=f'<b>{point_name} (Ingresado)</b><br>X: %{{x:.3f}}<br>Y: %{{y:.3f}}<extra></extra>'
+        if large_mode:
+            # 🚀 PERFORMANCE: Un solo trazo WebGL con colores y etiquetas por punto
+            point_x = single_points['X'].to_numpy()
+            point_y = single_points['Y'].to_numpy()
+            if lod:
+                # Un representante por celda; `customdata` = puntos que representa
+                shown, counts = thin_points(point_x, point_y, max_points // 2, window)
+            else:
+                shown, counts = np.arange(len(point_x)), None
+            point_colors = np.take(colors, shown % len(colors))
+            point_names = np.char.add('P', (shown + 1).astype(str))
+            fig.add_trace(go.Scattergl(
+                x=point_x[shown],
+                y=point_y[shown],
+                mode='markers',
+                name='Puntos Ingresados',
+                marker=dict(color=point_colors, size=12, symbol='diamond'),
+                text=point_names,
+                customdata=counts,
+                hovertemplate=('<b>%{text} (Ingresado)</b><br>X: %{x:.3f}<br>Y: %{y:.3f}' +
+                               ('<br>%{customdata} punto(s) en la celda' if lod else '') + '<extra></extra>')
             ))
+        else:
+            # Plot individual points
+            for i, (_, row) in enumerate(single_points.iterrows()):
+                color = colors[i % len(colors)]
+                point_name = f'P{i+1}'
+           
+                fig.add_trace(go.Scatter(
+                    x=[row['X']],
+                    y=[row['Y']],
+                    mode='markers+text',
+                    name=point_name,
+                    marker=dict(color=color, size=12, symbol='diamond'),
+                    text=[point_name],
+                    textposition='top center',
+                    textfont=dict(size=12, color=color),
+                    hovertemplate=f'<b>{point_name} (Ingresado)</b><br>X: %{{x:.3f}}<br>Y: %{{y:.3f}}<extra></extra>'
+                ))
        
         # Add polygon connecting single points if there are at least 3 points
         if len(single_points) >= 3:
-            all_x = single_points['X'].tolist()
-            all_y = single_points['Y'].tolist()
+            all_x = single_points['X'].to_numpy()
+            all_y = single_points['Y'].to_numpy()
            
             # Close the polygon by adding the first point at the end
-            all_x.append(all_x[0])
-            all_y.append(all_y[0])
+            all_x = np.append(all_x, all_x[0])
+            all_y = np.append(all_y, all_y[0])
+            line_x, line_y = all_x, all_y
+            if lod:
+                line_x, line_y, _ = decimate_polyline(all_x, all_y, max_points // 2, window)
            
             poly_line_color = 'green' if bg_color == 'Blanco' else 'lightgreen'
-            fig.add_trace(go.Scatter(
-                x=all_x,
-                y=all_y,
+            fig.add_trace(scatter(
+                x=line_x,
+                y=line_y,
                 mode='lines',
                 name='Polígono (Puntos Ingresados)',
                 line=dict(color=poly_line_color, width=3),
-                fill='toself',
+                fill='toself' if window is None else None,
                 fillcolor='rgba(40, 167, 69, 0.2)', # Light green fill
                 hoverinfo='skip'
             ))
            
             # Calculate area for single points polygon
-            coordinates = list(zip(single_points['X'], single_points['Y']))
-            single_points_area = calculate_polygon_area(coordinates)
-   
-    # Current preview point (if entered)
-    if x_coord != 0 or y_coord != 0:
-        preview_color = 'green' if bg_color == 'Blanco' else 'lightgreen'
-        fig.add_trace(go.Scatter(
-            x=[x_coord],
-            y=[y_coord],
-            mode='markers',
-            name='Punto Actual (Vista Previa)',
-            marker=dict(color=preview_color, size=14, symbol='x'),
-            hovertemplate='<b>Punto Actual</b><br>X: %{x:.3f}<br>Y: %{y:.3f}<extra></extra>'
-        ))
+            single_points_area = polygon_geometry(all_x[:-1], all_y[:-1])['area']
    
     # Polygon points (from results_df)
     polygon_area = 0.0 # Initialize area for azimuth-based polygon
     if not results_df.empty:
-        all_x = [ref_x] + results_df['X_Coordinate'].tolist()
-        all_y = [ref_y] + results_df['Y_Coordinate'].tolist()
+        vertex_x = results_df['X_Coordinate'].to_numpy()
+        vertex_y = results_df['Y_Coordinate'].to_numpy()
+        ring_x = np.concatenate(([ref_x], vertex_x, [ref_x]))
+        ring_y = np.concatenate(([ref_y], vertex_y, [ref_y]))
+        # Vértices dibujados (todos, o los del nivel de detalle)
+        line_x, line_y = ring_x, ring_y
+        shown = np.arange(len(vertex_x))
+        if lod:
+            budget = max_points - min(len(single_points), max_points // 2)
+            line_x, line_y, kept = decimate_polyline(ring_x, ring_y, budget, window)
+            kept = kept[(kept >= 1) & (kept <= len(vertex_x))]
+            shown = kept - 1
        
-        # Polygon trace
+        # Polygon trace (closed back to the reference point)
         poly_az_line_color = 'blue' if bg_color == 'Blanco' else 'lightblue'
-        fig.add_trace(go.Scatter(
-            x=all_x + [all_x[0]],
-            y=all_y + [all_y[0]],
+        fig.add_trace(scatter(
+            x=line_x,
+            y=line_y,
             mode='lines',
             name='Polígono (Azimut)',
             line=dict(color=poly_az_line_color, width=3),
-            fill='toself',
+            fill='toself' if window is None else None,
             fillcolor='rgba(31, 119, 180, 0.2)',
             hoverinfo='skip'
         ))
@@ -703,57 +805,39 @@ def create_multi_point_plot(single_points, results_df, ref_x, ref_y, x_coord, y_
             labels = None
             mode = 'markers'
        
-        fig.add_trace(go.Scatter(
-            x=results_df['X_Coordinate'],
-            y=results_df['Y_Coordinate'],
+        fig.add_trace(scatter(
+            x=vertex_x[shown],
+            y=vertex_y[shown],
             mode=mode,
             name='Puntos del Polígono (Azimut)',
             marker=dict(color=marker_color, size=10, symbol='circle'),
             text=labels,
             textposition='top center',
             textfont=dict(size=9, color=text_color),
-            hovertemplate='<b>Punto A%{pointNumber}</b><br>X: %{x:.3f}<br>Y: %{y:.3f}<extra></extra>'
+            customdata=shown + 1 if lod else None,
+            hovertemplate=(('<b>Punto A%{customdata}</b>' if lod else '<b>Punto A%{pointNumber}</b>') +
+                           '<br>X: %{x:.3f}<br>Y: %{y:.3f}<extra></extra>')
         ))
        
-        # Arrows for polygon direction (optimized for mobile)
-        arrow_color = 'rgba(0,100,200,0.5)' if bg_color == 'Blanco' else 'rgba(173,216,230,0.5)'
-        annotation_font_color = 'darkblue' if bg_color == 'Blanco' else 'lightblue'
-        
-        # Only show arrows for small datasets on mobile
-        show_arrows = len(results_df) <= 10  # Limit arrows on mobile
-        
-        if show_arrows:
-            for i, row in results_df.iterrows():
-                if i == 0:
-                    start_x, start_y = ref_x, ref_y
-                else:
-                    start_x = results_df.iloc[i-1]['X_Coordinate']
-                    start_y = results_df.iloc[i-1]['Y_Coordinate']
-               
-                fig.add_annotation(
-                    x=row['X_Coordinate'],
-                    y=row['Y_Coordinate'],
-                    ax=start_x,
-                    ay=start_y,
-                    xref="x",
-                    yref="y",
-                    axref="x",
-                    ayref="y",
-                    showarrow=True,
-                    arrowhead=2,
-                    arrowsize=0.8,  # Smaller arrows for mobile
-                    arrowwidth=1,
-                    arrowcolor=arrow_color,
-                    text="",
-                    font=dict(size=10, color=annotation_font_color),  # Smaller font
-                    bgcolor='rgba(0,0,0,0)',
-                    borderpad=0,
-                    standoff=3  # Reduced standoff for mobile
-                )
+        # 🚀 PERFORMANCE: Flechas de dirección como un solo trazo: un marcador orientado
+        # (ángulo = azimut del tramo, en sentido horario desde el norte) en el punto medio
+        # de cada tramo, calculado de forma vectorizada
+        arrow_color = 'rgba(0,100,200,0.7)' if bg_color == 'Blanco' else 'rgba(173,216,230,0.7)'
+        start_x, start_y = ring_x[shown], ring_y[shown]
+        end_x, end_y = vertex_x[shown], vertex_y[shown]
+        leg_angles = np.degrees(np.arctan2(end_x - start_x, end_y - start_y)) % 360
+        fig.add_trace(scatter(
+            x=(start_x + end_x) / 2,
+            y=(start_y + end_y) / 2,
+            mode='markers',
+            name='Dirección (Azimut)',
+            marker=dict(symbol='arrow', angle=leg_angles, color=arrow_color,
+                        size=8 if large_mode else 12),
+            hoverinfo='skip'
+        ))
        
         # Calculate polygon area
-        coordinates = [(ref_x, ref_y)] + list(zip(results_df['X_Coordinate'], results_df['Y_Coordinate']))
-        polygon_area = calculate_polygon_area(coordinates)
+        polygon_area = polygon_geometry(np.concatenate(([ref_x], vertex_x)), np.concatenate(([ref_y], vertex_y)))['area']
    
     # Update layout
     title_text = (f'| Puntos Ingresados: {len(single_points)} '
@@ -817,6 +901,9 @@ def create_multi_point_plot(single_points, results_df, ref_x, ref_y, x_coord, y_
         tickfont=dict(color=font_color, size=10),  # Smaller ticks
         automargin=True  # Auto margin for labels
     )
+    if window is not None:
+        fig.update_xaxes(range=[window[0], window[2]])
+        fig.update_yaxes(range=[window[1], window[3]])
    
     config = {
         'displayModeBar': True,
@@ -833,111 +920,21 @@ def create_multi_point_plot(single_points, results_df, ref_x, ref_y, x_coord, y_
         },
         # Mobile-specific options
         'modeBarButtonsToAdd': ['drawline', 'drawopenpath', 'eraseshape'],
-        'modeBarButtonsToRemove': ['lasso2d', 'select2d', 'autoScale2d'],
+        # En nivel de detalle la selección de caja elige la ventana a resolución completa
+        'modeBarButtonsToRemove': ['lasso2d', 'autoScale2d'] + ([] if lod else ['select2d']),
         'locale': 'es'  # Spanish locale
     }
    
-    return fig, config
-
-def export_to_dxf(coordinates, filename="coordinates.dxf"):
-    """Exportar coordenadas a formato DXF para AutoCAD"""
-    dxf_content = f"""0
-SECTION
-2
-HEADER
-9
-$ACADVER
-1
-AC1015
-0
-ENDSEC
-0
-SECTION
-2
-ENTITIES
-"""
-    
-    # Agregar puntos
-    for i, (x, y) in enumerate(coordinates):
-        dxf_content += f"""0
-POINT
-8
-0
-10
-{x}
-20
-{y}
-30
-0.0
-"""
-    
-    # Agregar líneas conectando los puntos
-    if len(coordinates) > 1:
-        for i in range(len(coordinates)):
-            x1, y1 = coordinates[i]
-            x2, y2 = coordinates[(i + 1) % len(coordinates)]
-            dxf_content += f"""0
-LINE
-8
-1
-10
-{x1}
-20
-{y1}
-30
-0.0
-11
-{x2}
-21
-{y2}
-31
-0.0
-"""
-    
-    dxf_content += """0
-ENDSEC
-0
-EOF
-"""
-    
-    return dxf_content
-
-def export_to_json(data, metadata=None):
-    """Exportar datos a formato JSON con metadatos"""
-    export_data = {
-        "metadata": metadata or {
-            "created_at": datetime.now().isoformat(),
-            "version": "2.0",
-            "software": "Azimuth Converter"
-        },
-        "data": data.to_dict('records') if hasattr(data, 'to_dict') else data
-    }
-    
-    return json.dumps(export_data, indent=2, ensure_ascii=False)
-
-def export_to_kml(coordinates, name="Survey Points"):
-    """Exportar coordenadas a formato KML para Google Earth"""
-    kml_content = f"""<?xml version="1.0" encoding="UTF-8"?>
-<kml xmlns="http://www.opengis.net/kml/2.2">
-<Document>
-<name>{name}</name>
-"""
-    
-    for i, (x, y) in enumerate(coordinates):
-        kml_content += f"""<Placemark>
-<name>Point {i+1}</name>
-<Point>
-<coordinates>{x},{y},0</coordinates>
-</Point>
-</Placemark>
-"""
-    
-    kml_content += """</Document>
-</kml>"""
-    
-    return kml_content
+    return fig.to_dict(), config
+
 # CONSTANTES Y CONFIGURACIONES
 CLOSURE_TOLERANCE = 0.01
+WEBGL_POINT_THRESHOLD = 500  # Puntos a partir de los cuales el gráfico usa WebGL
+LOD_MAX_POINTS = 20000  # Puntos enviados al navegador como máximo (nivel de detalle)
+CACHE_BUDGET_MB = int(os.environ.get('AZIMUTH_CACHE_BUDGET_MB', 256))  # Presupuesto de las cachés de cálculos
+CACHE_TTL_MIN = int(os.environ.get('AZIMUTH_CACHE_TTL_MIN', 60))  # Vida de sus entradas (0 = sin caducidad)
+METRICS_FILE = os.environ.get('AZIMUTH_METRICS_FILE')  # Archivo .prom que se reescribe tras cada ejecución
+METRICS_URL = os.environ.get('AZIMUTH_METRICS_URL')  # URL http(s) a la que se envían las métricas (p. ej. Pushgateway)
 MAX_AZIMUTH_POINTS = 20
 PLOT_HEIGHT = 1000
 PLOT_WIDTH = 1600
@@ -960,63 +957,309 @@ def _prev_batch_file_path():
         base_dir = os.getcwd()
     return os.path.join(base_dir, 'azimuth_prev_batch.json')
 
-def save_previous_batch_data():
-    """Guarda los datos actuales de batch (Azimuth/Distance) en un archivo JSON.
+@st.cache_resource(show_spinner=False)
+def get_batch_journal():
+    """Diario de cambios + instantánea de los datos de batch (compartido por las sesiones)"""
+    return BatchJournal(_prev_batch_file_path())
 
-    Persiste en disco para que se puedan restaurar incluso después de recargar la página.
+def save_previous_batch_data(op=None, index=None, **values):
+    """Guarda el último cambio de batch (Azimuth/Distance) en el diario de disco.
+
+    `op` es la operación ya aplicada a batch_data ('append', 'extend', 'set_row',
+    'insert', 'delete'); se agrega una línea al diario en vez de reescribir el archivo.
+    Sin `op` se escribe una instantánea completa. Persiste en disco para que se
+    puedan restaurar incluso después de recargar la página.
     """
     try:
         if 'batch_data' not in st.session_state or st.session_state.batch_data is None:
             return
-        records = st.session_state.batch_data.to_dict(orient='records')
-        payload = {
-            'app': 'azimuth_converter',
-            'version': '1.0',
-            'saved_at': datetime.now().isoformat(),
-            'data': records
-        }
-        with open(_prev_batch_file_path(), 'w', encoding='utf-8') as f:
-            json.dump(payload, f, ensure_ascii=False, indent=2)
+        batch = st.session_state.batch_data
+        with metrics.stage('persist'):
+            if op is None:
+                get_batch_journal().snapshot(batch.to_frame(), batch)
+            else:
+                get_batch_journal().record(batch, op, index, **values)
     except Exception as e:
         st.warning(f"No se pudieron guardar datos previos: {e}")
 
 def restore_previous_batch_data():
-    """Intenta restaurar los datos previos desde el archivo JSON.
+    """Intenta restaurar los datos previos: última instantánea + cola del diario.
 
     Devuelve un DataFrame con columnas 'Azimuth' y 'Distance', o None si no existe o falla.
     """
     try:
-        file_path = _prev_batch_file_path()
-        if not os.path.exists(file_path):
-            return None
-        with open(file_path, 'r', encoding='utf-8') as f:
-            payload = json.load(f)
-        data = payload.get('data', [])
-        if not isinstance(data, list) or not data:
-            return None
-        # Validación básica de estructura
-        df = pd.DataFrame(data)
-        expected_cols = {'Azimuth', 'Distance'}
-        if not expected_cols.issubset(set(df.columns)):
-            return None
-        return df[['Azimuth', 'Distance']]
+        return get_batch_journal().load()
     except Exception as e:
         st.warning(f"No se pudieron restaurar datos previos: {e}")
         return None
 
+def get_incremental_traverse(ref_x, ref_y):
+    """Poligonal editable sincronizada con batch_data (se reconstruye si los datos cambiaron)"""
+    batch = st.session_state.batch_data
+    traverse = st.session_state.get('traverse')
+    if traverse is None or st.session_state.get('traverse_version') != batch.version:
+        traverse = IncrementalTraverse.from_frame(batch.to_frame(), ref_x, ref_y)
+        st.session_state.traverse = traverse
+    traverse.ref_x, traverse.ref_y = ref_x, ref_y
+    return traverse
+
+def apply_leg_edit(action, index, raw_azimuth, distance, ref_x, ref_y, precision='standard'):
+    """Corregir, insertar o eliminar un tramo y recalcular solo lo necesario"""
+    batch = st.session_state.batch_data
+    traverse = get_incremental_traverse(ref_x, ref_y)
+    try:
+        if action == 'update':
+            traverse.update(index, raw_azimuth, distance)
+            batch.set_row(index, Azimuth=raw_azimuth, Distance=distance)
+        elif action == 'insert':
+            traverse.insert(index, raw_azimuth, distance)
+            batch.insert(index, Azimuth=raw_azimuth, Distance=distance)
+        else:
+            traverse.delete(index)
+            batch.delete(index)
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        return False
+    except IndexError:
+        st.error(f"❌ La fila {index + 1} no existe")
+        return False
+    st.session_state.traverse_version = batch.version
+    set_results(traverse.results_frame(precision), precision)
+    if action == 'update':
+        save_previous_batch_data('set_row', index, Azimuth=raw_azimuth, Distance=distance)
+    elif action == 'insert':
+        save_previous_batch_data('insert', index, Azimuth=raw_azimuth, Distance=distance)
+    else:
+        save_previous_batch_data('delete', index)
+    return True
+
+def build_project_file(batch, results_df, ref_x, ref_y, azimuth_convention):
+    """Bytes del proyecto .azp, cacheados por la huella de los datos"""
+    precision = st.session_state.get('results_precision', 'standard')
+    results_version = (st.session_state.session_token, st.session_state.get('results_version', 0))
+    key = ('project', batch.fingerprint(), results_version if not results_df.empty else None,
+           ref_x, ref_y, azimuth_convention, precision)
+
+    def build():
+        buffer = io.BytesIO()
+        save_project(buffer, batch.to_frame(), results_df if not results_df.empty else None,
+                     {'ref_x': ref_x, 'ref_y': ref_y, 'azimuth_convention': azimuth_convention,
+                      'precision': precision, 'software': 'Azimuth Converter'})
+        return buffer.getvalue()
+
+    return get_computation_cache().get_or_compute(key, build)
+
+def load_project_file(uploaded):
+    """Abrir un .azp subido: observaciones, resultados y referencia sin recalcular nada.
+
+    El archivo subido ya está en memoria, así que se lee directamente de sus bytes
+    (sin copiarlo a disco ni mapearlo); la aplicación trabaja con los tramos y los
+    resultados completos en memoria, por lo que las columnas se materializan al abrir.
+    """
+    with open_project(uploaded.getbuffer()) as project:
+        st.session_state.batch_data.replace(project.observations())
+        set_results(project.results(), project.metadata.get('precision', 'standard'))
+        st.session_state.ref_x = float(project.metadata.get('ref_x', st.session_state.ref_x))
+        st.session_state.ref_y = float(project.metadata.get('ref_y', st.session_state.ref_y))
+        return len(project), project.result_count
+
+def render_project_section(ref_x, ref_y, azimuth_convention):
+    """Guardar y abrir proyectos binarios (.azp) con observaciones, azimuts y coordenadas"""
+    with st.expander("💾 Proyecto (.azp)", expanded=False):
+        batch = st.session_state.batch_data
+        if not batch.empty:
+            st.download_button(
+                label="📥 Descargar Proyecto",
+                data=build_project_file(batch, current_batch_results(), ref_x, ref_y, azimuth_convention),
+                file_name="proyecto.azp",
+                mime="application/octet-stream",
+                use_container_width=True
+            )
+        uploaded = st.file_uploader("Abrir proyecto", type=['azp'], key="project_file")
+        if uploaded is not None and st.button("📂 Abrir Proyecto", use_container_width=True):
+            try:
+                with metrics.stage('project_load'):
+                    observations, vertices = load_project_file(uploaded)
+            except (OSError, ValueError, KeyError) as e:
+                st.error(f"❌ No se pudo abrir el proyecto: {e}")
+                return
+            save_previous_batch_data()
+            st.success(f"✅ Proyecto abierto: {observations} observaciones, {vertices} vértices")
+            st.rerun()
+
+@timed_fragment('multi_traverse')
+def render_multi_traverse_section(ref_x, ref_y, precision='standard'):
+    """Lote de poligonales: CSV con columnas Traverse, Azimuth, Distance (y opcionalmente Start_X, Start_Y)"""
+    with st.expander("🗂️ Lote de Poligonales", expanded=False):
+        st.caption("CSV con columnas Traverse, Azimuth, Distance y opcionalmente Start_X, Start_Y "
+                   "(si falta el punto de partida se usa la referencia).")
+        uploaded = st.file_uploader("Archivo CSV", type=['csv'], key="multi_traverse_file")
+        if uploaded is not None and st.button("🔄 Calcular Lote", use_container_width=True):
+            try:
+                batch = pd.read_csv(uploaded, dtype={'Azimuth': str}, skipinitialspace=True)
+                # 🚀 PERFORMANCE: Todas las poligonales en una sola suma acumulada segmentada
+                results, summary, errors = calculate_traverses(batch, ref_x, ref_y, precision)
+            except (KeyError, ValueError) as e:
+                st.error(f"❌ Archivo inválido: {e}")
+                return
+            st.session_state.multi_results = results
+            st.session_state.multi_summary = summary
+            st.success(f"✅ {len(summary)} poligonales, {len(results)} vértices calculados")
+            if errors:
+                st.error(f"❌ {len(errors)} filas inválidas omitidas")
+                for error in errors[:20]:
+                    st.write(f"- {error}")
+
+        summary = st.session_state.get('multi_summary')
+        if summary is not None and not summary.empty:
+            st.dataframe(summary, use_container_width=True, height=300)
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button(
+                    label="📥 Descargar Resumen CSV",
+                    data=summary.to_csv(index=False),
+                    file_name="resumen_poligonales.csv",
+                    mime="text/csv",
+                    use_container_width=True
+                )
+            with col2:
+                st.download_button(
+                    label="📥 Descargar Vértices CSV",
+                    data=round_coordinates(st.session_state.multi_results)
+                        .drop(columns=['Reference_X', 'Reference_Y']).to_csv(index=False),
+                    file_name="vertices_poligonales.csv",
+                    mime="text/csv",
+                    use_container_width=True
+                )
+
+def get_plot_extent(results_df, ref_x, ref_y):
+    """Extensión (x_min, y_min, x_max, y_max) de todo lo dibujado, memoizada por versión de los datos"""
+    store = st.session_state.single_points
+    key = (st.session_state.get('results_version', 0), store.version, ref_x, ref_y)
+    memo = st.session_state.get('plot_extent')
+    if memo is None or memo[0] != key:
+        x = [np.array([ref_x]), store['X']]
+        y = [np.array([ref_y]), store['Y']]
+        if not results_df.empty:
+            x.append(results_df['X_Coordinate'].to_numpy())
+            y.append(results_df['Y_Coordinate'].to_numpy())
+        extent = (min(float(np.nanmin(v)) for v in x if len(v)), min(float(np.nanmin(v)) for v in y if len(v)),
+                  max(float(np.nanmax(v)) for v in x if len(v)), max(float(np.nanmax(v)) for v in y if len(v)))
+        memo = st.session_state.plot_extent = (key, extent)
+    return memo[1]
+
+def _reset_plot_selection(window=None, level=None):
+    """Fijar la ventana del gráfico y descartar la selección de caja (nueva clave del gráfico)"""
+    st.session_state.plot_window = window
+    st.session_state.plot_zoom = level
+    st.session_state.plot_selection = st.session_state.get('plot_selection', 0) + 1
+
+def render_level_of_detail(event, results_df, ref_x, ref_y, total_points, max_points, window):
+    """Controles del nivel de detalle: una selección de caja elige la ventana a resolución completa"""
+    boxes = event.selection.get('box', []) if event else []
+    if boxes:
+        box = boxes[-1]
+        selected = (min(box['x']), min(box['y']), max(box['x']), max(box['y']))
+        level, snapped = snap_window(selected, get_plot_extent(results_df, ref_x, ref_y))
+        _reset_plot_selection(snapped, level)
+        rerun_fragment()
+
+    if window is None:
+        st.caption(f"🔭 Vista simplificada: {total_points:,} puntos, se envían como máximo {max_points:,}. "
+                   "Selecciona un área con la herramienta de caja para verla a resolución completa.")
+    else:
+        st.caption(f"🔍 Zoom nivel {st.session_state.get('plot_zoom')}: ventana "
+                   f"X {window[0]:.3f} – {window[2]:.3f}, Y {window[1]:.3f} – {window[3]:.3f}. "
+                   "Área y cierre se calculan siempre con todos los puntos.")
+        if st.button("🗺️ Vista completa", key="plot_full_view"):
+            _reset_plot_selection()
+            rerun_fragment()
+
+def render_metrics(placeholder):
+    """Tabla de tiempos por etapa (de todo el proceso) y exportación de métricas en la barra lateral"""
+    if not metrics.enabled:
+        return
+    stats = perf_manager.get_cache_stats()
+    for name in ('hits', 'misses', 'evictions', 'bytes'):
+        metrics.gauge(f'cache_{name}', stats[name])
+
+    stages = pd.DataFrame(metrics.stages())
+    with placeholder.container():
+        if stages.empty:
+            st.caption("Sin mediciones todavía")
+        else:
+            table = stages[['stage', 'calls']].copy()
+            for column in ('mean_s', 'max_s', 'last_s'):
+                table[column.replace('_s', ' ms')] = stages[column] * 1000
+            table['filas/s'] = stages['rows_per_s']
+            st.dataframe(table, hide_index=True, use_container_width=True)
+        if metrics.peak_memory:
+            st.caption(f"Pico de memoria: {metrics.peak_memory / 1024 / 1024:.1f} MB")
+
+        fmt = st.selectbox("Formato", ['json', 'prometheus'], key='metrics_format')
+        # Solo a los destinos configurados por el operador (AZIMUTH_METRICS_FILE / AZIMUTH_METRICS_URL);
+        # los visitantes no eligen rutas ni URLs del servidor. Sin botón de reinicio: los
+        # contadores son de todas las sesiones.
+        destinations = [(METRICS_FILE, 'prometheus'), (METRICS_URL, fmt)]
+        destinations = [(destination, kind) for destination, kind in destinations if destination]
+        if destinations and st.button("💾 Exportar", use_container_width=True):
+            try:
+                for destination, kind in destinations:
+                    metrics.export(destination, kind)
+                st.success("✅ Métricas exportadas")
+            except (OSError, ValueError) as e:
+                st.error(f"❌ No se pudieron exportar las métricas: {e}")
+        st.download_button(
+            label="📥 Descargar métricas",
+            data=metrics.to_json() if fmt == 'json' else metrics.to_prometheus(),
+            file_name=f"azimuth_metrics.{'json' if fmt == 'json' else 'prom'}",
+            mime='application/json' if fmt == 'json' else 'text/plain',
+            use_container_width=True
+        )
+
+def render_cache_stats(placeholder):
+    """Mostrar los contadores del caché de cálculos en la barra lateral"""
+    stats = perf_manager.get_cache_stats()
+    with placeholder.container():
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Aciertos", stats['hits'])
+            st.metric("Expulsiones", stats['evictions'])
+            st.metric("Entradas", stats['entries'])
+        with col2:
+            st.metric("Fallos", stats['misses'])
+            st.metric("Tasa de aciertos", f"{stats['hit_rate']:.0%}")
+            st.metric("Caché", f"{stats['bytes'] / 1024 / 1024:.1f} MB")
+        st.progress(min(stats['bytes'] / stats['budget'], 1.0),
+                    text=f"Presupuesto: {stats['bytes'] / 1024 / 1024:.1f} / {stats['budget'] / 1024 / 1024:.0f} MB")
+        st.caption(" · ".join(f"{name}: {cache['entries']} entradas, {cache['bytes'] / 1024 / 1024:.1f} MB"
+                              for name, cache in stats['caches'].items()))
+        st.caption(f"Caducidad: {CACHE_TTL_MIN} min" if CACHE_TTL_MIN else "Caducidad: sin límite")
+
 def initialize_session_state():
     """Inicializar todas las variables de sesión"""
     if 'language' not in st.session_state:
         st.session_state.language = 'es'
     
+    # Identificador de la sesión para las claves de las cachés compartidas
+    if 'session_token' not in st.session_state:
+        st.session_state.session_token = uuid.uuid4().hex
+    
+    # 🚀 PERFORMANCE: Almacenes de columnas NumPy (agregar es O(1) amortizado)
     if 'single_points' not in st.session_state:
-        st.session_state.single_points = pd.DataFrame({'X': [], 'Y': []})
+        st.session_state.single_points = PointStore(POINT_COLUMNS)
     
     if 'batch_data' not in st.session_state:
-        st.session_state.batch_data = pd.DataFrame({'Azimuth': [], 'Distance': []})
+        st.session_state.batch_data = PointStore(LEG_COLUMNS)
     
     if 'results_df' not in st.session_state:
         st.session_state.results_df = pd.DataFrame()
+    
+    # Punto de referencia (con clave para poder restaurarlo al abrir un proyecto)
+    if 'ref_x' not in st.session_state:
+        st.session_state.ref_x = 1000.0
+    if 'ref_y' not in st.session_state:
+        st.session_state.ref_y = 1000.0
 
 def setup_page_config():
     """Configurar la página de Streamlit"""
@@ -1029,193 +1272,89 @@ def setup_page_config():
         unsafe_allow_html=True
     )
 
-def main():
-    """Función principal mejorada con mejor organización y controles de rendimiento"""
-    setup_page_config()
-    initialize_session_state()
-    
-    # 🚀 PERFORMANCE: Sidebar para controles de rendimiento
-    with st.sidebar:
-        st.header("⚡ Controles de Rendimiento")
-        
-        # Estadísticas de caché
-        if st.button("🧹 Limpiar Caché"):
-            st.cache_data.clear()
-            st.cache_resource.clear()
-            perf_manager._cache_stats.clear()
-            st.success("✅ Caché limpiado")
-        
-        # Optimización de memoria
-        if st.button("🗑️ Optimizar Memoria"):
-            perf_manager.optimize_memory()
-            st.success("✅ Memoria optimizada")
-        
-        
-        
-        # Configuración de rendimiento
-        st.subheader("🔧 Configuración")
-        use_async = st.checkbox("Procesamiento asíncrono", value=True, 
-                               help="Activar para lotes >100 puntos")
-        cache_ttl = st.slider("TTL Caché (minutos)", 15, 360, 60,
-                             help="Tiempo de vida del caché")
-   
-    # Initialize session state for points
-    if 'single_points' not in st.session_state:
-        st.session_state.single_points = pd.DataFrame({
-            'X': [],
-            'Y': []
-        })
-   
-    if 'batch_data' not in st.session_state:
-        st.session_state.batch_data = pd.DataFrame({
-            'Azimuth': [],
-            'Distance': []
-        })
-   
-    # Sidebar
-    st.sidebar.header(get_text('settings', st.session_state.language))
-   
-    
-   
-    lang = st.session_state.language
-   
-    st.title(get_text('title', lang))
-    st.markdown(get_text('subtitle', lang))
+def read_bulk_legs(text, uploaded):
+    """Tramos válidos y líneas rechazadas del texto pegado y del archivo subido.
 
-    with st.expander("ℹ️ Cómo usar la visualización"):
-        st.markdown("""
-        **Controles Interactivos:**
-        - 🏠 **Inicio**: Restablecer vista
-        - 🔍 **Zoom**: Acercar/alejar
-        - ↔️ **Desplazar**: Arrastrar para mover
-        - 📷 **Cámara**: Descargar como PNG
-        - 🖱️ **Rueda**: Zoom con la rueda del ratón
-        - 🖐️ **Doble clic**: Restablecer zoom
-       
-        **Leyenda:**
-        - 🔵 **Círculo Azul (REF)**: Punto de referencia
-        - 🔴 **Diamantes (P1, P2, ...)**: Puntos ingresados directamente
-        - 🔴 **Círculos (A1, A2, ...)**: Puntos del polígono (de azimuts)
-        - 🟢 **X Verde**: Punto actual (vista previa)
-        - 🔵 **Línea Azul**: Perímetro del polígono (azimut)
-        - 🟢 **Línea Verde**: Perímetro del polígono (puntos ingresados)
-        - ➡️ **Flechas**: Dirección del polígono (azimut)
-        """)
+    El archivo puede ser CSV con columnas Azimuth, Distance o texto con una
+    línea "azimut distancia" por tramo (igual que el texto pegado).
+    """
+    sources = []
+    if text and text.strip():
+        sources.append(("Texto", split_leg_lines(text.splitlines())))
+    if uploaded is not None:
+        if uploaded.name.lower().endswith('.csv'):
+            table = pd.read_csv(uploaded, dtype=str, skipinitialspace=True, usecols=['Azimuth', 'Distance'])
+        else:
+            table = split_leg_lines(uploaded.getvalue().decode('utf-8-sig').splitlines())
+        sources.append((uploaded.name, table))
 
-    # Indicadores de rendimiento removidos a solicitud del usuario
-   
-    azimuth_convention = "excel"
+    frames, errors = [], []
+    for name, table in sources:
+        # 🚀 PERFORMANCE: Análisis y validación vectorizados de todas las líneas a la vez
+        legs, rejected = validate_legs(table)
+        frames.append(legs)
+        errors.extend(f"{name}: {error}" for error in rejected)
+    legs = pd.concat(frames, ignore_index=True) if frames else validate_legs(None)[0]
+    return legs, errors
+
+def render_bulk_entry():
+    """Pegar o subir muchos tramos y agregarlos a la tabla en una sola operación"""
+    summary = st.session_state.pop('bulk_summary', None)
+    if summary is not None:
+        added, errors = summary
+        if added:
+            st.success(f"✅ {added} tramos agregados")
+        if errors:
+            st.warning(f"⚠️ {len(errors)} líneas rechazadas")
+            with st.expander("Ver líneas rechazadas"):
+                st.text("\n".join(errors[:500]) + (f"\n… y {len(errors) - 500} más" if len(errors) > 500 else ""))
+
+    with st.expander("📋 Entrada Masiva", expanded=False):
+        with st.form(f"bulk_entry_form_{st.session_state.get('bulk_counter', 0)}"):
+            text = st.text_area(
+                "Tramos (uno por línea: azimut distancia)",
+                height=200,
+                placeholder="26 56 7.00 5.178\n90-0-0 1.000\n180:30:15.5;1,000",
+                help="Cualquier formato de azimut de la entrada manual; la distancia es el último campo "
+                     "(separado por espacios, tabulador o ';')"
+            )
+            uploaded = st.file_uploader("Archivo TXT o CSV (columnas Azimuth, Distance)", type=['txt', 'csv'])
+            submitted = st.form_submit_button("➕ Agregar Tramos", use_container_width=True)
+
+    if submitted:
+        try:
+            with metrics.stage('bulk_entry'):
+                legs, errors = read_bulk_legs(text, uploaded)
+        except (KeyError, ValueError) as e:
+            st.error(f"❌ Archivo inválido: {e}")
+            return
+        if not legs.empty:
+            # 🚀 PERFORMANCE: Una sola ampliación del almacén y una sola línea en el diario
+            st.session_state.batch_data.extend(legs)
+            save_previous_batch_data('extend', Azimuth=legs['Azimuth'], Distance=legs['Distance'])
+        st.session_state.bulk_counter = st.session_state.get('bulk_counter', 0) + 1
+        st.session_state.bulk_summary = (len(legs), errors)
+        rerun_fragment()
+
+@timed_fragment('batch_entry')
+def render_batch_entry(ref_x, ref_y, azimuth_convention):
+    """Entrada de azimuts y proyecto (fragmento: agregar una entrada solo recarga esta sección)"""
+    st.markdown("---")
+    st.subheader("Entrada de Azimuts")
    
-    # Reference point
-    st.sidebar.subheader(get_text('reference_point', lang))
-    ref_x = st.sidebar.number_input(get_text('reference_x', lang), value=1000.0, help=get_text('reference_x_help', lang))
-    ref_y = st.sidebar.number_input(get_text('reference_y', lang), value=1000.0, help=get_text('reference_y_help', lang))
+    # Entrada manual (una por formulario) o masiva (texto pegado / archivo)
+    st.subheader("")
    
-    # Opción para fondo del gráfico
-    bg_color = st.sidebar.selectbox("Fondo del Gráfico", ['Blanco', 'Negro'])
+    if not st.session_state.batch_data.empty:
+        st.write("**Datos Actuales:**")
+        st.dataframe(st.session_state.batch_data.to_frame(), use_container_width=True, height=250)
    
-    # Batch Conversion Section
-    # st.header(get_text('batch_conversion', lang))
+    if 'form_counter' not in st.session_state:
+        st.session_state.form_counter = 0
    
-    # Points management section
-    st.subheader("📍 Gestión de Puntos")
-    col_btn1, col_btn2, col_btn3 = st.columns([1, 1, 2])
-   
-    with col_btn1:
-        if st.button("➕ Agregar Punto", key="add_point", help="Agregar punto a la visualización",
-                    use_container_width=True, type="primary"):
-            if 'current_x' in st.session_state and 'current_y' in st.session_state:
-                x = st.session_state.current_x
-                y = st.session_state.current_y
-               
-                try:
-                    new_point = pd.DataFrame({
-                        'X': [x],
-                        'Y': [y]
-                    })
-                   
-                    st.session_state.single_points = pd.concat([st.session_state.single_points, new_point], ignore_index=True)
-                    st.success(f"✅ ¡Punto agregado! Total puntos: {len(st.session_state.single_points)}")
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"❌ Error al agregar punto: {str(e)}")
-   
-    with col_btn2:
-        if st.button("🗑️ Limpiar Puntos", key="clear_points", help="Eliminar todos los puntos de la visualización",
-                    use_container_width=True):
-            st.session_state.single_points = pd.DataFrame({
-                'X': [], 'Y': []
-            })
-            st.success("✅ ¡Todos los puntos eliminados!")
-            st.rerun()
-   
-    with col_btn3:
-        st.info(f"**Puntos actuales:** {len(st.session_state.single_points)}")
-        if not st.session_state.single_points.empty:
-            st.metric("Último Punto", f"({st.session_state.single_points.iloc[-1]['X']:.3f}, {st.session_state.single_points.iloc[-1]['Y']:.3f})")
-   
-    # Agregar el cálculo del área para puntos ingresados manualmente
-    if len(st.session_state.single_points) >= 3:
-        coordinates = list(zip(st.session_state.single_points['X'], st.session_state.single_points['Y']))
-        single_points_area = calculate_polygon_area(coordinates)
-        st.subheader("📐 Área del Polígono de Puntos Ingresados")
-        st.metric("Área", f"{single_points_area:.3f} m²")
-   
-    if not st.session_state.single_points.empty:
-        with st.expander("📋 Ver Todos los Puntos", expanded=False):
-            st.dataframe(st.session_state.single_points[['X', 'Y']],
-                        use_container_width=True, height=200)
-   
-    st.subheader("📊 Ingreso de Coordenadas")
-   
-    x_coord = st.number_input(
-        get_text('x_input', lang),
-        value=0.0,
-        step=0.001,
-        format="%.3f",
-        help=get_text('x_input_help', lang),
-        key="x_input"
-    )
-    st.session_state.current_x = x_coord
-   
-    y_coord = st.number_input(
-        get_text('y_input', lang),
-        value=0.0,
-        step=0.001,
-        format="%.3f",
-        help=get_text('y_input_help', lang),
-        key="y_input"
-    )
-    st.session_state.current_y = y_coord
-   
-    if x_coord != 0 or y_coord != 0:
-        st.subheader(get_text('results', lang))
-        col_x, col_y = st.columns(2)
-        with col_x:
-            st.metric(get_text('x_coordinate', lang), f"{x_coord:.3f}")
-        with col_y:
-            st.metric(get_text('y_coordinate', lang), f"{y_coord:.3f}")
-       
-        st.write(f"**{get_text('input_summary', lang)}** Coordenadas ({x_coord:.3f}, {y_coord:.3f})")
-    else:
-        st.info(get_text('enter_values', lang))
-   
-    st.markdown("---")
-    st.subheader("Entrada de Azimuts")
-   
-    # Removed the radio and CSV upload, only manual input
-    st.subheader("")
-   
-    if not st.session_state.batch_data.empty:
-        st.write("**Datos Actuales:**")
-        st.dataframe(st.session_state.batch_data, use_container_width=True, height=250)
-   
-    if 'form_counter' not in st.session_state:
-        st.session_state.form_counter = 0
-   
-    with st.form(f"add_entry_form_{st.session_state.form_counter}"):
-        st.write("**Agregar Nueva Entrada:**")
-        col1, col2, col3 = st.columns([2, 1, 1])
+    with st.form(f"add_entry_form_{st.session_state.form_counter}"):
+        st.write("**Agregar Nueva Entrada:**")
+        col1, col2, col3 = st.columns([2, 1, 1])
    
         with col1:
             new_azimuth = st.text_input(
@@ -1237,164 +1376,151 @@ def main():
             submitted = st.form_submit_button("➕ Agregar Entrada")
            
         if submitted and new_azimuth and new_distance is not None and new_distance > 0:
-            new_row = pd.DataFrame({
-                'Azimuth': [new_azimuth],
-                'Distance': [new_distance]
-            })
-            st.session_state.batch_data = pd.concat([st.session_state.batch_data, new_row], ignore_index=True)
+            st.session_state.batch_data.append(Azimuth=new_azimuth, Distance=new_distance)
             st.session_state.form_counter += 1
             # Guardar automáticamente los datos agregados para poder restaurarlos tras recargar
-            save_previous_batch_data()
+            save_previous_batch_data('append', Azimuth=new_azimuth, Distance=new_distance)
             st.success("✅ ¡Entrada agregada!")
-            st.rerun()
+            # 🚀 PERFORMANCE: Solo cambia la tabla de entradas; los resultados se recalculan al convertir
+            rerun_fragment()
+   
+    render_bulk_entry()
    
     st.markdown("---")
     col1, col2 = st.columns(2)
     with col1:
         if st.button("🗑️ Limpiar Todos los Datos"):
-            st.session_state.batch_data = pd.DataFrame({'Azimuth': [], 'Distance': []})
+            st.session_state.batch_data.clear()
             st.rerun()
     with col2:
         if st.button("📝 Restablecer Entradas"):
             restored_df = restore_previous_batch_data()
             if restored_df is not None and not restored_df.empty:
-                st.session_state.batch_data = restored_df
+                st.session_state.batch_data.replace(restored_df)
                 st.success("✅ Datos previos restaurados")
             else:
-                st.session_state.batch_data = pd.DataFrame({
+                st.session_state.batch_data.replace({
                     'Azimuth': ["26 56 7.00", "90-0-0", "180:30:15.5", "270_45_30"],
                     'Distance': [5.178, 1.000, 1.000, 1.000]
                 })
                 st.info("ℹ️ No hay datos previos guardados; se cargaron ejemplos")
             st.rerun()
    
-    if st.button("🔄 Convertir Todo", type="primary", use_container_width=True):
-        if not st.session_state.batch_data.empty:
-            results = []
-            errors = []
-           
-            current_ref_x = ref_x
-            current_ref_y = ref_y
-           
-            # 🚀 PERFORMANCE: Indicador de progreso para procesamiento
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            # Mostrar información de rendimiento
-            batch_size = len(st.session_state.batch_data)
-            if batch_size > 100:
-                status_text.text(f"⚡ Procesando {batch_size} puntos con async...")
-            else:
-                status_text.text(f"📊 Procesando {batch_size} puntos...")
-           
-            for index, row in st.session_state.batch_data.iterrows():
-                try:
-                    azimuth_raw = row['Azimuth']
-                    if isinstance(azimuth_raw, str):
-                        azimuth = parse_dms_to_decimal(azimuth_raw)
-                        if azimuth is None:
-                            errors.append(f"Fila {int(index) + 1}: Formato de azimut inválido '{azimuth_raw}'")
-                            continue
-                    else:
-                        azimuth = float(azimuth_raw)
-                   
-                    distance = float(row['Distance'])
-                   
-                    if not validate_azimuth(azimuth):
-                        errors.append(f"Fila {int(index) + 1}: Azimut inválido {azimuth}°")
-                        continue
-                   
-                    x, y = azimuth_to_coordinates(azimuth, distance, current_ref_x, current_ref_y, azimuth_convention)
-                   
-                    results.append({
-                        'Row': int(index) + 1,
-                        'Azimuth_Original': str(azimuth_raw),
-                        'Azimuth_Decimal': float(azimuth),
-                        'Distance': float(distance),
-                        'Reference_X': float(current_ref_x),
-                        'Reference_Y': float(current_ref_y),
-                        'X_Coordinate': float(x),
-                        'Y_Coordinate': float(y)
-                    })
-                   
-                    current_ref_x = x
-                    current_ref_y = y
-                   
-                except Exception as e:
-                    errors.append(f"Fila {int(index) + 1}: {str(e)}")
-           
-            # Actualizar barra de progreso
-            progress_bar.progress(100)
-            status_text.text(f"✅ Procesamiento completado: {len(results)} puntos calculados")
-            
-            # 🚀 PERFORMANCE: Actualizar estadísticas
-            perf_manager._cache_stats[f'batch_{batch_size}'] = len(results)
-           
-            if results:
-                results_df = pd.DataFrame(results)
-                st.session_state['results_df'] = results_df
-               
-                st.success(f"✅ ¡Convertidos {len(results)} puntos exitosamente!")
-           
-            if errors:
-                st.error("❌ Errores encontrados:")
-                for error in errors:
-                    st.write(f"- {error}")
-        else:
-            st.warning("⚠️ No hay datos para convertir")
-   
+    render_project_section(ref_x, ref_y, azimuth_convention)
+
+@timed_fragment('results')
+def render_results(ref_x, ref_y, precision='standard'):
+    """Resultados de la poligonal: cierre, ajuste, tabla, edición y descargas (fragmento)"""
     # Display persistent results
     results_df = st.session_state.get('results_df', pd.DataFrame())
     if not results_df.empty:
-        final_x = results_df.iloc[-1]['X_Coordinate']
-        final_y = results_df.iloc[-1]['Y_Coordinate']
-        closure_error_x = abs(final_x - ref_x)
-        closure_error_y = abs(final_y - ref_y)
-        closure_error = math.sqrt(closure_error_x**2 + closure_error_y**2)
+        results_precision = st.session_state.get('results_precision', 'standard')
+        # 🚀 PERFORMANCE: Área y perímetro en una sola pasada, memoizados por versión.
+        # El cierre se mide sin redondear, con el mismo cálculo que el ajuste
+        azimuth_geometry = get_azimuth_geometry(results_df, ref_x, ref_y)
+        closure_error_x, closure_error_y = map(abs, get_azimuth_misclosure(results_df, ref_x, ref_y,
+                                                                           results_precision))
+        closure_error = math.hypot(closure_error_x, closure_error_y)
        
         if closure_error < 0.01:
             st.success(f"🎯 ¡El polígono CIERRA! Error: {closure_error:.6f}")
         else:
             st.error(f"⚠️ Error de cierre: {closure_error:.6f} (X: {closure_error_x:.3f}, Y: {closure_error_y:.3f})")
        
-        coordinates = [(ref_x, ref_y)] + list(zip(results_df['X_Coordinate'], results_df['Y_Coordinate']))
-        polygon_area = calculate_polygon_area(coordinates)
-       
+        # 🚀 PERFORMANCE: Compensación vectorizada del error de cierre (una sola pasada)
+        adjustment_labels = {
+            "Ninguno": None,
+            "Brújula (Bowditch)": 'bowditch',
+            "Tránsito": 'transit'
+        }
+        adjustment_method = adjustment_labels[st.selectbox("🔧 Ajuste de la poligonal", list(adjustment_labels))]
+        adjusted_df = None
+        if adjustment_method:
+            with metrics.stage('adjustment', rows=len(results_df)):
+                adjusted_df, adjustment = adjust_traverse(results_df, ref_x, ref_y, adjustment_method,
+                                                          precision=results_precision)
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                ratio = adjustment['precision']
+                st.metric("Precisión", "1:∞" if math.isinf(ratio) else f"1:{ratio:,.0f}")
+            with col2:
+                st.metric("Error lineal", f"{adjustment['linear_misclosure']:.6f}")
+            with col3:
+                st.metric("Perímetro", f"{adjustment['perimeter']:.3f}")
+
         st.subheader("📐 Área del Polígono Azimut")
         col1, col2 = st.columns(2)
         with col1:
-            st.metric("Área", f"{polygon_area:.3f} m²")
+            st.metric("Área", f"{azimuth_geometry['area']:.3f} m²")
         with col2:
             st.metric("Vértices", f"{len(results_df)}")
        
-        # Comparación de áreas si hay puntos ingresados
-        if len(st.session_state.single_points) >= 3:
-            single_coords = list(zip(st.session_state.single_points['X'], st.session_state.single_points['Y']))
-            single_area = calculate_polygon_area(single_coords)
-            area_diff = abs(polygon_area - single_area)
-            st.subheader("📏 Comparación de Áreas")
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Área Azimut", f"{polygon_area:.3f} m²")
-            with col2:
-                st.metric("Área Puntos", f"{single_area:.3f} m²")
-            with col3:
-                st.metric("Diferencia", f"{area_diff:.3f} m²")
-       
-        displayed_df = results_df.drop(columns=['Reference_X', 'Reference_Y'])
+        def build_tables():
+            displayed_df = results_df.drop(columns=['Reference_X', 'Reference_Y'])
+            if adjusted_df is not None:
+                displayed_df = pd.concat([displayed_df, adjusted_df.drop(columns='Row').set_axis(displayed_df.index)], axis=1)
+            if results_precision == 'high':
+                # Alta precisión: se calcula con float64 completo y se redondea solo aquí (tabla y CSV)
+                displayed_df = round_coordinates(displayed_df)
+            with metrics.stage('csv_export', rows=len(displayed_df)):
+                csv_buffer = io.StringIO()
+                displayed_df.to_csv(csv_buffer, index=False)
+                csv_data = csv_buffer.getvalue()
+            # Coordenadas ajustadas si hay un método de ajuste seleccionado
+            if adjusted_df is not None:
+                txt_df = adjusted_df[['Row', 'Adjusted_X', 'Adjusted_Y']]
+            else:
+                txt_df = results_df[['Row', 'X_Coordinate', 'Y_Coordinate']]
+            with metrics.stage('txt_export', rows=len(txt_df)):
+                txt_data = txt_df.set_axis(['pt', 'x', 'y'], axis=1).to_csv(index=False, float_format='%.3f',
+                                                                            lineterminator='\n')
+            return displayed_df, csv_data, txt_data
+        
+        displayed_df, csv_data, txt_data = get_results_tables(
+            (st.session_state.get('results_version', 0), ref_x, ref_y, adjustment_method), build_tables
+        )
         column_config = {
             'Row': st.column_config.NumberColumn('Pt', width='small'),
             'Azimuth_Original': st.column_config.TextColumn('Azimut Original', width='medium'),
             'Azimuth_Decimal': st.column_config.NumberColumn('Azimut Decimal', width='medium'),
             'Distance': st.column_config.NumberColumn('Distancia', width='small'),
             'X_Coordinate': st.column_config.NumberColumn('X', width='medium'),
-            'Y_Coordinate': st.column_config.NumberColumn('Y', width='medium')
+            'Y_Coordinate': st.column_config.NumberColumn('Y', width='medium'),
+            'Correction_X': st.column_config.NumberColumn('Corr. X', width='small'),
+            'Correction_Y': st.column_config.NumberColumn('Corr. Y', width='small'),
+            'Adjusted_X': st.column_config.NumberColumn('X Ajustada', width='medium'),
+            'Adjusted_Y': st.column_config.NumberColumn('Y Ajustada', width='medium')
         }
         st.dataframe(displayed_df, column_config=column_config, use_container_width=True, height=300)
-       
-        csv_buffer = io.StringIO()
-        displayed_df.to_csv(csv_buffer, index=False)
-        csv_data = csv_buffer.getvalue()
+
+        # 🚀 PERFORMANCE: Corrección de tramos sin recalcular toda la poligonal
+        if not st.session_state.batch_data.empty:
+            with st.expander("✏️ Corregir Tramo"):
+                batch = st.session_state.batch_data
+                col1, col2, col3 = st.columns([1, 2, 1])
+                with col1:
+                    edit_row = st.number_input("Fila", min_value=1, max_value=len(batch), value=1, step=1)
+                index = int(edit_row) - 1
+                with col2:
+                    edit_azimuth = st.text_input("Azimut", value=str(batch['Azimuth'][index]),
+                                                 key=f"edit_azimuth_{index}_{batch.version}")
+                with col3:
+                    edit_distance = st.number_input("Distancia", value=float(batch['Distance'][index]),
+                                                    step=0.001, format="%.3f",
+                                                    key=f"edit_distance_{index}_{batch.version}")
+                col1, col2, col3 = st.columns(3)
+                action = None
+                with col1:
+                    if st.button("✅ Aplicar", use_container_width=True):
+                        action = 'update'
+                with col2:
+                    if st.button("➕ Insertar Antes", use_container_width=True):
+                        action = 'insert'
+                with col3:
+                    if st.button("🗑️ Eliminar", use_container_width=True):
+                        action = 'delete'
+                if action and apply_leg_edit(action, index, edit_azimuth, edit_distance, ref_x, ref_y, precision):
+                    st.rerun()
        
         st.download_button(
             label="📥 Descargar Resultados como CSV",
@@ -1404,12 +1530,6 @@ def main():
             use_container_width=True
         )
 
-        txt_buffer = io.StringIO()
-        txt_buffer.write("pt,x,y\n")
-        for _, row in results_df.iterrows():
-            txt_buffer.write(f"{int(row['Row'])},{row['X_Coordinate']:.3f},{row['Y_Coordinate']:.3f}\n")
-        txt_data = txt_buffer.getvalue()
-       
         st.download_button(
             label="📥 Descargar Coordenadas como TXT (Pt,X,Y)",
             data=txt_data,
@@ -1417,13 +1537,124 @@ def main():
             mime="text/plain",
             use_container_width=True
         )
+
+@timed_fragment('visualization')
+def render_visualization(lang, ref_x, ref_y, bg_color, webgl_threshold, lod_points):
+    """Puntos ingresados, vista previa, búsqueda espacial y gráfico (fragmento).
+
+    Escribir las coordenadas de vista previa o agregar un punto solo recarga esta
+    sección; la entrada de azimuts y la tabla de resultados no se vuelven a ejecutar.
+    """
+    # Points management section
+    st.subheader("📍 Gestión de Puntos")
+    col_btn1, col_btn2, col_btn3 = st.columns([1, 1, 2])
+   
+    with col_btn1:
+        if st.button("➕ Agregar Punto", key="add_point", help="Agregar punto a la visualización",
+                    use_container_width=True, type="primary"):
+            if 'current_x' in st.session_state and 'current_y' in st.session_state:
+                x = st.session_state.current_x
+                y = st.session_state.current_y
+               
+                tolerance = st.session_state.get('duplicate_tolerance', 0.01)
+                duplicate = get_point_index().find_duplicate(x, y, tolerance)
+                if duplicate is not None:
+                    st.warning(f"⚠️ Punto duplicado: coincide con P{duplicate + 1} "
+                               f"(tolerancia {tolerance:.3f} m). No se agregó.")
+                else:
+                    try:
+                        st.session_state.single_points.append(X=x, Y=y)
+                        st.success(f"✅ ¡Punto agregado! Total puntos: {len(st.session_state.single_points)}")
+                        rerun_fragment()
+                    except Exception as e:
+                        st.error(f"❌ Error al agregar punto: {str(e)}")
    
+    with col_btn2:
+        if st.button("🗑️ Limpiar Puntos", key="clear_points", help="Eliminar todos los puntos de la visualización",
+                    use_container_width=True):
+            st.session_state.single_points.clear()
+            st.success("✅ ¡Todos los puntos eliminados!")
+            rerun_fragment()
+   
+    with col_btn3:
+        st.info(f"**Puntos actuales:** {len(st.session_state.single_points)}")
+        if not st.session_state.single_points.empty:
+            last_point = st.session_state.single_points.last()
+            st.metric("Último Punto", f"({last_point['X']:.3f}, {last_point['Y']:.3f})")
+   
+    # Agregar el cálculo del área para puntos ingresados manualmente
+    if len(st.session_state.single_points) >= 3:
+        single_points_area = get_single_points_geometry()['area']
+        st.subheader("📐 Área del Polígono de Puntos Ingresados")
+        st.metric("Área", f"{single_points_area:.3f} m²")
+       
+        # Comparación de áreas si hay resultados de azimuts (aquí para no recargar los resultados)
+        results_df = st.session_state.get('results_df', pd.DataFrame())
+        if not results_df.empty:
+            polygon_area = get_azimuth_geometry(results_df, ref_x, ref_y)['area']
+            st.subheader("📏 Comparación de Áreas")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Área Azimut", f"{polygon_area:.3f} m²")
+            with col2:
+                st.metric("Área Puntos", f"{single_points_area:.3f} m²")
+            with col3:
+                st.metric("Diferencia", f"{abs(polygon_area - single_points_area):.3f} m²")
+   
+    if not st.session_state.single_points.empty:
+        with st.expander("📋 Ver Todos los Puntos", expanded=False):
+            st.dataframe(st.session_state.single_points.to_frame(),
+                        use_container_width=True, height=200)
+   
+    st.subheader("📊 Ingreso de Coordenadas")
+   
+    x_coord = st.number_input(
+        get_text('x_input', lang),
+        value=0.0,
+        step=0.001,
+        format="%.3f",
+        help=get_text('x_input_help', lang),
+        key="x_input"
+    )
+    st.session_state.current_x = x_coord
+   
+    y_coord = st.number_input(
+        get_text('y_input', lang),
+        value=0.0,
+        step=0.001,
+        format="%.3f",
+        help=get_text('y_input_help', lang),
+        key="y_input"
+    )
+    st.session_state.current_y = y_coord
+   
+    if x_coord != 0 or y_coord != 0:
+        st.subheader(get_text('results', lang))
+        col_x, col_y = st.columns(2)
+        with col_x:
+            st.metric(get_text('x_coordinate', lang), f"{x_coord:.3f}")
+        with col_y:
+            st.metric(get_text('y_coordinate', lang), f"{y_coord:.3f}")
+       
+        st.write(f"**{get_text('input_summary', lang)}** Coordenadas ({x_coord:.3f}, {y_coord:.3f})")
+    else:
+        st.info(get_text('enter_values', lang))
+   
+    render_spatial_search(x_coord, y_coord)
+
     # Visualization Section (moved below "Convertir Todo")
     st.subheader(get_text('visualization', lang))
    
     results_df = st.session_state.get('results_df', pd.DataFrame())
+    total_points = len(st.session_state.single_points) + len(results_df)
+    # 🚀 PERFORMANCE: Nivel de detalle: con muchos puntos se envía una vista simplificada
+    lod_active = bool(lod_points) and total_points > max(lod_points, webgl_threshold)
+    window = st.session_state.get('plot_window') if lod_active else None
     try:
-        fig, config = create_multi_point_plot(st.session_state.single_points, results_df, ref_x, ref_y, x_coord, y_coord, lang, bg_color)
+        with metrics.stage('figure', rows=total_points):
+            fig, config = create_multi_point_plot(st.session_state.single_points.to_frame(), results_df, ref_x, ref_y, x_coord, y_coord, lang, bg_color,
+                                                  webgl_threshold, lod_points if lod_active else None, window,
+                                                  data_versions())
         
         # Enhanced responsive configuration for mobile
         responsive_config = config.copy()
@@ -1431,7 +1662,7 @@ def main():
             'responsive': True,
             'displayModeBar': True,
             'displaylogo': False,
-            'modeBarButtonsToRemove': ['lasso2d', 'select2d', 'resetScale2d'],
+            'modeBarButtonsToRemove': ['lasso2d', 'resetScale2d'] + ([] if lod_active else ['select2d']),
             'toImageButtonOptions': {
                 'format': 'png',
                 'filename': 'azimuth_plot_mobile',
@@ -1441,9 +1672,162 @@ def main():
             }
         })
         
-        st.plotly_chart(fig, use_container_width=True, config=responsive_config)
+        with metrics.stage('plotly_chart'):
+            if lod_active:
+                event = st.plotly_chart(fig, use_container_width=True, config=responsive_config,
+                                        on_select='rerun', selection_mode='box',
+                                        key=f"plot_{st.session_state.get('plot_selection', 0)}")
+            else:
+                st.plotly_chart(fig, use_container_width=True, config=responsive_config)
     except Exception as e:
         st.error(f"Error de visualización: {str(e)}")
+    else:
+        if lod_active:
+            render_level_of_detail(event, results_df, ref_x, ref_y, total_points, lod_points, window)
+
+def main():
+    """Función principal mejorada con mejor organización y controles de rendimiento"""
+    setup_page_config()
+    initialize_session_state()
+    
+    # 🚀 PERFORMANCE: Sidebar para controles de rendimiento
+    with st.sidebar:
+        st.header("⚡ Controles de Rendimiento")
+        
+        # Optimización de memoria (recorta las cachés compartidas al presupuesto, no las vacía)
+        if st.button("🗑️ Optimizar Memoria"):
+            evicted = perf_manager.optimize_memory()
+            st.success(f"✅ Memoria optimizada ({evicted} entradas liberadas)")
+        
+        # Estadísticas de caché: se completan al final de la ejecución, con los aciertos/fallos de esta recarga
+        cache_stats_placeholder = st.empty()
+        
+        # Configuración de rendimiento
+        st.subheader("🔧 Configuración")
+        use_async = st.checkbox("Procesamiento asíncrono", value=True, 
+                               help=f"Calcula en paralelo (procesos) las poligonales desde {PARALLEL_MIN_LEGS} tramos "
+                                    "si el servidor tiene más de un núcleo")
+        precision = 'high' if st.checkbox(
+            "🎯 Alta precisión", value=False,
+            help="Sumas compensadas y coordenadas sin redondear; se redondean solo al mostrar y exportar"
+        ) else 'standard'
+        # La instrumentación es del proceso (compartida por todas las sesiones): se activa solo
+        # desde la configuración del servidor (AZIMUTH_METRICS=1); aquí cada sesión decide si la ve
+        show_metrics = st.checkbox("📊 Instrumentación", value=False, disabled=not metrics.enabled,
+                                   help="Tiempos por etapa, filas/s y pico de memoria de todo el servidor"
+                                        if metrics.enabled else "Desactivada; se activa con AZIMUTH_METRICS=1")
+        metrics_placeholder = st.empty()
+        webgl_threshold = st.number_input("Umbral WebGL (puntos)", min_value=0, value=WEBGL_POINT_THRESHOLD, step=100,
+                                          help="Con más puntos el gráfico usa WebGL y un solo trazo por serie")
+        lod_points = st.number_input("Puntos máx. en el gráfico", min_value=0, value=LOD_MAX_POINTS, step=1000,
+                                     help="Nivel de detalle: con más puntos se envía una vista simplificada "
+                                          "(0 = enviar siempre todos)")
+   
+    # Sidebar
+    st.sidebar.header(get_text('settings', st.session_state.language))
+   
+    
+   
+    lang = st.session_state.language
+   
+    st.title(get_text('title', lang))
+    st.markdown(get_text('subtitle', lang))
+
+    with st.expander("ℹ️ Cómo usar la visualización"):
+        st.markdown("""
+        **Controles Interactivos:**
+        - 🏠 **Inicio**: Restablecer vista
+        - 🔍 **Zoom**: Acercar/alejar
+        - ↔️ **Desplazar**: Arrastrar para mover
+        - 📷 **Cámara**: Descargar como PNG
+        - 🖱️ **Rueda**: Zoom con la rueda del ratón
+        - 🖐️ **Doble clic**: Restablecer zoom
+       
+        **Leyenda:**
+        - 🔵 **Círculo Azul (REF)**: Punto de referencia
+        - 🔴 **Diamantes (P1, P2, ...)**: Puntos ingresados directamente
+        - 🔴 **Círculos (A1, A2, ...)**: Puntos del polígono (de azimuts)
+        - 🟢 **X Verde**: Punto actual (vista previa)
+        - 🔵 **Línea Azul**: Perímetro del polígono (azimut)
+        - 🟢 **Línea Verde**: Perímetro del polígono (puntos ingresados)
+        - ➡️ **Flechas**: Dirección de cada tramo del polígono (azimut), en su punto medio
+        """)
+
+    # Indicadores de rendimiento removidos a solicitud del usuario
+   
+    azimuth_convention = "excel"
+   
+    # Reference point
+    st.sidebar.subheader(get_text('reference_point', lang))
+    ref_x = st.sidebar.number_input(get_text('reference_x', lang), key='ref_x', help=get_text('reference_x_help', lang))
+    ref_y = st.sidebar.number_input(get_text('reference_y', lang), key='ref_y', help=get_text('reference_y_help', lang))
+   
+    st.sidebar.number_input("Tolerancia de duplicados (m)", min_value=0.0, value=0.01, step=0.001,
+                            format="%.3f", key="duplicate_tolerance",
+                            help="Al agregar un punto se rechaza si ya existe otro a esta distancia o menos")
+   
+    # Opción para fondo del gráfico
+    bg_color = st.sidebar.selectbox("Fondo del Gráfico", ['Blanco', 'Negro'])
+   
+    # Batch Conversion Section
+    # st.header(get_text('batch_conversion', lang))
+   
+    # 🚀 PERFORMANCE: Secciones como fragmentos: un widget dentro de una sección solo
+    # recarga esa sección. Lo que cambia los resultados (convertir, editar, abrir
+    # proyecto) y la barra lateral recargan la página completa.
+    render_batch_entry(ref_x, ref_y, azimuth_convention)
+   
+    if st.button("🔄 Convertir Todo", type="primary", use_container_width=True):
+        if not st.session_state.batch_data.empty:
+            # 🚀 PERFORMANCE: Indicador de progreso para procesamiento
+            progress_bar = st.progress(0)
+            status_text = st.empty()
+            
+            batch_size = len(st.session_state.batch_data)
+            processor = None
+            if use_async and get_parallel_processor().use_pool(batch_size):
+                processor = get_parallel_processor()
+                status_text.text(f"⚡ Procesando {batch_size} puntos en paralelo...")
+            else:
+                status_text.text(f"📊 Procesando {batch_size} puntos...")
+           
+            # 🚀 PERFORMANCE: Motor vectorizado (sin/cos + suma acumulada), cacheado por huella de los datos
+            results_df, errors = cached_traverse(
+                st.session_state.batch_data, ref_x, ref_y, azimuth_convention, processor, precision
+            )
+           
+            # Actualizar barra de progreso
+            progress_bar.progress(100)
+            status_text.text(f"✅ Procesamiento completado: {len(results_df)} puntos calculados")
+            
+            if not results_df.empty:
+                set_results(results_df, precision)
+               
+                st.success(f"✅ ¡Convertidos {len(results_df)} puntos exitosamente!")
+           
+            if errors:
+                st.error("❌ Errores encontrados:")
+                for error in errors:
+                    st.write(f"- {error}")
+        else:
+            st.warning("⚠️ No hay datos para convertir")
+
+    render_results(ref_x, ref_y, precision)
+
+    render_multi_traverse_section(ref_x, ref_y, precision)
+
+    render_visualization(lang, ref_x, ref_y, bg_color, webgl_threshold, lod_points)
+
+    render_cache_stats(cache_stats_placeholder)
+    if show_metrics:
+        render_metrics(metrics_placeholder)
    
 if __name__ == "__main__":
-    main()
+    metrics.count('reruns')
+    try:
+        with metrics.stage('rerun'):
+            main()
+    finally:
+        # Volcado continuo para el textfile collector de Prometheus (opcional)
+        if metrics.enabled and METRICS_FILE:
+            metrics.export(METRICS_FILE, 'prometheus')
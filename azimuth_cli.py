@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Command-line batch converter for Azimuth Converter.
+
+Streams an Azimuth/Distance file (CSV with header, or TXT with one
+"azimuth distance" leg per line) in fixed-size chunks and writes the
+traverse vertices incrementally in the same "pt,x,y" format as the TXT
+download of the app. Memory use does not depend on the file length.
+
+With --multi the CSV holds many traverses (Traverse column, optional
+Start_X/Start_Y start point per traverse). They are computed together in one
+pass, the output gains a leading "traverse" column and --summary writes the
+per-traverse closure, area and vertex count.
+
+Examples:
+    python azimuth_cli.py legs.csv -o coordenadas.txt --ref-x 1000 --ref-y 1000
+    python azimuth_cli.py parcels.csv --multi -o vertices.txt --summary summary.csv
+"""
+
+import argparse
+import itertools
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from azimuth_core import (
+    PARALLEL_MIN_LEGS, TRAVERSE_CHUNK_SIZE, AsyncProcessor, calculate_traverses, iter_traverse, split_leg_lines,
+)
+
+
+def read_csv_chunks(path, chunk_size):
+    """Yield Azimuth/Distance DataFrames from a CSV file with header"""
+    yield from pd.read_csv(path, chunksize=chunk_size, dtype=str,
+                           skipinitialspace=True, usecols=['Azimuth', 'Distance'])
+
+
+def read_txt_chunks(path, chunk_size):
+    """Yield Azimuth/Distance DataFrames from "azimuth distance" text lines"""
+    with open(path, 'r', encoding='utf-8') as f:
+        first_line = 1
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            if not lines:
+                break
+            yield split_leg_lines(lines, first_line)
+            first_line += len(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert azimuth/distance traverses to X,Y coordinates (pt,x,y)."
+    )
+    parser.add_argument('input', help="CSV (Azimuth,Distance columns) or TXT file")
+    parser.add_argument('-o', '--output', help="Output file (default: stdout)")
+    parser.add_argument('--ref-x', type=float, default=1000.0, help="Reference X (default: 1000.0)")
+    parser.add_argument('--ref-y', type=float, default=1000.0, help="Reference Y (default: 1000.0)")
+    parser.add_argument('--format', choices=['auto', 'csv', 'txt'], default='auto',
+                        help="Input format (default: from file extension)")
+    parser.add_argument('--chunk-size', type=int, default=100_000,
+                        help="Legs read per chunk (default: 100000)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f"Worker processes per chunk (default: 1, no process pool). Each chunk is split "
+                             f"into blocks of {TRAVERSE_CHUNK_SIZE} legs and the blocks run in parallel, "
+                             f"at most ceil(chunk-size / {TRAVERSE_CHUNK_SIZE}) processes at a time. The pool "
+                             f"is only used with more than one CPU and --chunk-size of at least "
+                             f"{PARALLEL_MIN_LEGS}; smaller chunks run faster in one process")
+    parser.add_argument('--precision', choices=['standard', 'high'], default='standard',
+                        help="high: compensated sums, full float64 until the output is written (default: standard)")
+    parser.add_argument('--multi', action='store_true',
+                        help="CSV with many traverses grouped by a Traverse column (read in one go)")
+    parser.add_argument('--summary', help="With --multi: write the per-traverse summary CSV here")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Do not report invalid rows")
+    return parser.parse_args(argv)
+
+
+def convert(args, out):
+    """Stream the input file through the traverse engine into `out`"""
+    input_format = args.format
+    if input_format == 'auto':
+        input_format = 'csv' if Path(args.input).suffix.lower() == '.csv' else 'txt'
+    reader = read_csv_chunks if input_format == 'csv' else read_txt_chunks
+
+    processor = AsyncProcessor(args.workers) if args.workers > 1 else None
+    converted = invalid = 0
+    try:
+        out.write("pt,x,y\n")
+        chunks = reader(args.input, args.chunk_size)
+        for results_df, errors in iter_traverse(chunks, args.ref_x, args.ref_y, processor, args.precision):
+            results_df[['Row', 'X_Coordinate', 'Y_Coordinate']].to_csv(
+                out, header=False, index=False, float_format='%.3f', lineterminator='\n'
+            )
+            converted += len(results_df)
+            invalid += len(errors)
+            if not args.quiet:
+                for error in errors:
+                    print(error, file=sys.stderr)
+    finally:
+        if processor is not None:
+            processor.close()
+    return converted, invalid
+
+
+def convert_multi(args, out):
+    """Compute every traverse of a grouped CSV at once into `out` (and the summary file)"""
+    batch_data = pd.read_csv(args.input, dtype={'Azimuth': str}, skipinitialspace=True)
+    results_df, summary_df, errors = calculate_traverses(batch_data, args.ref_x, args.ref_y, args.precision)
+    out.write("traverse,pt,x,y\n")
+    results_df[['Traverse', 'Row', 'X_Coordinate', 'Y_Coordinate']].to_csv(
+        out, header=False, index=False, float_format='%.3f', lineterminator='\n'
+    )
+    if args.summary:
+        summary_df.to_csv(args.summary, index=False, lineterminator='\n')
+    if not args.quiet:
+        for error in errors:
+            print(error, file=sys.stderr)
+    return len(results_df), len(errors)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.chunk_size < 1 or args.workers < 1:
+        print("Error: --chunk-size and --workers must be positive", file=sys.stderr)
+        return 2
+    if not Path(args.input).exists():
+        print(f"Error: {args.input} not found!", file=sys.stderr)
+        return 1
+
+    if args.summary and not args.multi:
+        print("Error: --summary requires --multi", file=sys.stderr)
+        return 2
+    if args.workers > 1 and not args.multi and not AsyncProcessor(args.workers).use_pool(args.chunk_size):
+        print(f"Warning: --workers has no effect with --chunk-size {args.chunk_size} on {os.cpu_count()} CPU(s) "
+              f"(the process pool needs more than one CPU and chunks of {PARALLEL_MIN_LEGS} legs)",
+              file=sys.stderr)
+
+    run = convert_multi if args.multi else convert
+    try:
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8', newline='') as out:
+                converted, invalid = run(args, out)
+        else:
+            converted, invalid = run(args, sys.stdout)
+    except KeyError as e:
+        print(f"Error: {args.input} is missing the column {e}", file=sys.stderr)
+        return 1
+    except ValueError as e:
+        print(f"Error: {args.input} could not be read: {e}", file=sys.stderr)
+        return 1
+
+    print(f"✅ {converted} points converted, {invalid} invalid rows", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
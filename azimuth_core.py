@@ -0,0 +1,2282 @@
+"""
+Núcleo de cálculo del Convertidor de Azimut.
+
+Funciones puras (sin Streamlit ni efectos de interfaz) para analizar azimuts,
+calcular poligonales, áreas y exportar coordenadas. Solo depende de numpy y
+pandas (pyarrow, si está instalado, acelera parse_dms_column), por lo que se
+puede importar desde servidores de lotes, cuadernos o procesos de trabajo sin
+el coste de arranque de la aplicación.
+"""
+
+import concurrent.futures
+import contextlib
+import hashlib
+import io
+import itertools
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Opcional: análisis vectorizado de azimuts (llega instalado con streamlit)
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    pa = pc = None
+
+# Tramos por bloque del motor de poligonales (serie y paralelo usan el mismo valor)
+TRAVERSE_CHUNK_SIZE = 65536
+
+# 🚀 PERFORMANCE: Mínimo de tramos para usar el pool de procesos. Medido: cada
+# llamada al pool cuesta ~8 ms fijos más ~60 ns por tramo de envío entre
+# procesos, frente a ~90 ns por tramo de cálculo; por debajo de 16 bloques el
+# reparto no compensa ni con 4 procesos
+PARALLEL_MIN_LEGS = 16 * TRAVERSE_CHUNK_SIZE
+
+def azimuth_to_coordinates(azimuth, distance, ref_x=0.0, ref_y=0.0, azimuth_convention="north"):
+    """Convert azimuth and distance to X,Y coordinates using Excel formulas - MEJORADO"""
+    
+    # Validación de entrada mejorada
+    if not isinstance(azimuth, (int, float)) or not isinstance(distance, (int, float)):
+        raise ValueError("Azimuth y distancia deben ser números")
+    
+    if distance < 0:
+        raise ValueError("La distancia no puede ser negativa")
+    
+    # Normalizar azimuth al rango 0-360 grados
+    azimuth = azimuth % 360
+    
+    # Manejo de casos especiales para distancias muy pequeñas
+    if distance < 1e-10:
+        return round(ref_x, 6), round(ref_y, 6)
+    
+    azimuth_rad = math.radians(azimuth)
+    
+    # Cálculo con precisión mejorada
+    x_offset = math.sin(azimuth_rad) * distance
+    y_offset = distance * math.cos(azimuth_rad)
+    
+    x = ref_x + x_offset
+    y = ref_y + y_offset
+    
+    # Redondeo adaptativo basado en la magnitud
+    if abs(x) > 1000 or abs(y) > 1000:
+        precision = 3
+    else:
+        precision = 6
+    
+    return round(x, precision), round(y, precision)
+def _round_adaptive(x, y):
+    """Redondeo adaptativo vectorizado (misma regla que azimuth_to_coordinates)"""
+    coarse = (np.abs(x) > 1000) | (np.abs(y) > 1000)
+    x = np.where(coarse, np.round(x, 3), np.round(x, 6))
+    y = np.where(coarse, np.round(y, 3), np.round(y, 6))
+    return x, y
+
+# Pares de columnas (X, Y) que round_coordinates redondea juntos
+COORDINATE_COLUMN_PAIRS = (('Reference_X', 'Reference_Y'), ('X_Coordinate', 'Y_Coordinate'),
+                           ('Adjusted_X', 'Adjusted_Y'), ('Start_X', 'Start_Y'))
+
+def round_coordinates(frame):
+    """Copia de una tabla de resultados con el redondeo adaptativo aplicado a sus
+    coordenadas; para mostrar o exportar resultados calculados con precision='high'"""
+    frame = frame.copy()
+    for column_x, column_y in COORDINATE_COLUMN_PAIRS:
+        if column_x in frame and column_y in frame:
+            frame[column_x], frame[column_y] = _round_adaptive(frame[column_x].to_numpy(dtype=np.float64),
+                                                               frame[column_y].to_numpy(dtype=np.float64))
+    for column in ('Correction_X', 'Correction_Y'):
+        if column in frame:
+            frame[column] = np.round(frame[column].to_numpy(dtype=np.float64), 6)
+    return frame
+
+# Modos de cálculo: 'standard' redondea cada vértice (3 o 6 decimales);
+# 'high' usa sumas compensadas y guarda float64 completo (se redondea al mostrar/exportar)
+PRECISION_MODES = ('standard', 'high')
+
+def compensated_cumsum(values):
+    """Sumas de prefijos con compensación de errores (TwoSum vectorizado).
+
+    El error de redondeo de cada suma parcial de np.cumsum se obtiene de forma
+    exacta con TwoSum y se acumula aparte, así que el error ya no crece con el
+    número de tramos. Cuesta unas pocas operaciones vectorizadas más que np.cumsum.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    sums = np.cumsum(values)
+    previous = np.concatenate(([0.0], sums[:-1]))
+    virtual = sums - previous
+    errors = (previous - (sums - virtual)) + (values - virtual)
+    return sums + np.cumsum(errors)
+
+def _traverse_chunk_offsets(azimuths, distances, compensated=False):
+    """Desplazamientos acumulados de un bloque de tramos, medidos desde su inicio"""
+    azimuth_rad = np.radians(np.mod(azimuths, 360.0))
+    cumsum = compensated_cumsum if compensated else np.cumsum
+    return cumsum(np.sin(azimuth_rad) * distances), cumsum(distances * np.cos(azimuth_rad))
+
+def traverse_coordinates(azimuths, distances, ref_x=0.0, ref_y=0.0, processor=None, rounding=True,
+                         compensated=False):
+    """Calcular todos los vértices de una poligonal en una sola pasada vectorizada.
+
+    Recibe arrays de azimuts (grados decimales) y distancias; devuelve los arrays
+    X, Y del punto final de cada tramo, encadenados desde el punto de referencia.
+
+    La poligonal se divide siempre en bloques de TRAVERSE_CHUNK_SIZE tramos y los
+    bloques se unen con una suma de prefijos de sus desplazamientos finales, de
+    modo que el resultado es idéntico bit a bit con o sin `processor` (AsyncProcessor).
+    Con rounding=False se devuelven los valores sin el redondeo adaptativo y con
+    compensated=True las sumas usan compensated_cumsum.
+    """
+    azimuths = np.asarray(azimuths, dtype=np.float64)
+    distances = np.asarray(distances, dtype=np.float64)
+    if len(azimuths) == 0:
+        return np.empty(0), np.empty(0)
+
+    bounds = range(0, len(azimuths), TRAVERSE_CHUNK_SIZE)
+    azimuth_chunks = [azimuths[i:i + TRAVERSE_CHUNK_SIZE] for i in bounds]
+    distance_chunks = [distances[i:i + TRAVERSE_CHUNK_SIZE] for i in bounds]
+
+    if processor is not None and len(azimuth_chunks) > 1:
+        chunks = processor.map_chunks(azimuth_chunks, distance_chunks, compensated)
+    else:
+        chunks = [_traverse_chunk_offsets(a, d, compensated) for a, d in zip(azimuth_chunks, distance_chunks)]
+
+    # Punto de inicio de cada bloque = referencia + suma de los finales anteriores
+    cumsum = compensated_cumsum if compensated else np.cumsum
+    start_x = cumsum([float(ref_x)] + [dx[-1] for dx, _ in chunks[:-1]])
+    start_y = cumsum([float(ref_y)] + [dy[-1] for _, dy in chunks[:-1]])
+    x = np.concatenate([sx + dx for sx, (dx, _) in zip(start_x, chunks)])
+    y = np.concatenate([sy + dy for sy, (_, dy) in zip(start_y, chunks)])
+
+    if rounding:
+        return _round_adaptive(x, y)
+    return x, y
+
+RESULT_COLUMNS = ['Row', 'Azimuth_Original', 'Azimuth_Decimal', 'Distance',
+                  'Reference_X', 'Reference_Y', 'X_Coordinate', 'Y_Coordinate']
+
+def calculate_traverse(batch_data, ref_x, ref_y, azimuth_convention="excel", processor=None,
+                       precision='standard'):
+    """Convertir una tabla Azimuth/Distance completa en un DataFrame de resultados.
+
+    Devuelve (results_df, errors). Las filas inválidas se omiten y la poligonal
+    continúa desde el último vértice válido. Con `processor` los bloques se
+    calculan en paralelo. Con precision='high' las coordenadas no se redondean
+    (ver round_coordinates).
+    """
+    results_df, errors, _ = _calculate_traverse(batch_data, ref_x, ref_y, processor, precision)
+    return results_df, errors
+
+def iter_traverse(chunks, ref_x, ref_y, processor=None, precision='standard'):
+    """Calcular una poligonal leída por bloques (p. ej. pd.read_csv(chunksize=...)).
+
+    Genera (results_df, errors) por cada bloque. El último vértice, sin
+    redondear, se arrastra como punto de partida del bloque siguiente, así que
+    la memoria usada no depende del largo total de la poligonal.
+    """
+    for chunk in chunks:
+        results_df, errors, (ref_x, ref_y) = _calculate_traverse(chunk, ref_x, ref_y, processor, precision)
+        yield results_df, errors
+
+def _check_precision(precision):
+    if precision not in PRECISION_MODES:
+        raise ValueError(f"Modo de precisión desconocido: {precision}")
+    return precision == 'high'
+
+def _calculate_traverse(batch_data, ref_x, ref_y, processor=None, precision='standard'):
+    """Núcleo de calculate_traverse; devuelve además el vértice final sin redondear"""
+    high = _check_precision(precision)
+    if batch_data is None or batch_data.empty:
+        return pd.DataFrame(columns=RESULT_COLUMNS), [], (ref_x, ref_y)
+
+    with metrics.stage('parse', rows=len(batch_data)):
+        rows, raw_azimuths, azimuths, distances, valid, errors = _parse_legs(batch_data)
+    azimuths = azimuths[valid]
+    distances = distances[valid]
+    with metrics.stage('traverse', rows=len(azimuths)):
+        x, y = traverse_coordinates(azimuths, distances, ref_x, ref_y, processor, rounding=False, compensated=high)
+    end = (x[-1], y[-1]) if len(x) else (ref_x, ref_y)
+
+    # La referencia de cada tramo es el vértice anterior
+    x, y = np.concatenate(([ref_x], x)), np.concatenate(([ref_y], y))
+    if not high:
+        x, y = _round_adaptive(x, y)
+    reference_x, reference_y = x[:-1], y[:-1]
+    x, y = x[1:], y[1:]
+
+    results_df = pd.DataFrame({
+        'Row': rows[valid],
+        'Azimuth_Original': raw_azimuths[valid].astype(str),
+        'Azimuth_Decimal': azimuths,
+        'Distance': distances,
+        'Reference_X': reference_x,
+        'Reference_Y': reference_y,
+        'X_Coordinate': x,
+        'Y_Coordinate': y
+    }, columns=RESULT_COLUMNS)
+    return results_df, errors, end
+
+def _parse_legs(batch_data):
+    """Analizar y validar una tabla Azimuth/Distance de forma vectorizada.
+
+    Devuelve (rows, raw_azimuths, azimuths, distances, valid, errors) con los
+    números de fila en base 1 y un mensaje por cada fila inválida.
+    """
+    rows = np.asarray(batch_data.index, dtype=np.int64) + 1
+    raw_azimuths = batch_data['Azimuth'].to_numpy(dtype=object)
+    azimuths, bad_azimuth = parse_dms_column(raw_azimuths)
+    distances = pd.to_numeric(batch_data['Distance'], errors='coerce').to_numpy(dtype=np.float64)
+
+    out_of_range = ~bad_azimuth & ((azimuths < 0) | (azimuths > 360))
+    bad_distance = ~bad_azimuth & ~out_of_range & (np.isnan(distances) | (distances < 0))
+    valid = ~(bad_azimuth | out_of_range | bad_distance)
+
+    errors = []
+    for i in np.flatnonzero(~valid):
+        if bad_azimuth[i]:
+            errors.append(f"Fila {rows[i]}: Formato de azimut inválido '{raw_azimuths[i]}'")
+        elif out_of_range[i]:
+            errors.append(f"Fila {rows[i]}: Azimut inválido {azimuths[i]}°")
+        elif np.isnan(distances[i]):
+            errors.append(f"Fila {rows[i]}: Distancia inválida '{batch_data['Distance'].iloc[i]}'")
+        else:
+            errors.append(f"Fila {rows[i]}: La distancia no puede ser negativa")
+    return rows, raw_azimuths, azimuths, distances, valid, errors
+
+def validate_legs(batch_data):
+    """Validar una tabla Azimuth/Distance para agregarla de una vez a los tramos.
+
+    Devuelve (legs, errors): legs tiene solo las filas válidas (azimut como
+    texto original, distancia float64), lista para PointStore.extend, y errors
+    un mensaje por fila rechazada. Con split_leg_lines los números de fila son
+    los de las líneas del texto.
+    """
+    if batch_data is None or batch_data.empty:
+        return pd.DataFrame({'Azimuth': np.empty(0, dtype=object), 'Distance': np.empty(0)}), []
+    _, raw_azimuths, _, distances, valid, errors = _parse_legs(batch_data)
+    legs = pd.DataFrame({'Azimuth': [str(text).strip() for text in raw_azimuths[valid]],
+                         'Distance': distances[valid]})
+    return legs, errors
+
+MULTI_RESULT_COLUMNS = ['Traverse'] + RESULT_COLUMNS
+TRAVERSE_SUMMARY_COLUMNS = ['Traverse', 'Start_X', 'Start_Y', 'Vertices', 'Perimeter',
+                            'Closure_X', 'Closure_Y', 'Closure', 'Area']
+
+def calculate_traverses(batch_data, ref_x=0.0, ref_y=0.0, precision='standard'):
+    """Calcular muchas poligonales a la vez, agrupadas por la columna 'Traverse'.
+
+    Las columnas opcionales 'Start_X'/'Start_Y' dan el punto de partida de cada
+    poligonal (basta con indicarlo en una de sus filas; si falta se usa
+    ref_x/ref_y). Todas las poligonales se calculan con una única suma
+    acumulada segmentada, sin bucles de Python por poligonal; las filas de una
+    misma poligonal no necesitan ser contiguas y conservan su orden.
+
+    Devuelve (results_df, summary_df, errors): results_df tiene
+    MULTI_RESULT_COLUMNS y summary_df una fila por poligonal con el número de
+    vértices, el perímetro, el error de cierre (respecto al punto de partida) y
+    el área. Con precision='high' la suma es compensada y no se redondea.
+    """
+    high = _check_precision(precision)
+    if batch_data is None or batch_data.empty:
+        return pd.DataFrame(columns=MULTI_RESULT_COLUMNS), pd.DataFrame(columns=TRAVERSE_SUMMARY_COLUMNS), []
+
+    codes, traverse_ids = pd.factorize(batch_data['Traverse'], sort=False)
+    if (codes < 0).any():
+        raise ValueError("Falta el identificador de poligonal (columna 'Traverse') en alguna fila")
+    count = len(traverse_ids)
+
+    # Punto de partida: primer valor informado de cada poligonal
+    start_x = np.full(count, float(ref_x))
+    start_y = np.full(count, float(ref_y))
+    for column, start in (('Start_X', start_x), ('Start_Y', start_y)):
+        if column in batch_data:
+            given = pd.Series(pd.to_numeric(batch_data[column], errors='coerce').to_numpy()).groupby(codes).first()
+            given = given.dropna()
+            start[given.index.to_numpy()] = given.to_numpy()
+
+    rows, raw_azimuths, azimuths, distances, valid, errors = _parse_legs(batch_data)
+
+    # Ordenar de forma estable por poligonal y quedarse con los tramos válidos
+    order = np.argsort(codes, kind='stable')
+    order = order[valid[order]]
+    codes = codes[order]
+    distances = distances[order]
+    offsets = _leg_offsets(azimuths[order], distances)
+
+    # Suma acumulada segmentada: restar el acumulado previo al inicio de cada poligonal
+    vertices = np.bincount(codes, minlength=count)
+    first = np.concatenate(([0], np.cumsum(vertices)[:-1]))
+    if high:
+        cumulative = np.column_stack((compensated_cumsum(offsets[:, 0]), compensated_cumsum(offsets[:, 1])))
+    else:
+        cumulative = np.cumsum(offsets, axis=0)
+    before = np.concatenate((np.zeros((1, 2)), cumulative))[first]
+    relative = cumulative - np.repeat(before, vertices, axis=0)
+    x = start_x[codes] + relative[:, 0]
+    y = start_y[codes] + relative[:, 1]
+
+    # La referencia de cada tramo es el vértice anterior (o el punto de partida);
+    # el recorte deja los arrays vacíos si ningún tramo es válido
+    reference_x = np.concatenate(([np.nan], x[:-1]))[:len(x)]
+    reference_y = np.concatenate(([np.nan], y[:-1]))[:len(y)]
+    starts = first[vertices > 0]
+    reference_x[starts] = start_x[vertices > 0]
+    reference_y[starts] = start_y[vertices > 0]
+
+    # Cierre (último vértice - partida) y área por la fórmula de Shoelace sobre
+    # coordenadas relativas a la partida (más precisa lejos del origen)
+    closure = np.zeros((count, 2))
+    closure[vertices > 0] = relative[(first + vertices - 1)[vertices > 0]]
+    closure_x, closure_y = closure[:, 0], closure[:, 1]
+    same = codes[1:] == codes[:-1]
+    cross = relative[:-1, 0] * relative[1:, 1] - relative[1:, 0] * relative[:-1, 1]
+    area = np.abs(np.bincount(codes[1:][same], weights=cross[same], minlength=count)) / 2.0
+
+    if not high:
+        reference_x, reference_y = _round_adaptive(reference_x, reference_y)
+        x, y = _round_adaptive(x, y)
+    results_df = pd.DataFrame({
+        'Traverse': traverse_ids[codes],
+        'Row': rows[order],
+        'Azimuth_Original': raw_azimuths[order].astype(str),
+        'Azimuth_Decimal': azimuths[order],
+        'Distance': distances,
+        'Reference_X': reference_x,
+        'Reference_Y': reference_y,
+        'X_Coordinate': x,
+        'Y_Coordinate': y
+    }, columns=MULTI_RESULT_COLUMNS)
+    summary_df = pd.DataFrame({
+        'Traverse': traverse_ids,
+        'Start_X': start_x,
+        'Start_Y': start_y,
+        'Vertices': vertices,
+        'Perimeter': np.bincount(codes, weights=distances, minlength=count),
+        'Closure_X': closure_x,
+        'Closure_Y': closure_y,
+        'Closure': np.hypot(closure_x, closure_y),
+        'Area': area
+    }, columns=TRAVERSE_SUMMARY_COLUMNS)
+    summary_df[TRAVERSE_SUMMARY_COLUMNS[4:]] = summary_df[TRAVERSE_SUMMARY_COLUMNS[4:]].round(6)
+    return results_df, summary_df, errors
+
+ADJUSTMENT_METHODS = ('bowditch', 'transit')
+ADJUSTMENT_COLUMNS = ['Row', 'Correction_X', 'Correction_Y', 'Adjusted_X', 'Adjusted_Y']
+
+def _cumulative_share(weights):
+    """Fracción acumulada de los pesos (0 si todos los pesos son cero)"""
+    total = weights.sum()
+    if total <= 0:
+        return np.zeros_like(weights)
+    return np.cumsum(weights) / total
+
+def _unrounded_traverse(results_df, ref_x, ref_y, high):
+    """Desplazamientos (dx, dy) y vértices (x, y) sin redondear, recalculados a
+    partir de Azimuth_Decimal y Distance de una tabla de resultados"""
+    offsets = _leg_offsets(results_df['Azimuth_Decimal'].to_numpy(dtype=np.float64),
+                           results_df['Distance'].to_numpy(dtype=np.float64))
+    dx, dy = offsets[:, 0], offsets[:, 1]
+    cumsum = compensated_cumsum if high else np.cumsum
+    return dx, dy, ref_x + cumsum(dx), ref_y + cumsum(dy)
+
+def traverse_misclosure(results_df, ref_x, ref_y, close_x=None, close_y=None, precision='standard'):
+    """Error de cierre (misclosure_x, misclosure_y) de una poligonal.
+
+    Se calcula con los vértices sin redondear, igual que en adjust_traverse, así
+    que coincide con el error que compensa el ajuste aunque la tabla de
+    resultados tenga las coordenadas redondeadas.
+    """
+    high = _check_precision(precision)
+    close_x = ref_x if close_x is None else close_x
+    close_y = ref_y if close_y is None else close_y
+    _, _, x, y = _unrounded_traverse(results_df, ref_x, ref_y, high)
+    return float(x[-1] if len(x) else ref_x) - close_x, float(y[-1] if len(y) else ref_y) - close_y
+
+def adjust_traverse(results_df, ref_x, ref_y, method='bowditch', close_x=None, close_y=None,
+                    precision='standard'):
+    """Compensar el error de cierre de una poligonal en una sola pasada vectorizada.
+
+    method='bowditch' (regla de la brújula) reparte la corrección en proporción
+    a la distancia acumulada; method='transit' (regla del tránsito) en proporción
+    a |ΔX| y |ΔY| acumulados. La poligonal debe cerrar en (close_x, close_y),
+    por defecto el punto de referencia.
+
+    Devuelve (adjusted_df, summary): adjusted_df tiene una fila por vértice de
+    results_df con ADJUSTMENT_COLUMNS; summary incluye el error de cierre, el
+    perímetro y la precisión relativa (perímetro / error lineal, es decir 1:N).
+    Con precision='high' las sumas son compensadas y no se redondea.
+    """
+    if method not in ADJUSTMENT_METHODS:
+        raise ValueError(f"Método de ajuste desconocido: {method}")
+    high = _check_precision(precision)
+    close_x = ref_x if close_x is None else close_x
+    close_y = ref_y if close_y is None else close_y
+
+    distances = results_df['Distance'].to_numpy(dtype=np.float64)
+    dx, dy, x, y = _unrounded_traverse(results_df, ref_x, ref_y, high)
+
+    misclosure_x = float(x[-1] if len(x) else ref_x) - close_x
+    misclosure_y = float(y[-1] if len(y) else ref_y) - close_y
+    linear_misclosure = math.hypot(misclosure_x, misclosure_y)
+    perimeter = float(distances.sum())
+
+    if method == 'bowditch':
+        share_x = share_y = _cumulative_share(distances)
+    else:
+        share_x, share_y = _cumulative_share(np.abs(dx)), _cumulative_share(np.abs(dy))
+    correction_x = -misclosure_x * share_x
+    correction_y = -misclosure_y * share_y
+    adjusted_x, adjusted_y = x + correction_x, y + correction_y
+    if not high:
+        adjusted_x, adjusted_y = _round_adaptive(adjusted_x, adjusted_y)
+        correction_x, correction_y = np.round(correction_x, 6), np.round(correction_y, 6)
+
+    adjusted_df = pd.DataFrame({
+        'Row': results_df['Row'].to_numpy(),
+        'Correction_X': correction_x,
+        'Correction_Y': correction_y,
+        'Adjusted_X': adjusted_x,
+        'Adjusted_Y': adjusted_y
+    }, columns=ADJUSTMENT_COLUMNS)
+    summary = {
+        'method': method,
+        'misclosure_x': misclosure_x,
+        'misclosure_y': misclosure_y,
+        'linear_misclosure': linear_misclosure,
+        'perimeter': perimeter,
+        'precision': perimeter / linear_misclosure if linear_misclosure > 0 else math.inf
+    }
+    return adjusted_df, summary
+
+# Formatos GMS (cada patrón aporta 3 grupos: grados, minutos, segundos).
+# Solo dígitos ASCII ([0-9], no \d).
+# - Separados: todo el texto son tres números con el mismo separador entre
+#   ellos: espacios, guion, dos puntos o guion bajo ('26 56 7', '90-0-0')
+# - Con símbolos: °'" o d/m/s en cualquier parte del texto ('N 45°30'15" E')
+# Los dos formatos se excluyen (los separados no llevan símbolos), así que el
+# orden no cambia el resultado; el primero, anclado y sin búsqueda, es el
+# habitual y el más rápido.
+_DMS_NUMBER = r'([0-9]+(?:\.[0-9]+)?)'
+DMS_SEPARATED_PATTERN = re.compile(rf'{_DMS_NUMBER}(?:\s+|([-:_])){_DMS_NUMBER}(?(2)\2|\s+){_DMS_NUMBER}')
+DMS_SYMBOL_PATTERN = re.compile(rf'{_DMS_NUMBER}[°d]\s*{_DMS_NUMBER}[\'m]\s*{_DMS_NUMBER}')
+# Azimut decimal simple. Sustituye a float(): no admite '1_0', 'nan', 'inf'
+# ni dígitos Unicode
+DECIMAL_PATTERN = re.compile(r'[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?')
+_DMS_NO_MATCH = (None, None, None)
+# Los formatos sin símbolos en RE2 (pyarrow.compute) para parse_dms_column: sin
+# retroreferencias, una alternativa por separador. El \s de RE2 solo cubre
+# espacios ASCII, así que un texto que no coincide aquí se revisa con _split_azimuth
+_ARROW_NUMBER = r'[0-9]+(?:\.[0-9]+)?'
+ARROW_SEPARATED_PATTERN = (rf'^{_ARROW_NUMBER}(?:\s+{_ARROW_NUMBER}\s+|-{_ARROW_NUMBER}-|'
+                           rf':{_ARROW_NUMBER}:|_{_ARROW_NUMBER}_){_ARROW_NUMBER}$')
+ARROW_DECIMAL_PATTERN = f'^{DECIMAL_PATTERN.pattern}$'
+# 🚀 PERFORMANCE: Mínimo de azimuts para la pasada de pyarrow. Medido: ~0.3 ms
+# fijos por las llamadas a pyarrow; por debajo de ~250 valores Python es más rápido
+ARROW_MIN_AZIMUTHS = 256
+
+def _split_azimuth(text, separated=DMS_SEPARATED_PATTERN.fullmatch, symbols=DMS_SYMBOL_PATTERN.search,
+                   decimal=DECIMAL_PATTERN.fullmatch):
+    """Textos (grados, minutos, segundos) de un azimut ya normalizado; un decimal
+    simple da (texto, '0', '0') y un valor inválido _DMS_NO_MATCH.
+    parse_dms_to_decimal y parse_dms_column validan solo a través de esta función."""
+    if match := separated(text):
+        return match.group(1, 3, 4)
+    if match := symbols(text):
+        return match.groups()
+    if decimal(text):
+        return text, '0', '0'
+    return _DMS_NO_MATCH
+
+def _normalize_azimuth(value):
+    return str(value).strip().replace(',', '.')
+
+def parse_dms_to_decimal(dms_string):
+    """Convert degrees-minutes-seconds format to decimal degrees"""
+    degrees, minutes, seconds = _split_azimuth(_normalize_azimuth(dms_string))
+    if degrees is None:
+        return None
+    return (((float(seconds) / 60.0) + float(minutes)) / 60.0) + float(degrees)
+
+def _parse_dms_arrow(texts):
+    """Decimales de un pa.StringArray con los formatos separados y decimales
+    simples (RE2 y conversión a float64 en C++); NaN en el resto"""
+    normalized = pc.replace_substring(pc.ascii_trim_whitespace(texts), ',', '.')
+    decimals = np.full(len(texts), np.nan)
+    separated = np.flatnonzero(pc.match_substring_regex(normalized, ARROW_SEPARATED_PATTERN)
+                               .to_numpy(zero_copy_only=False))
+    # Ya validados: un solo tipo de separador y sin signos, se parten por espacios
+    parts = normalized.take(separated)
+    for separator in '-:_':
+        parts = pc.replace_substring(parts, separator, ' ')
+    parts = pc.cast(pc.list_flatten(pc.ascii_split_whitespace(parts)), pa.float64()).to_numpy()
+    degrees, minutes, seconds = parts.reshape(-1, 3).T
+    decimals[separated] = (((seconds / 60.0) + minutes) / 60.0) + degrees
+    simple = np.flatnonzero(pc.match_substring_regex(normalized, ARROW_DECIMAL_PATTERN)
+                            .to_numpy(zero_copy_only=False))
+    # Misma fórmula que con minutos y segundos '0' ('-0' da 0.0, no -0.0)
+    decimals[simple] = 0.0 + pc.cast(normalized.take(simple), pa.float64()).to_numpy()
+    return decimals
+
+def parse_dms_column(values):
+    """Analizar una columna completa de azimuts en una sola pasada.
+
+    Acepta los mismos formatos que parse_dms_to_decimal (misma validación,
+    _split_azimuth). Devuelve (decimales, invalid) donde decimales es un array
+    float64 y invalid una máscara booleana de las filas que no se pudieron analizar.
+    """
+    # 🚀 PERFORMANCE: Cada texto distinto se analiza una sola vez. Se agrupa por
+    # str(valor), como lo ve parse_dms_to_decimal (1, 1.0 y True no se confunden)
+    texts = [value if type(value) is str else str(value) for value in values]
+    encoded = None
+    if PYARROW_AVAILABLE and len(texts) >= ARROW_MIN_AZIMUTHS:
+        # Sustitutos sueltos ('\ud800') no son UTF-8: se usa la ruta de Python
+        with contextlib.suppress(UnicodeEncodeError, pa.ArrowException):
+            encoded = pa.array(texts, pa.string()).dictionary_encode()
+    if encoded is not None:
+        # 🚀 PERFORMANCE: Los formatos habituales se analizan vectorizados con
+        # pyarrow; a Python solo llegan los símbolos °'", espacios Unicode e inválidos
+        codes = encoded.indices.to_numpy()
+        decimals = _parse_dms_arrow(encoded.dictionary)
+        pending = np.flatnonzero(np.isnan(decimals))
+        pending_texts = encoded.dictionary.take(pending).to_pylist()
+    else:
+        # Columnas cortas o sin pyarrow: todo con parse_dms_to_decimal
+        codes, pending_texts = pd.factorize(np.array(texts, dtype=object))
+        decimals = np.full(len(pending_texts), np.nan)
+        pending = np.arange(len(pending_texts))
+    # None (inválido) pasa a NaN al convertir a float64
+    decimals[pending] = np.array([parse_dms_to_decimal(text) for text in pending_texts], dtype=np.float64)
+    decimals = decimals[codes]
+    return decimals, np.isnan(decimals)
+# Línea "azimut distancia": la distancia es el último campo (separado por
+# espacios, tabuladores o ';'); todo lo anterior es el azimut
+LEG_LINE_PATTERN = re.compile(r'^(.+?)[\s;]+([^\s;]+)$')
+
+def split_leg_lines(lines, first_line=1):
+    """Separar líneas de texto "azimut distancia" en un DataFrame Azimuth/Distance.
+
+    El azimut puede venir en cualquier formato de parse_dms_to_decimal y la
+    distancia admite coma decimal. El índice conserva el número de línea (base 0,
+    a partir de `first_line`) para que los errores indiquen la línea original;
+    las líneas vacías se omiten y las que no tienen dos campos quedan sin distancia.
+    """
+    index, azimuths, distances = [], [], []
+    match_line = LEG_LINE_PATTERN.match
+    for number, line in enumerate(lines, start=first_line - 1):
+        line = line.strip()
+        if not line:
+            continue
+        match = match_line(line)
+        index.append(number)
+        if match:
+            azimuths.append(match.group(1))
+            distances.append(match.group(2).replace(',', '.'))
+        else:
+            azimuths.append(line)
+            distances.append(None)
+    return pd.DataFrame({'Azimuth': azimuths, 'Distance': distances}, index=index, dtype=object)
+
+def validate_azimuth(azimuth):
+    """Validate azimuth value is within 0-360 degrees"""
+    return 0 <= azimuth <= 360
+
+# 🚀 PERFORMANCE: Parallel Processing Pool
+class AsyncProcessor:
+    """Procesamiento paralelo por bloques (pool de procesos) para poligonales grandes.
+
+    Cada bloque calcula sus desplazamientos locales en un proceso distinto; el
+    encadenamiento se resuelve después con una suma de prefijos de los finales
+    de bloque (ver traverse_coordinates). Con un solo núcleo o con menos de
+    `min_legs` tramos los bloques se calculan en serie en el propio proceso
+    (mismo resultado) y el pool no llega a crearse.
+    """
+    
+    def __init__(self, max_workers=None, min_legs=PARALLEL_MIN_LEGS):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_legs = min_legs
+        self._executor = None
+    
+    def __enter__(self):
+        if self.parallel:
+            self._get_executor()
+        return self
+    
+    @property
+    def parallel(self):
+        """Hay más de un núcleo para los procesos (con uno solo el pool solo añade coste)"""
+        return min(self.max_workers, os.cpu_count() or 1) > 1
+    
+    def use_pool(self, legs):
+        """El pool compensa para una poligonal de `legs` tramos"""
+        return self.parallel and legs >= self.min_legs
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+    
+    def map_chunks(self, azimuth_chunks, distance_chunks, compensated=False):
+        """Calcular los desplazamientos locales de cada bloque en paralelo"""
+        if not self.use_pool(sum(len(chunk) for chunk in azimuth_chunks)):
+            return [_traverse_chunk_offsets(a, d, compensated) for a, d in zip(azimuth_chunks, distance_chunks)]
+        return list(self._get_executor().map(_traverse_chunk_offsets, azimuth_chunks, distance_chunks,
+                                             [compensated] * len(azimuth_chunks)))
+    
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+# Columnas de los almacenes de la sesión
+POINT_COLUMNS = {'X': np.float64, 'Y': np.float64}
+LEG_COLUMNS = {'Azimuth': object, 'Distance': np.float64}
+
+class PointStore:
+    """Almacén compacto de columnas NumPy preasignadas con crecimiento amortizado.
+
+    Agregar una fila es O(1) amortizado (la capacidad se duplica al llenarse) y
+    la memoria por fila es fija: 8 bytes por columna numérica. La vista como
+    DataFrame se construye solo cuando se pide y se reutiliza hasta el siguiente
+    cambio; `version` aumenta con cada modificación.
+    """
+    __slots__ = ('_columns', '_size', '_version', '_frame', '_fingerprint')
+
+    def __init__(self, columns, capacity=64):
+        capacity = max(int(capacity), 1)
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in columns.items()}
+        self._size = 0
+        self._version = 0
+        self._frame = None
+        self._fingerprint = None
+
+    @classmethod
+    def from_frame(cls, frame, columns):
+        """Crear un almacén a partir de un DataFrame con las columnas dadas"""
+        store = cls(columns, capacity=len(frame))
+        store.extend(frame)
+        return store
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, name):
+        """Vista de solo las filas ocupadas de una columna"""
+        return self._columns[name][:self._size]
+
+    @property
+    def empty(self):
+        return self._size == 0
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def capacity(self):
+        return len(next(iter(self._columns.values())))
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self._columns.values())
+
+    def _reserve(self, size):
+        capacity = self.capacity
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+
+    def _changed(self):
+        self._version += 1
+        self._frame = None
+        self._fingerprint = None
+
+    def append(self, **values):
+        """Agregar una fila (un valor por columna)"""
+        self._reserve(self._size + 1)
+        for name, column in self._columns.items():
+            column[self._size] = values[name]
+        self._size += 1
+        self._changed()
+
+    def extend(self, data):
+        """Agregar varias filas en una sola operación (DataFrame o dict de arrays)"""
+        count = len(data[next(iter(self._columns))])
+        if count == 0:
+            return
+        self._reserve(self._size + count)
+        for name, column in self._columns.items():
+            column[self._size:self._size + count] = np.asarray(data[name], dtype=column.dtype)
+        self._size += count
+        self._changed()
+
+    def set_row(self, index, **values):
+        """Modificar columnas de una fila existente"""
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        for name, value in values.items():
+            self._columns[name][index] = value
+        self._changed()
+
+    def insert(self, index, **values):
+        """Insertar una fila en la posición `index` (desplaza las siguientes)"""
+        if not 0 <= index <= self._size:
+            raise IndexError(index)
+        self._reserve(self._size + 1)
+        for name, column in self._columns.items():
+            column[index + 1:self._size + 1] = column[index:self._size]
+            column[index] = values[name]
+        self._size += 1
+        self._changed()
+
+    def delete(self, index):
+        """Eliminar la fila `index`"""
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        for column in self._columns.values():
+            column[index:self._size - 1] = column[index + 1:self._size]
+        self._size -= 1
+        self._changed()
+
+    def replace(self, data):
+        """Sustituir todo el contenido"""
+        self._size = 0
+        self.extend(data)
+        self._changed()
+
+    def clear(self):
+        self._size = 0
+        self._changed()
+
+    def last(self):
+        """Última fila como dict"""
+        return {name: column[self._size - 1] for name, column in self._columns.items()}
+
+    def fingerprint(self):
+        """Huella del contenido (ver fingerprint); se calcula una vez por versión"""
+        if self._fingerprint is None:
+            self._fingerprint = fingerprint(*(self[name] for name in self._columns))
+        return self._fingerprint
+
+    def to_frame(self):
+        """Vista DataFrame (se reutiliza hasta la siguiente modificación)"""
+        if self._frame is None:
+            self._frame = pd.DataFrame({name: self[name] for name in self._columns})
+        return self._frame
+
+class FenwickTree:
+    """Árbol de Fenwick (índices binarios) para sumas de prefijos con actualización O(log n).
+
+    Trabaja sobre un array float64 de N filas (y una o más columnas, p. ej. dx, dy).
+    """
+    __slots__ = ('_tree',)
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        zeros = np.zeros((1,) + values.shape[1:])
+        cumulative = np.concatenate((zeros, np.cumsum(values, axis=0)))
+        # Construcción vectorizada O(n): tree[i] = suma de values[i - lowbit(i), i)
+        index = np.arange(1, len(values) + 1)
+        self._tree = np.concatenate((zeros, cumulative[index] - cumulative[index - (index & -index)]))
+
+    def __len__(self):
+        return len(self._tree) - 1
+
+    def add(self, index, delta):
+        """Sumar `delta` al valor de la posición `index` (base 0)"""
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        tree = self._tree
+        i = index + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, count):
+        """Suma de los primeros `count` valores"""
+        if not 0 <= count <= len(self):
+            raise IndexError(count)
+        tree = self._tree
+        total = np.zeros(tree.shape[1:])
+        i = count
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+class IncrementalTraverse:
+    """Poligonal editable: corregir un tramo actualiza los vértices siguientes en O(log n).
+
+    Guarda los desplazamientos (dx, dy) de cada tramo en un FenwickTree, de modo
+    que cambiar el azimut o la distancia de un tramo intermedio no obliga a
+    recalcular (ni volver a analizar) toda la poligonal; vertex(i) se obtiene con
+    una suma de prefijos O(log n). Insertar o eliminar tramos sigue siendo O(n):
+    desplaza los arrays y reconstruye el árbol con una suma acumulada vectorizada
+    (sin bucles de Python ni trigonometría de los demás tramos). Los tramos
+    inválidos se conservan con desplazamiento cero y se omiten en results_frame().
+
+    results_frame() se guarda y update() corrige en ella solo las filas desde el
+    tramo editado (el acumulado previo sale de una consulta O(log n) al árbol), en
+    lugar de repetir la suma acumulada de toda la poligonal.
+    """
+    __slots__ = ('ref_x', 'ref_y', '_raw', '_azimuths', '_distances', '_valid', '_offsets', '_tree',
+                 '_frame', '_frame_key')
+
+    def __init__(self, raw_azimuths, distances, ref_x=0.0, ref_y=0.0):
+        self.ref_x = float(ref_x)
+        self.ref_y = float(ref_y)
+        self._raw = np.array([str(a) for a in raw_azimuths], dtype=object)
+        self._azimuths, _ = parse_dms_column(self._raw)
+        self._distances = np.array(pd.to_numeric(pd.Series(distances, dtype=object), errors='coerce'), dtype=np.float64)
+        self._rebuild()
+
+    @classmethod
+    def from_frame(cls, batch_data, ref_x=0.0, ref_y=0.0):
+        """Crear a partir de una tabla Azimuth/Distance"""
+        return cls(batch_data['Azimuth'].to_numpy(dtype=object), batch_data['Distance'].to_numpy(), ref_x, ref_y)
+
+    def __len__(self):
+        return len(self._raw)
+
+    @property
+    def valid(self):
+        """Máscara de los tramos válidos"""
+        return self._valid
+
+    def _rebuild(self):
+        offsets = _leg_offsets(self._azimuths, self._distances)
+        self._valid = ~np.isnan(offsets[:, 0])
+        self._offsets = np.nan_to_num(offsets, nan=0.0)
+        self._reindex()
+
+    def _reindex(self):
+        """Reconstruir el árbol desde _offsets (O(n) vectorizado) y descartar la tabla guardada"""
+        self._tree = FenwickTree(self._offsets)
+        self._frame = None
+
+    def _check_index(self, index, end=0):
+        """IndexError si `index` no está en 0..len - 1 (0..len con end=1)"""
+        if not 0 <= index < len(self) + end:
+            raise IndexError(index)
+
+    @staticmethod
+    def _parse_leg(raw_azimuth, distance):
+        """Validar un tramo como lo hace calculate_traverse; ValueError si no es válido"""
+        azimuth = parse_dms_to_decimal(raw_azimuth)
+        if azimuth is None or math.isnan(azimuth):
+            raise ValueError(f"Formato de azimut inválido '{raw_azimuth}'")
+        if not validate_azimuth(azimuth):
+            raise ValueError(f"Azimut inválido {azimuth}°")
+        distance = float(distance)
+        if math.isnan(distance) or distance < 0:
+            raise ValueError("La distancia no puede ser negativa")
+        return azimuth, distance
+
+    def update(self, index, raw_azimuth, distance):
+        """Corregir el tramo `index` (base 0). O(log n)"""
+        self._check_index(index)
+        azimuth, distance = self._parse_leg(raw_azimuth, distance)
+        offset = _leg_offsets(np.array([azimuth]), np.array([distance]))[0]
+        self._tree.add(index, offset - self._offsets[index])
+        self._offsets[index] = offset
+        was_valid = self._valid[index]
+        self._valid[index] = True
+        self._raw[index] = str(raw_azimuth)
+        self._azimuths[index] = azimuth
+        self._distances[index] = distance
+        if self._frame is not None:
+            if was_valid:
+                self._patch_frame(index)
+            else:
+                # Aparece una fila nueva en la tabla: se reconstruye al pedirla
+                self._frame = None
+
+    def _patch_frame(self, index):
+        """Corregir en la tabla guardada las filas de los tramos index.. (O(n - index))"""
+        frame = self._frame
+        high = self._frame_key[0] == 'high'
+        position = int(np.searchsorted(frame['Row'].to_numpy(), index + 1))
+        valid = self._valid[index:]
+        if high:
+            # Partir del vértice anterior sin redondear y seguir con suma compensada
+            if position:
+                base_x = float(frame['X_Coordinate'].iat[position - 1])
+                base_y = float(frame['Y_Coordinate'].iat[position - 1])
+            else:
+                base_x, base_y = self.ref_x, self.ref_y
+            x = compensated_cumsum(np.concatenate(([base_x], self._offsets[index:, 0])))[1:][valid]
+            y = compensated_cumsum(np.concatenate(([base_y], self._offsets[index:, 1])))[1:][valid]
+        else:
+            before_x, before_y = self._tree.prefix(index)
+            x = (self.ref_x + (before_x + np.cumsum(self._offsets[index:, 0])))[valid]
+            y = (self.ref_y + (before_y + np.cumsum(self._offsets[index:, 1])))[valid]
+            x, y = _round_adaptive(x, y)
+        columns = frame.columns.get_loc
+        frame.iloc[position, columns('Azimuth_Original')] = self._raw[index]
+        frame.iloc[position, columns('Azimuth_Decimal')] = self._azimuths[index]
+        frame.iloc[position, columns('Distance')] = self._distances[index]
+        frame.iloc[position:, columns('X_Coordinate')] = x
+        frame.iloc[position:, columns('Y_Coordinate')] = y
+        frame.iloc[position + 1:, columns('Reference_X')] = x[:-1]
+        frame.iloc[position + 1:, columns('Reference_Y')] = y[:-1]
+
+    def insert(self, index, raw_azimuth, distance):
+        """Insertar un tramo antes de la posición `index` (len(self) lo agrega al final).
+
+        O(n): solo se calcula el desplazamiento del tramo nuevo, pero los arrays
+        se desplazan y el árbol se reconstruye.
+        """
+        self._check_index(index, end=1)
+        azimuth, distance = self._parse_leg(raw_azimuth, distance)
+        offset = _leg_offsets(np.array([azimuth]), np.array([distance]))[0]
+        self._raw = np.insert(self._raw, index, str(raw_azimuth))
+        self._azimuths = np.insert(self._azimuths, index, azimuth)
+        self._distances = np.insert(self._distances, index, distance)
+        self._offsets = np.insert(self._offsets, index, offset, axis=0)
+        self._valid = np.insert(self._valid, index, True)
+        self._reindex()
+
+    def delete(self, index):
+        """Eliminar el tramo `index`. O(n), como insert()"""
+        self._check_index(index)
+        self._raw = np.delete(self._raw, index)
+        self._azimuths = np.delete(self._azimuths, index)
+        self._distances = np.delete(self._distances, index)
+        self._offsets = np.delete(self._offsets, index, axis=0)
+        self._valid = np.delete(self._valid, index)
+        self._reindex()
+
+    def vertex(self, index):
+        """Coordenadas (sin redondear) del final del tramo `index`. O(log n)"""
+        self._check_index(index)
+        dx, dy = self._tree.prefix(index + 1)
+        return self.ref_x + dx, self.ref_y + dy
+
+    def results_frame(self, precision='standard'):
+        """DataFrame con las mismas columnas que calculate_traverse (sin analizar ni trigonometría).
+
+        Se devuelve la misma tabla mientras no cambien la precisión ni la
+        referencia; update() la corrige en su lugar.
+        """
+        high = _check_precision(precision)
+        key = (precision, self.ref_x, self.ref_y)
+        if self._frame is None or self._frame_key != key:
+            self._frame = self._build_frame(high)
+            self._frame_key = key
+        return self._frame
+
+    def _build_frame(self, high):
+        cumsum = compensated_cumsum if high else np.cumsum
+        valid = self._valid
+        x = self.ref_x + cumsum(self._offsets[:, 0])[valid]
+        y = self.ref_y + cumsum(self._offsets[:, 1])[valid]
+        x, y = np.concatenate(([self.ref_x], x)), np.concatenate(([self.ref_y], y))
+        if not high:
+            x, y = _round_adaptive(x, y)
+        return pd.DataFrame({
+            'Row': np.flatnonzero(valid) + 1,
+            'Azimuth_Original': self._raw[valid],
+            'Azimuth_Decimal': self._azimuths[valid],
+            'Distance': self._distances[valid],
+            'Reference_X': x[:-1],
+            'Reference_Y': y[:-1],
+            'X_Coordinate': x[1:],
+            'Y_Coordinate': y[1:]
+        }, columns=RESULT_COLUMNS)
+
+def _leg_offsets(azimuths, distances):
+    """Desplazamientos (dx, dy) por tramo como array Nx2; NaN en los tramos inválidos"""
+    valid = (azimuths >= 0) & (azimuths <= 360) & (distances >= 0)
+    azimuth_rad = np.radians(np.mod(azimuths, 360.0))
+    offsets = np.column_stack((np.sin(azimuth_rad) * distances, distances * np.cos(azimuth_rad)))
+    offsets[~valid] = np.nan
+    return offsets
+
+class SpatialIndex:
+    """Índice espacial de rejilla uniforme para vecino más cercano, radio y ventana.
+
+    Cada celda guarda los índices de sus puntos, así que una consulta solo mira
+    las celdas cercanas en lugar de recorrer todos los puntos. Agregar puntos es
+    O(1) por punto; con tamaño de celda automático la rejilla se reconstruye
+    (de forma vectorizada) cuando el número de puntos se cuadruplica. Los
+    índices devueltos son las posiciones de los puntos en orden de inserción.
+    """
+    __slots__ = ('_points', '_cells', '_cell_size', '_auto', '_sized_for', '_extent')
+
+    def __init__(self, x=(), y=(), cell_size=None):
+        self._points = PointStore(POINT_COLUMNS)
+        self._auto = cell_size is None
+        self._cell_size = float(cell_size) if cell_size else 1.0
+        self._cells = {}
+        self._sized_for = 0
+        self._extent = None
+        self.extend(x, y)
+
+    def __len__(self):
+        return len(self._points)
+
+    @property
+    def cell_size(self):
+        return self._cell_size
+
+    def point(self, index):
+        """Coordenadas (x, y) del punto `index`"""
+        return float(self._points['X'][index]), float(self._points['Y'][index])
+
+    def add(self, x, y):
+        """Agregar un punto; devuelve su índice"""
+        self.extend([x], [y])
+        return len(self) - 1
+
+    def extend(self, x, y):
+        """Agregar varios puntos en una sola operación"""
+        start = len(self._points)
+        self._points.extend({'X': x, 'Y': y})
+        if self._auto and len(self._points) > 4 * max(self._sized_for, 16):
+            self._rebuild()
+        else:
+            self._insert(start, len(self._points))
+
+    def _rebuild(self):
+        """Recalcular el tamaño de celda (≈ 2 puntos por celda) y volver a llenar la rejilla"""
+        x, y = self._points['X'], self._points['Y']
+        finite = np.isfinite(x) & np.isfinite(y)
+        if finite.any():
+            width = np.ptp(x[finite])
+            height = np.ptp(y[finite])
+            count = int(finite.sum())
+            area = width * height
+            size = math.sqrt(2.0 * area / count) if area > 0 else max(width, height) / count
+            self._cell_size = size if size > 0 else 1.0
+        self._sized_for = len(self._points)
+        self._cells = {}
+        self._extent = None
+        self._insert(0, len(self._points))
+
+    def _insert(self, start, stop):
+        x, y = self._points['X'][start:stop], self._points['Y'][start:stop]
+        finite = np.isfinite(x) & np.isfinite(y)
+        if not finite.any():
+            return
+        index = np.flatnonzero(finite) + start
+        ci = np.floor(x[finite] / self._cell_size).astype(np.int64)
+        cj = np.floor(y[finite] / self._cell_size).astype(np.int64)
+        extent = (ci.min(), ci.max(), cj.min(), cj.max())
+        if self._extent is not None:
+            extent = (min(extent[0], self._extent[0]), max(extent[1], self._extent[1]),
+                      min(extent[2], self._extent[2]), max(extent[3], self._extent[3]))
+        self._extent = tuple(int(v) for v in extent)
+
+        cells = self._cells
+        if len(index) == 1:
+            cells.setdefault((int(ci[0]), int(cj[0])), []).append(int(index[0]))
+            return
+        # Agrupar por celda de forma vectorizada y agregar cada grupo de una vez
+        order = np.lexsort((cj, ci))
+        ci, cj, index = ci[order], cj[order], index[order]
+        bounds = np.flatnonzero((np.diff(ci) != 0) | (np.diff(cj) != 0)) + 1
+        for lo, hi in zip(np.concatenate(([0], bounds)).tolist(), np.concatenate((bounds, [len(index)])).tolist()):
+            cells.setdefault((int(ci[lo]), int(cj[lo])), []).extend(index[lo:hi].tolist())
+
+    def _cell(self, x, y):
+        return math.floor(x / self._cell_size), math.floor(y / self._cell_size)
+
+    def _gather(self, i0, i1, j0, j1):
+        """Índices de los puntos en las celdas [i0, i1] x [j0, j1]"""
+        cells = self._cells
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(cells):
+            # Ventana grande: recorrer las celdas ocupadas es más barato
+            found = [members for (i, j), members in cells.items() if i0 <= i <= i1 and j0 <= j <= j1]
+        else:
+            found = [cells[key] for key in
+                     ((i, j) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1)) if key in cells]
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.fromiter((k for members in found for k in members), dtype=np.int64)
+
+    def _distances(self, index, x, y):
+        return np.hypot(self._points['X'][index] - x, self._points['Y'][index] - y)
+
+    def nearest(self, x, y):
+        """(índice, distancia) del punto más cercano a (x, y), o None si no hay puntos"""
+        if self._extent is None:
+            return None
+        ci, cj = self._cell(x, y)
+        i_min, i_max, j_min, j_max = self._extent
+        reach = max(ci - i_min, i_max - ci, cj - j_min, j_max - cj)
+        best, best_distance = None, math.inf
+        ring = 0
+        while ring <= reach:
+            if 8 * ring > len(self._cells):
+                # Consulta lejos de los puntos: un barrido vectorizado es más rápido que seguir por anillos
+                x_all, y_all = self._points['X'], self._points['Y']
+                distances = np.hypot(x_all - x, y_all - y)
+                k = int(np.nanargmin(distances))
+                return k, float(distances[k])
+            index = self._ring(ci, cj, ring)
+            if len(index):
+                distances = self._distances(index, x, y)
+                k = int(np.argmin(distances))
+                if distances[k] < best_distance:
+                    best, best_distance = int(index[k]), float(distances[k])
+            # Los puntos de anillos posteriores están al menos a ring * celda
+            if best_distance <= ring * self._cell_size:
+                break
+            ring += 1
+        return best, best_distance
+
+    def _ring(self, ci, cj, ring):
+        """Índices de los puntos en las celdas a distancia de Chebyshev `ring` de (ci, cj)"""
+        if ring == 0:
+            return np.array(self._cells.get((ci, cj), ()), dtype=np.int64)
+        cells = self._cells
+        keys = [(i, j) for i in range(ci - ring, ci + ring + 1) for j in (cj - ring, cj + ring)]
+        keys += [(i, j) for i in (ci - ring, ci + ring) for j in range(cj - ring + 1, cj + ring)]
+        found = [cells[key] for key in keys if key in cells]
+        return np.fromiter((k for members in found for k in members), dtype=np.int64)
+
+    def within_radius(self, x, y, radius):
+        """Índices de los puntos a distancia <= radius de (x, y), del más cercano al más lejano"""
+        i0, j0 = self._cell(x - radius, y - radius)
+        i1, j1 = self._cell(x + radius, y + radius)
+        index = self._gather(i0, i1, j0, j1)
+        distances = self._distances(index, x, y)
+        inside = distances <= radius
+        return index[inside][np.argsort(distances[inside], kind='stable')]
+
+    def within_bbox(self, x_min, y_min, x_max, y_max):
+        """Índices (ordenados) de los puntos dentro de la ventana [x_min, x_max] x [y_min, y_max]"""
+        i0, j0 = self._cell(x_min, y_min)
+        i1, j1 = self._cell(x_max, y_max)
+        index = self._gather(i0, i1, j0, j1)
+        x, y = self._points['X'][index], self._points['Y'][index]
+        inside = (x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max)
+        return np.sort(index[inside])
+
+    def find_duplicate(self, x, y, tolerance=0.01):
+        """Índice del punto existente a distancia <= tolerance de (x, y), o None"""
+        found = self.nearest(x, y)
+        if found is None or found[1] > tolerance:
+            return None
+        return found[0]
+
+def fingerprint(*parts):
+    """Huella rápida (blake2b) del contenido de arrays, Series, DataFrames,
+    PointStore y escalares.
+
+    Los arrays numéricos se hashean directamente desde su búfer, sin copiar ni
+    serializar; las columnas de texto se unen en una sola cadena (o pasan por
+    pd.util.hash_array si mezclan tipos).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        _update_fingerprint(digest, part)
+    return digest.hexdigest()
+
+def _update_fingerprint(digest, part):
+    if isinstance(part, PointStore):
+        digest.update(part.fingerprint().encode())
+    elif isinstance(part, pd.DataFrame):
+        digest.update(repr(list(part.columns)).encode())
+        for name in part.columns:
+            _update_fingerprint(digest, part[name].to_numpy())
+    elif isinstance(part, (pd.Series, pd.Index)):
+        _update_fingerprint(digest, part.to_numpy())
+    elif isinstance(part, np.ndarray):
+        if part.dtype == object:
+            try:
+                # Columnas de texto: unir y hashear es más rápido que hashear cada valor
+                digest.update('\x00'.join(part.ravel().tolist()).encode('utf-8', 'surrogatepass'))
+                part = np.array(part.shape)
+            except TypeError:
+                part = pd.util.hash_array(part.ravel(), categorize=False)
+        digest.update(f"{part.dtype.str}{part.shape}".encode())
+        digest.update(np.ascontiguousarray(part).data)
+    else:
+        digest.update(repr(part).encode())
+    digest.update(b'|')
+
+def estimate_nbytes(value):
+    """Tamaño aproximado en memoria de un resultado (DataFrames, arrays y contenedores)"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(index=True, deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, (np.ndarray, PointStore)):
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(item) for item in value.values())
+    return sys.getsizeof(value)
+
+class ComputationCache:
+    """Caché acotada para resultados costosos, indexada por huellas de contenido.
+
+    Limita el número de entradas y los bytes retenidos y cuenta aciertos,
+    fallos, expulsiones y caducidades reales. Al superar un límite expulsa la
+    entrada de menor valor: coste de recálculo × (usos + 1) / bytes, y entre
+    iguales la menos usada recientemente. Las entradas caducan tras `ttl`
+    segundos (None = sin caducidad). Si pertenece a un MemoryManager, cada
+    inserción respeta también el presupuesto global. Segura entre hilos
+    (Streamlit atiende cada sesión en su propio hilo).
+    """
+
+    def __init__(self, max_entries=32, max_bytes=256 * 1024 * 1024, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> [valor, bytes, instante de caducidad, coste en segundos, usos]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._manager = None
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def get(self, key, default=None):
+        """Valor cacheado (contando acierto o fallo) o `default`"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            entry[4] += 1
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes=None, cost=0.0):
+        """Guardar un valor; `cost` es lo que costó calcularlo (segundos).
+
+        Un valor que no cabe (más de max_bytes, o max_entries < 1) no se guarda
+        y tampoco se conserva el valor anterior de la clave.
+        """
+        nbytes = estimate_nbytes(value) if nbytes is None else int(nbytes)
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if nbytes > self.max_bytes or self.max_entries < 1:
+                return
+            self._entries[key] = [value, nbytes, expires, cost, 0]
+            self._bytes += nbytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(self._least_valuable(exclude=key)[1])
+                self.evictions += 1
+        if self._manager is not None:
+            self._manager.enforce()
+
+    def get_or_compute(self, key, compute, nbytes=None):
+        """Devolver el valor cacheado o calcularlo con compute() y guardarlo.
+
+        `nbytes` puede ser una función valor -> bytes para resultados que
+        estimate_nbytes no sabe medir (p. ej. figuras).
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            start = time.perf_counter()
+            value = compute()
+            cost = time.perf_counter() - start
+            self.put(key, value, nbytes(value) if callable(nbytes) else nbytes, cost)
+        return value
+
+    def _least_valuable(self, exclude=None):
+        """(valor, clave) de la entrada que menos conviene conservar"""
+        return min(
+            ((cost * (uses + 1) / max(nbytes, 1), key)
+             for key, (_, nbytes, _, cost, uses) in self._entries.items() if key != exclude),
+            key=lambda candidate: candidate[0]
+        )
+
+    def least_valuable(self):
+        """(valor, clave) de la entrada de menor valor, o None si está vacía"""
+        with self._lock:
+            return self._least_valuable() if self._entries else None
+
+    def evict(self, key):
+        """Expulsar una entrada concreta (p. ej. por orden del MemoryManager)"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[1]
+
+    def clear(self):
+        """Vaciar la caché (los contadores se conservan)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self):
+        """Contadores actuales de la caché"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+class MemoryManager:
+    """Presupuesto de memoria compartido por varias ComputationCache.
+
+    Lleva la cuenta de los bytes de cada caché registrada y, cuando el total
+    supera `budget_bytes`, expulsa de cualquiera de ellas las entradas de menor
+    valor hasta volver al presupuesto. Nunca vacía cachés enteras ni fuerza una
+    recolección de basura completa.
+    """
+
+    def __init__(self, budget_bytes=256 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.caches = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, cache):
+        """Agregar una caché al presupuesto; devuelve la misma caché"""
+        cache._manager = self
+        self.caches[name] = cache
+        return cache
+
+    @property
+    def nbytes(self):
+        return sum(cache.nbytes for cache in self.caches.values())
+
+    def enforce(self, budget=None):
+        """Expulsar entradas de menor valor hasta quedar dentro de `budget` (por defecto el presupuesto)"""
+        budget = self.budget_bytes if budget is None else budget
+        evicted = 0
+        with self._lock:
+            while self.nbytes > budget:
+                candidates = [(cache.least_valuable(), cache) for cache in self.caches.values()]
+                candidates = [(candidate, cache) for candidate, cache in candidates if candidate is not None]
+                if not candidates:
+                    break
+                (_, key), cache = min(candidates, key=lambda item: item[0][0])
+                cache.evict(key)
+                evicted += 1
+        return evicted
+
+    def trim(self, fraction=0.5):
+        """Reducir el uso a una fracción del presupuesto (p. ej. ante presión de memoria)"""
+        return self.enforce(int(self.budget_bytes * fraction))
+
+    def usage(self):
+        """Bytes y entradas por caché"""
+        return {name: {'entries': len(cache), 'bytes': cache.nbytes} for name, cache in self.caches.items()}
+
+# Contexto vacío compartido: con la instrumentación apagada stage() no crea objetos
+_NULL_STAGE = contextlib.nullcontext()
+
+class _Stage:
+    __slots__ = ('_metrics', '_name', '_rows', '_start')
+
+    def __init__(self, metrics, name, rows):
+        self._metrics = metrics
+        self._name = name
+        self._rows = rows
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._metrics.record(self._name, time.perf_counter() - self._start, self._rows)
+        return False
+
+class Instrumentation:
+    """Temporizadores por etapa, contadores y pico de memoria del camino crítico.
+
+    Uso: `with metrics.stage('parse', rows=n): ...`. Cada etapa acumula
+    llamadas, tiempo total/máximo/último y filas procesadas (para el
+    rendimiento en filas/s). `memory_hook` es una función opcional que devuelve
+    los bytes en uso y se muestrea al cerrar cada etapa. Apagada (por defecto)
+    stage() devuelve un contexto vacío compartido y count()/gauge() retornan de
+    inmediato, así que el coste es de una comprobación por llamada.
+    """
+
+    def __init__(self, enabled=False, memory_hook=None, prefix='azimuth'):
+        self.enabled = enabled
+        self.memory_hook = memory_hook
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Borrar todas las mediciones"""
+        self._stages = {}  # nombre -> [llamadas, total_s, max_s, último_s, filas]
+        self._counters = {}
+        self._gauges = {}
+        self.peak_memory = 0
+        self.started_at = datetime.now().isoformat()
+
+    def stage(self, name, rows=None):
+        """Contexto que cronometra una etapa (y sus filas, si se indican)"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, rows)
+
+    def record(self, name, seconds, rows=None):
+        """Registrar una duración medida externamente"""
+        if not self.enabled:
+            return
+        memory = self.memory_hook() if self.memory_hook is not None else 0
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = [0, 0.0, 0.0, 0.0, 0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3] = seconds
+            stats[4] += rows or 0
+            self.peak_memory = max(self.peak_memory, memory)
+
+    def count(self, name, value=1):
+        """Incrementar un contador"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        """Fijar un valor instantáneo (p. ej. bytes en caché)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[name] = value
+
+    def stages(self):
+        """Lista de etapas con sus tiempos en segundos y filas/s"""
+        with self._lock:
+            items = [(name, list(stats)) for name, stats in self._stages.items()]
+        return [{
+            'stage': name,
+            'calls': calls,
+            'total_s': total,
+            'mean_s': total / calls,
+            'max_s': longest,
+            'last_s': last,
+            'rows': rows,
+            'rows_per_s': rows / total if rows and total > 0 else None
+        } for name, (calls, total, longest, last, rows) in items]
+
+    def to_dict(self):
+        with self._lock:
+            counters, gauges = dict(self._counters), dict(self._gauges)
+        return {
+            'started_at': self.started_at,
+            'exported_at': datetime.now().isoformat(),
+            'stages': self.stages(),
+            'counters': counters,
+            'gauges': gauges,
+            'peak_memory_bytes': self.peak_memory
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        """Formato de texto de Prometheus (válido para pushgateway o textfile collector)"""
+        prefix = self.prefix
+        data = self.to_dict()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            lines.extend(f"{prefix}_{name}{labels} {value!r}" for labels, value in samples)
+
+        stages = data['stages']
+        metric('stage_calls_total', 'counter', "Stage executions",
+               [(f'{{stage="{s["stage"]}"}}', s['calls']) for s in stages])
+        metric('stage_seconds_total', 'counter', "Total time spent per stage",
+               [(f'{{stage="{s["stage"]}"}}', s['total_s']) for s in stages])
+        metric('stage_max_seconds', 'gauge', "Slowest execution per stage",
+               [(f'{{stage="{s["stage"]}"}}', s['max_s']) for s in stages])
+        metric('stage_rows_total', 'counter', "Rows processed per stage",
+               [(f'{{stage="{s["stage"]}"}}', s['rows']) for s in stages])
+        metric('events_total', 'counter', "Event counters",
+               [(f'{{name="{name}"}}', value) for name, value in data['counters'].items()])
+        metric('gauge', 'gauge', "Instantaneous values",
+               [(f'{{name="{name}"}}', value) for name, value in data['gauges'].items()])
+        metric('peak_memory_bytes', 'gauge', "Peak memory sampled at stage end",
+               [('', data['peak_memory_bytes'])])
+        return '\n'.join(lines) + '\n'
+
+    def export(self, destination, fmt='json', timeout=5):
+        """Volcar las métricas en un archivo local (escritura atómica) o en una URL http(s) (POST)"""
+        if fmt not in ('json', 'prometheus'):
+            raise ValueError(f"Formato de métricas desconocido: {fmt}")
+        body = self.to_json() if fmt == 'json' else self.to_prometheus()
+        destination = str(destination)
+        if destination.startswith(('http://', 'https://')):
+            content_type = 'application/json' if fmt == 'json' else 'text/plain; version=0.0.4'
+            request = urllib.request.Request(destination, data=body.encode('utf-8'), method='POST',
+                                             headers={'Content-Type': content_type})
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return response.status
+        temporary = f"{destination}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write(body)
+        os.replace(temporary, destination)
+        return None
+
+# Instrumentación del proceso (apagada por defecto); se activa con la variable de entorno AZIMUTH_METRICS
+metrics = Instrumentation(enabled=os.environ.get('AZIMUTH_METRICS', '') not in ('', '0'))
+
+class BatchJournal:
+    """Persistencia de los tramos Azimuth/Distance como instantánea + diario de cambios.
+
+    Cada cambio se agrega como una línea JSON al diario (O(1), sin reescribir
+    nada); cada `compact_every` cambios se escribe una instantánea completa en
+    un archivo temporal que reemplaza a la anterior de forma atómica
+    (os.replace) y el diario se vacía. Las líneas llevan un número de secuencia
+    y la instantánea guarda el último incluido, así que una caída entre el
+    reemplazo y el vaciado no aplica dos veces un cambio; una última línea
+    incompleta (escritura cortada) se descarta al restaurar.
+
+    El diario solo describe cambios sobre el estado que él mismo guardó: si el
+    almacén no es el último que se registró (otra sesión, un reemplazo o un
+    reinicio del proceso), record() escribe una instantánea completa. La
+    instantánea conserva el formato del antiguo azimuth_prev_batch.json.
+    """
+    OPERATIONS = ('append', 'extend', 'set_row', 'insert', 'delete')
+
+    def __init__(self, snapshot_path, journal_path=None, compact_every=256, fsync=False):
+        self.snapshot_path = str(snapshot_path)
+        self.journal_path = str(journal_path or os.path.splitext(self.snapshot_path)[0] + '.journal')
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        snapshot_seq = self._read_snapshot()[1]
+        records = self._read_journal(snapshot_seq)
+        self._seq = records[-1]['seq'] if records else snapshot_seq
+        self.pending = len(records)
+        self._last_state = None  # (id del almacén, versión) del último estado guardado
+
+    def _read_snapshot(self):
+        """(DataFrame o None, secuencia) de la instantánea"""
+        if not os.path.exists(self.snapshot_path):
+            return None, 0
+        with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        data = payload.get('data', [])
+        frame = pd.DataFrame(data) if isinstance(data, list) and data else None
+        return frame, int(payload.get('seq', 0))
+
+    def _read_journal(self, after_seq):
+        """Registros válidos posteriores a `after_seq`; recorta una cola incompleta"""
+        if not os.path.exists(self.journal_path):
+            return []
+        with open(self.journal_path, 'rb') as f:
+            content = f.read()
+        complete = content.rfind(b'\n') + 1
+        if complete < len(content):
+            # Escritura cortada: descartar la línea incompleta para no pegarle la siguiente
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(complete)
+        records = []
+        for line in content[:complete].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if record.get('seq', 0) > after_seq:
+                records.append(record)
+        return records
+
+    def _write(self, fh, text):
+        fh.write(text)
+        fh.flush()
+        if self.fsync:
+            os.fsync(fh.fileno())
+
+    def record(self, store, op, index=None, **values):
+        """Registrar un cambio ya aplicado a `store` (PointStore); compacta si toca"""
+        if op not in self.OPERATIONS:
+            raise ValueError(f"Operación de diario desconocida: {op}")
+        if self._last_state != (id(store), store.version - 1):
+            self.snapshot(store.to_frame(), store)
+            return
+        with self._lock:
+            self._seq += 1
+            line = {'seq': self._seq, 'op': op}
+            if index is not None:
+                line['index'] = int(index)
+            if values:
+                # 'extend' lleva listas de valores por columna
+                line['values'] = {name: value.tolist() if isinstance(value, (np.generic, np.ndarray, pd.Series))
+                                  else value for name, value in values.items()}
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                self._write(f, json.dumps(line, ensure_ascii=False) + '\n')
+            self.pending += 1
+            self._last_state = (id(store), store.version)
+            compact = self.pending >= self.compact_every
+        if compact:
+            self.snapshot(store.to_frame(), store)
+
+    def snapshot(self, frame, store=None):
+        """Escribir una instantánea completa (atómica) y vaciar el diario"""
+        with self._lock:
+            payload = {
+                'app': 'azimuth_converter',
+                'version': '1.1',
+                'saved_at': datetime.now().isoformat(),
+                'seq': self._seq,
+                'data': frame[['Azimuth', 'Distance']].to_dict(orient='records')
+            }
+            temporary = self.snapshot_path + '.tmp'
+            with open(temporary, 'w', encoding='utf-8') as f:
+                self._write(f, json.dumps(payload, ensure_ascii=False))
+            os.replace(temporary, self.snapshot_path)
+            with open(self.journal_path, 'w', encoding='utf-8'):
+                pass
+            self.pending = 0
+            self._last_state = (id(store), store.version) if store is not None else None
+
+    def load(self):
+        """Reconstruir los tramos guardados: instantánea + cola del diario. None si no hay nada"""
+        with self._lock:
+            frame, snapshot_seq = self._read_snapshot()
+            records = self._read_journal(snapshot_seq)
+        if frame is not None and not {'Azimuth', 'Distance'}.issubset(frame.columns):
+            frame = None
+        if frame is None and not records:
+            return None
+        store = PointStore.from_frame(frame[['Azimuth', 'Distance']], LEG_COLUMNS) if frame is not None \
+            else PointStore(LEG_COLUMNS)
+        for record in records:
+            op, values = record['op'], record.get('values', {})
+            if op == 'append':
+                store.append(**values)
+            elif op == 'extend':
+                store.extend(values)
+            elif op == 'set_row':
+                store.set_row(record['index'], **values)
+            elif op == 'insert':
+                store.insert(record['index'], **values)
+            elif op == 'delete':
+                store.delete(record['index'])
+        return None if store.empty else store.to_frame()
+
+# Formato de proyecto binario columnar (.azp): los buffers de cada columna van
+# alineados uno tras otro y al final un pie JSON con su tipo, posición y tamaño,
+# seguido de la longitud del pie y la firma. Abrir un proyecto solo lee el pie y
+# mapea el archivo en memoria; las páginas se leen del disco al acceder a ellas.
+PROJECT_MAGIC = b'AZPROJ01'
+PROJECT_VERSION = 1
+_PROJECT_ALIGN = 64
+
+def _text_column(values):
+    """Columna de texto como (offsets int64, bytes utf-8 uint8)"""
+    encoded = [str(value).encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+def save_project(destination, batch_data, results_df=None, metadata=None):
+    """Guardar observaciones, azimuts decimales, coordenadas y metadatos en formato .azp.
+
+    `destination` es una ruta (escritura atómica) o un archivo binario abierto
+    (p. ej. BytesIO). De los resultados se guardan Row, X e Y; el resto de
+    columnas de results_df se reconstruye a partir de las observaciones. Si las
+    filas de results_df no caben en batch_data (resultados de otros datos) se
+    guardan solo las observaciones.
+    """
+    raw_azimuths = batch_data['Azimuth'].to_numpy(dtype=object)
+    has_results = results_df is not None and not results_df.empty
+    if has_results:
+        rows = results_df['Row'].to_numpy(dtype=np.int64)
+        has_results = bool(rows.min() >= 1 and rows.max() <= len(raw_azimuths))
+    if has_results:
+        # Los azimuts de las filas válidas ya están en los resultados: no volver a analizarlos
+        azimuths = np.full(len(raw_azimuths), np.nan)
+        azimuths[rows - 1] = results_df['Azimuth_Decimal'].to_numpy(dtype=np.float64)
+    else:
+        azimuths, _ = parse_dms_column(raw_azimuths)
+    offsets, text = _text_column(raw_azimuths)
+    columns = {
+        'obs.azimuth_raw.offsets': offsets,
+        'obs.azimuth_raw.data': text,
+        'obs.azimuth_decimal': azimuths,
+        'obs.distance': pd.to_numeric(batch_data['Distance'], errors='coerce').to_numpy(dtype=np.float64),
+    }
+    if has_results:
+        columns['res.row'] = rows
+        columns['res.x'] = results_df['X_Coordinate'].to_numpy(dtype=np.float64)
+        columns['res.y'] = results_df['Y_Coordinate'].to_numpy(dtype=np.float64)
+
+    if isinstance(destination, (str, os.PathLike)):
+        temporary = f"{destination}.tmp"
+        with open(temporary, 'wb') as fh:
+            _write_project(fh, columns, len(raw_azimuths), metadata)
+        os.replace(temporary, destination)
+    else:
+        _write_project(destination, columns, len(raw_azimuths), metadata)
+
+def _write_project(fh, columns, rows, metadata):
+    fh.write(PROJECT_MAGIC)
+    position = len(PROJECT_MAGIC)
+    layout = {}
+    for name, values in columns.items():
+        padding = -position % _PROJECT_ALIGN
+        fh.write(b'\0' * padding)
+        position += padding
+        values = np.ascontiguousarray(values)
+        fh.write(values.data)
+        layout[name] = {'dtype': values.dtype.str, 'offset': position, 'length': len(values)}
+        position += values.nbytes
+    footer = json.dumps({
+        'format': 'azimuth-project',
+        'version': PROJECT_VERSION,
+        'saved_at': datetime.now().isoformat(),
+        'rows': rows,
+        'metadata': metadata or {},
+        'columns': layout
+    }, ensure_ascii=False).encode('utf-8')
+    fh.write(footer)
+    fh.write(len(footer).to_bytes(8, 'little'))
+    fh.write(PROJECT_MAGIC)
+
+class ProjectFile:
+    """Proyecto .azp abierto mediante mapeo en memoria.
+
+    Abrirlo es O(1): solo se lee el pie; column() devuelve vistas sobre el mapa
+    (sin copiar) y observations()/results() materializan solo el rango pedido.
+    `source` es una ruta (se mapea) o un objeto bytes ya en memoria (p. ej. un
+    archivo subido), que se lee sin copiarlo.
+    """
+
+    def __init__(self, source):
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self.path = None
+            data = np.frombuffer(source, dtype=np.uint8)
+        else:
+            self.path = str(source)
+            if os.path.getsize(self.path) == 0:
+                raise ValueError("Archivo de proyecto inválido")
+            data = np.memmap(self.path, dtype=np.uint8, mode='r')
+        size = len(data)
+        trailer = len(PROJECT_MAGIC) + 8
+        if size < len(PROJECT_MAGIC) + trailer:
+            raise ValueError("Archivo de proyecto inválido")
+        footer_size = int.from_bytes(bytes(data[size - trailer:size - len(PROJECT_MAGIC)]), 'little')
+        if bytes(data[size - len(PROJECT_MAGIC):]) != PROJECT_MAGIC or footer_size > size - trailer:
+            raise ValueError("Archivo de proyecto inválido")
+        footer = json.loads(bytes(data[size - trailer - footer_size:size - trailer]))
+        if footer.get('format') != 'azimuth-project' or footer.get('version', 0) > PROJECT_VERSION:
+            raise ValueError("Versión de proyecto no soportada")
+        self.metadata = footer.get('metadata', {})
+        self.saved_at = footer.get('saved_at')
+        self._rows = footer['rows']
+        self._layout = footer['columns']
+        self._map = data
+
+    def __len__(self):
+        return self._rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Soltar el mapa en memoria.
+
+        No se cierra el mmap a la fuerza: las vistas devueltas por column()
+        lo mantienen vivo y NumPy lo libera cuando desaparece la última.
+        """
+        self._map = None
+
+    @property
+    def result_count(self):
+        return self._layout['res.row']['length'] if 'res.row' in self._layout else 0
+
+    def column(self, name):
+        """Vista de solo lectura de una columna, sin copiar"""
+        if self._map is None:
+            raise ValueError("Proyecto cerrado")
+        spec = self._layout[name]
+        dtype = np.dtype(spec['dtype'])
+        start = spec['offset']
+        return self._map[start:start + spec['length'] * dtype.itemsize].view(dtype)
+
+    def text(self, name, start=0, stop=None):
+        """Decodificar las cadenas [start, stop) de una columna de texto"""
+        offsets = self.column(f'{name}.offsets')
+        stop = len(offsets) - 1 if stop is None else min(stop, len(offsets) - 1)
+        data = self.column(f'{name}.data')
+        bounds = offsets[start:stop + 1].tolist()
+        blob = bytes(data[bounds[0]:bounds[-1]]) if bounds else b''
+        base = bounds[0] if bounds else 0
+        if blob.isascii():
+            # Texto ASCII: los desplazamientos en bytes son también posiciones de carácter
+            blob = blob.decode('ascii')
+            return [blob[a - base:b - base] for a, b in zip(bounds[:-1], bounds[1:])]
+        return [blob[a - base:b - base].decode('utf-8') for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def observations(self, start=0, stop=None):
+        """DataFrame Azimuth/Distance de las observaciones [start, stop)"""
+        stop = self._rows if stop is None else min(stop, self._rows)
+        return pd.DataFrame({
+            'Azimuth': np.array(self.text('obs.azimuth_raw', start, stop), dtype=object),
+            'Distance': np.array(self.column('obs.distance')[start:stop])
+        }, index=pd.RangeIndex(start, max(start, stop)))
+
+    def results(self, start=0, stop=None):
+        """DataFrame con las columnas de calculate_traverse para los vértices [start, stop)"""
+        count = self.result_count
+        if count == 0:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        stop = count if stop is None else min(stop, count)
+        rows = np.array(self.column('res.row')[start:stop])
+        x = np.array(self.column('res.x')[max(start - 1, 0):stop])
+        y = np.array(self.column('res.y')[max(start - 1, 0):stop])
+        if start == 0:
+            ref_x = np.array([float(self.metadata.get('ref_x', 0.0))])
+            ref_y = np.array([float(self.metadata.get('ref_y', 0.0))])
+            if self.metadata.get('precision', 'standard') != 'high':
+                ref_x, ref_y = _round_adaptive(ref_x, ref_y)
+            x, y = np.concatenate((ref_x, x)), np.concatenate((ref_y, y))
+        observation = rows - 1
+        first = int(observation[0]) if len(observation) else 0
+        last = int(observation[-1]) + 1 if len(observation) else 0
+        azimuth_text = np.array(self.text('obs.azimuth_raw', first, last), dtype=object)
+        return pd.DataFrame({
+            'Row': rows,
+            'Azimuth_Original': azimuth_text[observation - first],
+            'Azimuth_Decimal': self.column('obs.azimuth_decimal')[observation],
+            'Distance': self.column('obs.distance')[observation],
+            'Reference_X': x[:-1],
+            'Reference_Y': y[:-1],
+            'X_Coordinate': x[1:],
+            'Y_Coordinate': y[1:]
+        }, columns=RESULT_COLUMNS)
+
+def open_project(source):
+    """Abrir un proyecto .azp: ruta (mapeada en memoria) o bytes ya cargados"""
+    return ProjectFile(source)
+
+# 🚀 PERFORMANCE: LRU Cache para funciones críticas
+@lru_cache(maxsize=128)
+def cached_parse_dms_to_decimal(dms_string):
+    """Versión cacheada de parse_dms_to_decimal"""
+    return parse_dms_to_decimal(dms_string)
+
+@lru_cache(maxsize=256)
+def cached_azimuth_to_coordinates(azimuth, distance, ref_x, ref_y, azimuth_convention):
+    """Versión cacheada de azimuth_to_coordinates"""
+    return azimuth_to_coordinates(azimuth, distance, ref_x, ref_y, azimuth_convention)
+
+def polygon_geometry(x, y):
+    """Núcleo geométrico: todas las medidas de un polígono en una pasada vectorizada.
+
+    Recibe arrays contiguos de X e Y (el polígono se cierra implícitamente del
+    último vértice al primero) y devuelve un dict con 'vertices', 'area',
+    'signed_area' (positiva en sentido antihorario), 'perimeter' (incluye el
+    lado de cierre), 'centroid' (cx, cy), 'bbox' (min_x, min_y, max_x, max_y) y
+    'closure' (dx, dy) del último vértice respecto al primero, que en una
+    poligonal es el error de cierre. Los cálculos se hacen relativos al primer
+    vértice para no perder precisión con coordenadas grandes.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n == 0:
+        return {'vertices': 0, 'area': 0.0, 'signed_area': 0.0, 'perimeter': 0.0,
+                'centroid': (math.nan, math.nan), 'bbox': (math.nan,) * 4, 'closure': (0.0, 0.0)}
+
+    x0, y0 = float(x[0]), float(y[0])
+    dx = x - x0
+    dy = y - y0
+    # Vértice siguiente (cerrando el polígono) sin construir arrays de índices
+    next_dx = np.concatenate((dx[1:], dx[:1]))
+    next_dy = np.concatenate((dy[1:], dy[:1]))
+
+    cross = dx * next_dy - next_dx * dy
+    twice_area = float(cross.sum())
+    perimeter = float(np.hypot(next_dx - dx, next_dy - dy).sum())
+    if n >= 3 and twice_area != 0.0:
+        cx = float(((dx + next_dx) * cross).sum()) / (3.0 * twice_area) + x0
+        cy = float(((dy + next_dy) * cross).sum()) / (3.0 * twice_area) + y0
+    else:
+        # Polígono degenerado: centro de los vértices
+        cx, cy = float(dx.mean()) + x0, float(dy.mean()) + y0
+    signed_area = twice_area / 2.0 if n >= 3 else 0.0
+
+    return {
+        'vertices': n,
+        'area': abs(signed_area),
+        'signed_area': signed_area,
+        'perimeter': perimeter,
+        'centroid': (cx, cy),
+        'bbox': (float(x.min()), float(y.min()), float(x.max()), float(y.max())),
+        'closure': (float(dx[-1]), float(dy[-1]))
+    }
+
+def calculate_polygon_area(coordinates):
+    """Calculate polygon area using the Shoelace formula (lista de tuplas o array Nx2)"""
+    coords = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    if len(coords) < 3:
+        return 0.0
+    return polygon_geometry(coords[:, 0], coords[:, 1])['area']
+
+# 🚀 PERFORMANCE: Nivel de detalle para gráficos muy grandes. Se calcula en el
+# servidor con NumPy para enviar al navegador como mucho ~max_points puntos.
+def _in_window(x, y, window):
+    x_min, y_min, x_max, y_max = window
+    return (x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max)
+
+def _extreme_positions(x, y, max_points):
+    """Posiciones a conservar al simplificar una secuencia: en cada bloque consecutivo,
+    el primero, el último y los extremos de X e Y (preserva la envolvente de la forma)"""
+    n = len(x)
+    buckets = max(max_points // 6, 1)
+    size = -(-n // buckets)
+    buckets = -(-n // size)
+    pad = buckets * size - n
+    start = np.arange(buckets) * size
+    positions = [start, np.minimum(start + size - 1, n - 1)]
+    for values in (x, y):
+        blocks = np.concatenate((values, np.repeat(values[-1:], pad))).reshape(buckets, size)
+        positions += [start + blocks.argmin(axis=1), start + blocks.argmax(axis=1)]
+    return np.unique(np.minimum(np.concatenate(positions), n - 1))
+
+def decimate_polyline(x, y, max_points, window=None):
+    """Polilínea simplificada para dibujar: devuelve (x, y, índices).
+
+    Con `window` (x_min, y_min, x_max, y_max) se conservan solo los vértices
+    dentro de la ventana y sus vecinos (para que los tramos que cruzan el borde
+    se dibujen); si aun así hay más de `max_points`, se simplifica conservando
+    los extremos de cada bloque. x, y llevan NaN donde la polilínea sale de la
+    ventana (plotly corta ahí la línea); `índices` son los vértices conservados.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    index = np.arange(len(x))
+    if window is not None and len(x):
+        inside = _in_window(x, y, window)
+        keep = inside.copy()
+        keep[1:] |= inside[:-1]
+        keep[:-1] |= inside[1:]
+        index = np.flatnonzero(keep)
+    # Tramos continuos dentro de la ventana
+    runs = np.concatenate(([0], np.cumsum(np.diff(index) != 1)))
+    if len(index) > max_points:
+        positions = _extreme_positions(x[index], y[index], max_points)
+        index, runs = index[positions], runs[positions]
+    breaks = np.flatnonzero(np.diff(runs)) + 1
+    return np.insert(x[index], breaks, np.nan), np.insert(y[index], breaks, np.nan), index
+
+def thin_points(x, y, max_points, window=None):
+    """Nube de puntos simplificada: devuelve (índices, cuentas).
+
+    Con más de `max_points` puntos (dentro de `window`, si se da) se conserva un
+    representante por celda de una rejilla de ~max_points celdas; `cuentas` es
+    el número de puntos que representa cada uno (densidad por celda). Los
+    puntos con coordenadas no finitas (NaN, inf) no se dibujan y se omiten.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    shown = np.isfinite(x) & np.isfinite(y)
+    if window is not None:
+        shown &= _in_window(x, y, window)
+    index = np.flatnonzero(shown)
+    if len(index) <= max_points:
+        return index, np.ones(len(index), dtype=np.int64)
+    px, py = x[index], y[index]
+    side = max(int(math.sqrt(max_points)), 1)
+    x_min, y_min = px.min(), py.min()
+    span = max(px.max() - x_min, py.max() - y_min) or 1.0
+    ci = np.minimum(((px - x_min) / span * side).astype(np.int64), side - 1)
+    cj = np.minimum(((py - y_min) / span * side).astype(np.int64), side - 1)
+    _, first, counts = np.unique(ci * side + cj, return_index=True, return_counts=True)
+    order = np.argsort(first)
+    return index[first[order]], counts[order]
+
+def snap_window(window, extent, max_level=24):
+    """Ajustar una ventana a la rejilla de teselas de su nivel de zoom: devuelve (nivel, ventana).
+
+    El nivel es el número de veces que hay que dividir por 2 la extensión total
+    (x_min, y_min, x_max, y_max) para que una tesela cubra la ventana pedida; la
+    ventana se amplía a teselas completas, así que ventanas parecidas comparten
+    resultado (y entrada de caché).
+    """
+    x_min, y_min, x_max, y_max = extent
+    span = max(x_max - x_min, y_max - y_min) or 1.0
+    wanted = max(window[2] - window[0], window[3] - window[1], span / 2 ** max_level)
+    level = min(max(int(math.floor(math.log2(span / wanted))), 0), max_level)
+    tile = span / 2 ** level
+    snapped = (float(x_min + math.floor((window[0] - x_min) / tile) * tile),
+               float(y_min + math.floor((window[1] - y_min) / tile) * tile),
+               float(x_min + math.ceil((window[2] - x_min) / tile) * tile),
+               float(y_min + math.ceil((window[3] - y_min) / tile) * tile))
+    return level, snapped
+
+# 🚀 PERFORMANCE: Exportadores por flujo (generadores). La salida se produce en
+# bloques de EXPORT_CHUNK_POINTS puntos sin construir nunca la cadena completa.
+EXPORT_CHUNK_POINTS = 4096
+
+_DXF_HEADER = """0
+SECTION
+2
+HEADER
+9
+$ACADVER
+1
+AC1015
+0
+ENDSEC
+0
+SECTION
+2
+ENTITIES
+"""
+
+_DXF_POINT = """0
+POINT
+8
+0
+10
+{}
+20
+{}
+30
+0.0
+"""
+
+_DXF_LINE = """0
+LINE
+8
+1
+10
+{}
+20
+{}
+30
+0.0
+11
+{}
+21
+{}
+31
+0.0
+"""
+
+_DXF_FOOTER = """0
+ENDSEC
+0
+EOF
+"""
+
+_KML_PLACEMARK = """<Placemark>
+<name>Point {}</name>
+<Point>
+<coordinates>{},{},0</coordinates>
+</Point>
+</Placemark>
+"""
+
+def _coordinate_chunks(coordinates):
+    """Coordenadas (lista de tuplas o array Nx2) como listas de hasta
+    EXPORT_CHUNK_POINTS pares (x, y); solo un bloque está convertido a la vez.
+
+    Los valores conservan su tipo, así que se escriben igual que con str()
+    (un entero sale como 3, no como 3.0); un array float64 se convierte con
+    tolist(), que da la misma representación que sus escalares.
+    """
+    if isinstance(coordinates, np.ndarray) and coordinates.dtype == np.float64:
+        rows = coordinates.reshape(-1, 2)
+        for start in range(0, len(rows), EXPORT_CHUNK_POINTS):
+            yield rows[start:start + EXPORT_CHUNK_POINTS].tolist()
+        return
+    points = iter(coordinates)
+    while chunk := [tuple(point) for point in itertools.islice(points, EXPORT_CHUNK_POINTS)]:
+        yield chunk
+
+def _chunk_bounds(count):
+    """Límites (inicio, fin) de los bloques de exportación"""
+    return [(start, min(start + EXPORT_CHUNK_POINTS, count)) for start in range(0, count, EXPORT_CHUNK_POINTS)]
+
+def write_export(chunks, fh, encoding='utf-8'):
+    """Escribir los bloques de un exportador en un archivo de texto o binario (p. ej. BytesIO)"""
+    if isinstance(fh, io.TextIOBase):
+        fh.writelines(chunks)
+    else:
+        for chunk in chunks:
+            fh.write(chunk.encode(encoding))
+
+def iter_dxf(coordinates):
+    """Generar el contenido DXF (puntos + polígono cerrado de líneas) por bloques"""
+    # Se recorren dos veces (puntos y después líneas): un iterador se guarda antes
+    if not isinstance(coordinates, (np.ndarray, list, tuple)):
+        coordinates = list(coordinates)
+    yield _DXF_HEADER
+
+    # Agregar puntos
+    for chunk in _coordinate_chunks(coordinates):
+        yield ''.join(_DXF_POINT.format(x, y) for x, y in chunk)
+
+    # Agregar líneas conectando los puntos; se arrastran el primer punto (para
+    # la línea de cierre) y el último del bloque anterior, no una copia desplazada
+    first = last = None
+    count = 0
+    for chunk in _coordinate_chunks(coordinates):
+        if last is None:
+            first = chunk[0]
+            points = chunk
+        else:
+            points = itertools.chain((last,), chunk)
+        yield ''.join(_DXF_LINE.format(x1, y1, x2, y2) for (x1, y1), (x2, y2) in itertools.pairwise(points))
+        last = chunk[-1]
+        count += len(chunk)
+    if count > 1:
+        yield _DXF_LINE.format(*last, *first)
+
+    yield _DXF_FOOTER
+
+def export_to_dxf(coordinates, filename="coordinates.dxf"):
+    """Exportar coordenadas a formato DXF para AutoCAD"""
+    return ''.join(iter_dxf(coordinates))
+
+def write_dxf(coordinates, fh):
+    """Escribir DXF directamente en un archivo o BytesIO con memoria acotada"""
+    write_export(iter_dxf(coordinates), fh)
+
+def _default_metadata():
+    return {
+        "created_at": datetime.now().isoformat(),
+        "version": "2.0",
+        "software": "Azimuth Converter"
+    }
+
+def _indented_records(records):
+    """Registros con la misma indentación que json.dumps(export_data, indent=2)"""
+    # json.dumps(lista, indent=2) -> '[\n  {...}\n]'; se quitan los corchetes y se
+    # desplaza cada línea dos espacios (la lista está dentro de "data")
+    return json.dumps(records, indent=2, ensure_ascii=False)[1:-2].replace('\n', '\n  ')
+
+def iter_json(data, metadata=None, layout='records'):
+    """Generar la exportación JSON por bloques.
+
+    layout='records': {"metadata", "data": [registros]} indentado (formato original).
+    layout='columns': compacto y columnar {"metadata", "columns", "data": {col: [...]}}.
+    layout='ndjson': una línea con los metadatos y después un registro por línea.
+    Con layout='records' los datos que no son un DataFrame (dict, lista...) se
+    vuelcan tal cual, en un solo bloque.
+    """
+    metadata = metadata or _default_metadata()
+    if layout == 'records' and not isinstance(data, pd.DataFrame):
+        records = data.to_dict('records') if hasattr(data, 'to_dict') else data
+        yield json.dumps({"metadata": metadata, "data": records}, indent=2, ensure_ascii=False)
+        return
+    frame = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    bounds = _chunk_bounds(len(frame))
+
+    if layout == 'records':
+        header = json.dumps({"metadata": metadata}, indent=2, ensure_ascii=False)
+        yield header[:-2] + ',\n  "data": ['
+        for start, end in bounds:
+            records = frame.iloc[start:end].to_dict('records')
+            yield (',' if start else '') + _indented_records(records)
+        yield ('\n  ]' if bounds else ']') + '\n}'
+
+    elif layout == 'columns':
+        yield '{"metadata": ' + json.dumps(metadata, ensure_ascii=False)
+        yield ', "columns": ' + json.dumps([str(c) for c in frame.columns], ensure_ascii=False)
+        yield ', "data": {'
+        for k, column in enumerate(frame.columns):
+            yield (', ' if k else '') + json.dumps(str(column), ensure_ascii=False) + ': ['
+            values = frame[column]
+            for start, end in bounds:
+                chunk = json.dumps(values.iloc[start:end].tolist(), ensure_ascii=False)[1:-1]
+                yield (', ' if start else '') + chunk
+            yield ']'
+        yield '}}'
+
+    elif layout == 'ndjson':
+        yield json.dumps({"metadata": metadata}, ensure_ascii=False) + '\n'
+        for start, end in bounds:
+            records = frame.iloc[start:end].to_dict('records')
+            yield ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+
+    else:
+        raise ValueError(f"Formato JSON desconocido: {layout}")
+
+def export_to_json(data, metadata=None, layout='records'):
+    """Exportar datos a formato JSON con metadatos (ver iter_json para `layout`)"""
+    return ''.join(iter_json(data, metadata, layout))
+
+def write_json(data, fh, metadata=None, layout='records'):
+    """Escribir JSON directamente en un archivo o BytesIO con memoria acotada"""
+    write_export(iter_json(data, metadata, layout), fh)
+
+def iter_kml(coordinates, name="Survey Points"):
+    """Generar el contenido KML por bloques"""
+    yield f"""<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2">
+<Document>
+<name>{name}</name>
+"""
+    number = 1
+    for chunk in _coordinate_chunks(coordinates):
+        yield ''.join(_KML_PLACEMARK.format(i, x, y) for i, (x, y) in enumerate(chunk, start=number))
+        number += len(chunk)
+    yield """</Document>
+</kml>"""
+
+def export_to_kml(coordinates, name="Survey Points"):
+    """Exportar coordenadas a formato KML para Google Earth"""
+    return ''.join(iter_kml(coordinates, name))
+
+def write_kml(coordinates, fh, name="Survey Points"):
+    """Escribir KML directamente en un archivo o BytesIO con memoria acotada"""
+    write_export(iter_kml(coordinates, name), fh)
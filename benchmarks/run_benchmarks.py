@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for Azimuth Converter hot functions.
+
+Times the parsing, traverse, area, plotting and export functions at several
+dataset sizes (10, 1k, 100k and 1M rows by default), writes the results as
+JSON and compares them against a stored baseline.
+
+Examples:
+    python benchmarks/run_benchmarks.py                      # run + compare with baseline
+    python benchmarks/run_benchmarks.py --sizes 10 1000      # quick run
+    python benchmarks/run_benchmarks.py --only parse         # benchmarks whose name contains "parse"
+    python benchmarks/run_benchmarks.py --repo /tmp/old --only export --save-baseline
+                                                             # record baseline entries from another tree
+
+The baseline holds one entry per (benchmark, size), each tagged with the commit it
+was measured at; --save-baseline replaces only the entries of the benchmarks it ran.
+"""
+
+import argparse
+import importlib
+import inspect
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = Path(__file__).parent
+REPO_DIR = BENCH_DIR.parent
+RESULTS_FILE = BENCH_DIR / "results" / "latest.json"
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+DEFAULT_SIZES = [10, 1_000, 100_000, 1_000_000]
+
+
+
+def load_tree(repo):
+    """Import azimuth_core (None in trees that predate it) and app.py from `repo`.
+
+    app.py is imported quietly: Streamlit runs in bare mode outside `streamlit run`
+    and its warnings (missing ScriptRunContext, no runtime) are expected here.
+    """
+    sys.path.insert(0, str(repo))
+    logging.disable(logging.WARNING)
+    try:
+        core = importlib.import_module('azimuth_core')
+    except ImportError:
+        core = None
+    app = importlib.import_module('app')
+    return core, app
+
+
+def lookup(core, app, name):
+    """Function `name` from azimuth_core or, in older trees, from app.py; None if the tree lacks it"""
+    for module in (core, app):
+        func = getattr(module, name, None)
+        if func is not None:
+            return func
+    return None
+
+
+def accepts(func, parameter):
+    return parameter in inspect.signature(func).parameters
+
+
+def cold(func, app):
+    """Wrap func so that every call computes: the app's caches (and an st.cache_data
+    wrapper around func, as in older trees) are emptied before each call"""
+    caches = [getattr(app, name)() for name in ('get_computation_cache', 'get_figure_cache') if hasattr(app, name)]
+    if hasattr(func, 'clear'):
+        caches.append(func)
+
+    def run(*args, **kwargs):
+        for cache in caches:
+            cache.clear()
+        return func(*args, **kwargs)
+    return run
+
+
+def make_dataset(n, seed=0):
+    """Deterministic traverse of n legs in mixed DMS formats plus n entered points.
+
+    Returns (batch_data, azimuths, single_points, results_df). The decimal azimuths
+    and the results table (calculate_traverse's columns and rounding) are built here
+    with numpy only, so every tree under test gets the same inputs.
+    """
+    rng = np.random.default_rng(seed)
+    degrees = rng.integers(0, 360, n)
+    minutes = rng.integers(0, 60, n)
+    seconds = np.round(rng.random(n) * 60, 2)
+    separators = np.array([' ', '-', ':', '_'])[rng.integers(0, 4, n)]
+    azimuth_strings = [f"{d}{s}{m}{s}{sec:.2f}" for d, m, sec, s in zip(degrees, minutes, seconds, separators)]
+    distances = np.round(rng.random(n) * 50 + 0.1, 3)
+    batch_data = pd.DataFrame({'Azimuth': azimuth_strings, 'Distance': distances})
+    single_points = pd.DataFrame({'X': rng.random(n) * 1000, 'Y': rng.random(n) * 1000})
+
+    azimuths = degrees + minutes / 60 + seconds / 3600
+    radians = np.radians(azimuths)
+    x = 1000.0 + np.cumsum(distances * np.sin(radians))
+    y = 1000.0 + np.cumsum(distances * np.cos(radians))
+    coarse = (np.abs(x) > 1000) | (np.abs(y) > 1000)
+    x = np.where(coarse, np.round(x, 3), np.round(x, 6))
+    y = np.where(coarse, np.round(y, 3), np.round(y, 6))
+    results_df = pd.DataFrame({
+        'Row': np.arange(1, n + 1),
+        'Azimuth_Original': azimuth_strings,
+        'Azimuth_Decimal': azimuths,
+        'Distance': distances,
+        'Reference_X': np.concatenate(([1000.0], x[:-1])),
+        'Reference_Y': np.concatenate(([1000.0], y[:-1])),
+        'X_Coordinate': x,
+        'Y_Coordinate': y,
+    })
+    return batch_data, azimuths, single_points, results_df
+
+
+def build_benchmarks(core, app, n):
+    """Return {name: callable} for one dataset size. Setup work is done here, untimed.
+
+    Benchmarks whose function the tree under test does not provide are left out.
+    """
+    batch_data, azimuths, single_points, results_df = make_dataset(n)
+    azimuth_strings = batch_data['Azimuth'].tolist()
+    distances = batch_data['Distance'].to_numpy()
+    leg_lines = [f"{azimuth} {distance}" for azimuth, distance in zip(azimuth_strings, distances.tolist())]
+    coordinates = list(zip(results_df['X_Coordinate'], results_df['Y_Coordinate']))
+    vertex_x = results_df['X_Coordinate'].to_numpy()
+    vertex_y = results_df['Y_Coordinate'].to_numpy()
+    f = {name: lookup(core, app, name) for name in (
+        'parse_dms_to_decimal', 'parse_dms_column', 'split_leg_lines', 'validate_legs', 'azimuth_to_coordinates',
+        'traverse_coordinates', 'batch_calculate_coordinates', 'calculate_polygon_area', 'polygon_geometry',
+        'create_multi_point_plot', 'export_to_dxf', 'export_to_json', 'export_to_kml')}
+    benchmarks = {}
+
+    def add(name, requires, func):
+        if all(f[required] is not None for required in requires):
+            benchmarks[name] = func
+
+    def parse_scalar():
+        parse = f['parse_dms_to_decimal']
+        return [parse(text) for text in azimuth_strings]
+
+    def azimuth_scalar():
+        to_xy = f['azimuth_to_coordinates']
+        x, y = 1000.0, 1000.0
+        for azimuth, distance in zip(azimuths.tolist(), distances.tolist()):
+            x, y = to_xy(azimuth, distance, x, y)
+        return x, y
+
+    def batch(parallel):
+        calculate = cold(f['batch_calculate_coordinates'], app)
+        return lambda: calculate(batch_data, 1000.0, 1000.0, "excel", parallel)
+
+    def plot():
+        return cold(f['create_multi_point_plot'], app)(single_points, results_df, 1000.0, 1000.0, 1.0, 1.0)
+
+    preview = iter(range(1, 1_000_000))
+
+    def plot_preview():
+        # Only the preview point changes (trees with a layered plot cache reuse the base)
+        k = next(preview)
+        return f['create_multi_point_plot'](single_points, results_df, 1000.0, 1000.0, float(k), float(k))
+
+    add('parse_dms_to_decimal', ['parse_dms_to_decimal'], parse_scalar)
+    add('parse_dms_column', ['parse_dms_column'], lambda: f['parse_dms_column'](azimuth_strings))
+    add('validate_legs[lines]', ['split_leg_lines', 'validate_legs'],
+        lambda: f['validate_legs'](f['split_leg_lines'](leg_lines)))
+    add('azimuth_to_coordinates', ['azimuth_to_coordinates'], azimuth_scalar)
+    add('traverse_coordinates', ['traverse_coordinates'],
+        lambda: f['traverse_coordinates'](azimuths, distances, 1000.0, 1000.0))
+    if f['traverse_coordinates'] is not None and accepts(f['traverse_coordinates'], 'compensated'):
+        add('traverse_coordinates[compensated]', ['traverse_coordinates'], lambda: f['traverse_coordinates'](
+            azimuths, distances, 1000.0, 1000.0, rounding=False, compensated=True))
+    if f['batch_calculate_coordinates'] is not None and accepts(f['batch_calculate_coordinates'], 'parallel'):
+        add('batch_calculate_coordinates[sync]', ['batch_calculate_coordinates'], batch(False))
+        add('batch_calculate_coordinates[async]', ['batch_calculate_coordinates'], batch(True))
+    elif f['batch_calculate_coordinates'] is not None:
+        # Trees before the parallel flag: the async attempt fails on start-up
+        # (threading.cpu_count does not exist) and every call runs the sequential loop
+        calculate = cold(f['batch_calculate_coordinates'], app)
+        add('batch_calculate_coordinates[sync]', ['batch_calculate_coordinates'],
+            lambda: calculate(batch_data, 1000.0, 1000.0, "excel"))
+    add('calculate_polygon_area', ['calculate_polygon_area'],
+        lambda: cold(f['calculate_polygon_area'], app)(coordinates))
+    add('polygon_geometry', ['polygon_geometry'], lambda: f['polygon_geometry'](vertex_x, vertex_y))
+    add('create_multi_point_plot', ['create_multi_point_plot'], plot)
+    add('create_multi_point_plot[preview]', ['create_multi_point_plot'], plot_preview)
+    add('export_to_dxf', ['export_to_dxf'], lambda: f['export_to_dxf'](coordinates))
+    add('export_to_json', ['export_to_json'], lambda: f['export_to_json'](results_df))
+    add('export_to_kml', ['export_to_kml'], lambda: f['export_to_kml'](coordinates))
+    return benchmarks
+
+
+def time_call(func, repeat):
+    """Run func `repeat` times; return timings in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def environment(repo):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'created_at': datetime.now().isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run(args):
+    core, app = load_tree(args.repo)
+    env = environment(args.repo)
+    results = []
+    for n in args.sizes:
+        repeat = args.repeat if n <= 100_000 else 1
+        for name, func in build_benchmarks(core, app, n).items():
+            if args.only and not any(key in name for key in args.only):
+                continue
+            func()  # warm-up (imports, process pool start-up)
+            timings = time_call(func, repeat)
+            result = {
+                'name': name,
+                'rows': n,
+                'commit': env['commit'],
+                'repeat': repeat,
+                'min_s': min(timings),
+                'median_s': statistics.median(timings),
+                'rows_per_s': n / min(timings) if min(timings) > 0 else None,
+            }
+            results.append(result)
+            print(f"{name:<38} {n:>9,} rows  {result['min_s'] * 1000:>11.3f} ms", flush=True)
+    return {'environment': env, 'results': results}
+
+
+def merge_baseline(baseline, report):
+    """Baseline with the entries measured in `report` replaced or added, the others kept"""
+    measured = {(r['name'], r['rows']) for r in report['results']}
+    kept = [r for r in baseline.get('results', []) if (r['name'], r['rows']) not in measured]
+    order = {name: i for i, name in enumerate(dict.fromkeys(r['name'] for r in kept + report['results']))}
+    results = sorted(kept + report['results'], key=lambda r: (r['rows'], order[r['name']]))
+    # The commit lives in each entry: the entries may come from different trees
+    environment = {key: value for key, value in report['environment'].items() if key != 'commit'}
+    return {'environment': environment, 'results': results}
+
+
+def compare(report, baseline, tolerance):
+    """Print ratios against the baseline; return the list of regressions"""
+    reference = {(r['name'], r['rows']): r for r in baseline.get('results', [])}
+    regressions = []
+    print("\nComparison with baseline (commit each entry was measured at):")
+    for result in report['results']:
+        base = reference.get((result['name'], result['rows']))
+        if base is None or not base['min_s']:
+            continue
+        ratio = result['min_s'] / base['min_s']
+        flag = ''
+        if ratio > tolerance:
+            flag = '  ⚠️ slower'
+            regressions.append(result)
+        elif ratio < 1 / tolerance:
+            flag = '  ✅ faster'
+        print(f"{result['name']:<38} {result['rows']:>9,} rows  x{ratio:>7.2f}  vs {base.get('commit')}{flag}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Azimuth Converter hot functions.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Dataset sizes (rows)")
+    parser.add_argument('--repeat', type=int, default=3, help="Repetitions per benchmark up to 100k rows (default: 3)")
+    parser.add_argument('--only', nargs='+', help="Only run benchmarks whose name contains one of these strings")
+    parser.add_argument('--output', type=Path, default=RESULTS_FILE, help="Results file (JSON)")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_FILE, help="Baseline file to compare against")
+    parser.add_argument('--repo', type=Path, default=REPO_DIR,
+                        help="Source tree to benchmark, e.g. a git worktree of an older commit (default: this checkout)")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Store the entries of this run in the baseline, keeping the other entries")
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help="Ratio above which a benchmark counts as a regression (default: 1.25)")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Exit with status 1 on regressions")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8')) if args.baseline.exists() else {}
+        args.baseline.write_text(json.dumps(merge_baseline(baseline, report), indent=2), encoding='utf-8')
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print("No baseline found; run with --save-baseline to create one")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+    regressions = compare(report, baseline, args.tolerance)
+    if regressions and args.fail_on_regression:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import logging
+import shutil
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('streamlit')
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+APP = Path(__file__).resolve().parent.parent / 'app.py'
+
+
+@pytest.fixture
+def app(tmp_path):
+    # Copia de app.py: el lote previo se guarda junto al script, no en el repositorio
+    shutil.copy(APP, tmp_path / 'app.py')
+    logging.disable(logging.WARNING)
+    at = AppTest.from_file(str(tmp_path / 'app.py'), default_timeout=120)
+    at.run()
+    yield at
+    logging.disable(logging.NOTSET)
+
+
+def click(at, label):
+    next(button for button in at.button if label in button.label).click()
+    at.run()
+
+
+def test_clear_then_add_leg_keeps_page_working(app):
+    click(app, 'Restablecer Entradas')
+    click(app, 'Convertir Todo')
+    assert len(app.session_state['results_df']) == 4
+    # Los resultados sobreviven a la limpieza pero ya no corresponden a los tramos
+    click(app, 'Limpiar Todos los Datos')
+    next(t for t in app.text_input if t.label == 'Azimut' and not (t.key or '').startswith('edit')).input('45 0 0')
+    next(n for n in app.number_input if n.label == 'Distancia' and not (n.key or '').startswith('edit')).set_value(2.0)
+    click(app, 'Agregar Entrada')
+    app.run()
+    assert not app.exception
+    assert len(app.session_state['batch_data']) == 1
+
+
+def test_sessions_cannot_change_shared_caches(app):
+    # La caducidad es configuración del servidor (AZIMUTH_CACHE_TTL_MIN) y no hay botón
+    # que vacíe las cachés de todas las sesiones
+    assert not any('TTL' in slider.label for slider in app.sidebar.slider)
+    assert not any('Limpiar Caché' in button.label for button in app.sidebar.button)
+    assert any('Caducidad: 60 min' in caption.value for caption in app.sidebar.caption)
@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from azimuth_core import split_leg_lines, validate_legs
+
+
+@pytest.mark.parametrize('line, azimuth, distance', [
+    ('45 30 0 12.5', '45 30 0', '12.5'),
+    ('45 30 0 12,5', '45 30 0', '12.5'),  # coma decimal en la distancia
+    ('45,5 10', '45,5', '10'),  # y en el azimut (la analiza parse_dms_to_decimal)
+    ('45;12.5', '45', '12.5'),
+    ('45 30 0; 12.5', '45 30 0', '12.5'),
+    ('45.5\t10', '45.5', '10'),
+    ('26-56-7.00\t\t3,25', '26-56-7.00', '3.25'),
+    ('  45   10  ', '45', '10'),
+    ('45 10\r', '45', '10'),
+    ('N 45°30\'15" E 7', 'N 45°30\'15" E', '7'),
+])
+def test_last_field_is_the_distance(line, azimuth, distance):
+    frame = split_leg_lines([line])
+    assert frame.to_dict('records') == [{'Azimuth': azimuth, 'Distance': distance}]
+
+
+def test_blank_lines_are_skipped_but_keep_numbering():
+    frame = split_leg_lines(['45 10', '', '   ', '90 5', '\t'])
+    assert frame.index.tolist() == [0, 3]
+    assert frame['Azimuth'].tolist() == ['45', '90']
+
+
+def test_one_field_line_has_no_distance():
+    frame = split_leg_lines(['45', '45,10'])
+    assert frame['Azimuth'].tolist() == ['45', '45,10']
+    assert frame['Distance'].isna().all()
+
+
+def test_validate_reports_original_line_numbers():
+    lines = ['45 30 0 10', '', 'abc 5', '400 10', '90 -3', '180', '270 x', '10,5 2,5']
+    legs, errors = validate_legs(split_leg_lines(lines))
+    assert legs.to_dict('records') == [{'Azimuth': '45 30 0', 'Distance': 10.0},
+                                       {'Azimuth': '10,5', 'Distance': 2.5}]
+    assert errors == [
+        "Fila 3: Formato de azimut inválido 'abc'",
+        "Fila 4: Azimut inválido 400.0°",
+        "Fila 5: La distancia no puede ser negativa",
+        "Fila 6: Distancia inválida 'None'",
+        "Fila 7: Distancia inválida 'x'",
+    ]
+
+
+def test_first_line_offsets_numbers_of_later_chunks():
+    legs, errors = validate_legs(split_leg_lines(['45 10', 'abc 5'], first_line=1001))
+    assert len(legs) == 1 and errors == ["Fila 1002: Formato de azimut inválido 'abc'"]
+
+
+def test_valid_legs_are_ready_to_extend():
+    legs, errors = validate_legs(split_leg_lines(['45 10', 'abc 1', '  90 30 0 ;2,5  ']))
+    assert errors == ["Fila 2: Formato de azimut inválido 'abc'"]
+    assert legs.index.tolist() == [0, 1]
+    assert legs['Distance'].dtype == 'float64'
+    assert legs['Azimuth'].tolist() == ['45', '90 30 0']
+
+
+def test_empty_input():
+    legs, errors = validate_legs(split_leg_lines(['', '  ']))
+    assert legs.empty and errors == []
+    legs, errors = validate_legs(pd.DataFrame(columns=['Azimuth', 'Distance']))
+    assert legs.empty and errors == []
@@ -0,0 +1,136 @@
+import pytest
+
+import azimuth_core
+from azimuth_core import ComputationCache, MemoryManager
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj monotónico manual para las caducidades"""
+    now = [1000.0]
+    monkeypatch.setattr(azimuth_core.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_hits_and_misses_are_counted():
+    cache = ComputationCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return 'valor'
+
+    assert cache.get('a') is None
+    assert cache.get_or_compute('a', compute) == 'valor'
+    assert cache.get_or_compute('a', compute) == 'valor'
+    assert cache.get('a') == 'valor'
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (2, 2, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_entry_limit_evicts_least_valuable_not_oldest():
+    cache = ComputationCache(max_entries=2)
+    cache.put('costoso', 1, nbytes=1000, cost=1.0)
+    cache.put('barato', 2, nbytes=1000, cost=0.001)
+    cache.put('nuevo', 3, nbytes=1000, cost=0.0)
+    # 'nuevo' vale menos que ninguna, pero la entrada recién guardada no se expulsa
+    assert 'costoso' in cache and 'nuevo' in cache and 'barato' not in cache
+    assert cache.evictions == 1
+
+
+def test_value_counts_uses_and_bytes():
+    cache = ComputationCache(max_entries=2)
+    cache.put('usada', 1, nbytes=1000, cost=0.1)
+    cache.put('sin_usar', 2, nbytes=1000, cost=0.1)
+    cache.get('usada')
+    cache.put('c', 3, nbytes=1000, cost=0.1)
+    assert 'usada' in cache and 'sin_usar' not in cache
+
+    cache = ComputationCache(max_entries=2)
+    cache.put('grande', 1, nbytes=10_000, cost=0.1)
+    cache.put('pequeña', 2, nbytes=100, cost=0.1)
+    cache.put('c', 3, nbytes=100, cost=0.1)
+    assert 'pequeña' in cache and 'grande' not in cache
+
+
+def test_ties_evict_least_recently_used():
+    cache = ComputationCache(max_entries=2)
+    for key in 'abc':
+        cache.put(key, key, nbytes=100, cost=0.1)
+    assert 'a' not in cache and 'b' in cache and 'c' in cache
+
+
+def test_byte_limit_is_enforced():
+    cache = ComputationCache(max_bytes=2500)
+    for key in 'abc':
+        cache.put(key, key, nbytes=1000, cost=0.1)
+    assert cache.nbytes == 2000 and len(cache) == 2 and cache.evictions == 1
+
+
+def test_value_too_large_is_not_stored_and_drops_old_value():
+    cache = ComputationCache(max_bytes=1000)
+    cache.put('a', 'viejo', nbytes=100)
+    cache.put('a', 'nuevo', nbytes=5000)
+    assert 'a' not in cache and cache.nbytes == 0
+
+
+def test_zero_entries_stores_nothing():
+    cache = ComputationCache(max_entries=0)
+    cache.put('a', 1)
+    assert cache.get_or_compute('b', lambda: 2) == 2
+    assert len(cache) == 0 and cache.nbytes == 0 and cache.evictions == 0
+
+
+def test_expired_entries_count_as_expiration_and_miss(clock):
+    cache = ComputationCache(ttl=60)
+    cache.put('a', 1, nbytes=100)
+    clock[0] += 59
+    assert cache.get('a') == 1
+    clock[0] += 1
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expirations'], stats['entries']) == (1, 1, 1, 0)
+    assert cache.nbytes == 0
+
+
+def test_no_ttl_never_expires(clock):
+    cache = ComputationCache(ttl=None)
+    cache.put('a', 1)
+    clock[0] += 1e9
+    assert cache.get('a') == 1 and cache.expirations == 0
+
+
+def test_clear_keeps_counters_until_reset():
+    cache = ComputationCache()
+    cache.put('a', 1)
+    cache.get('a')
+    cache.get('b')
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0 and (cache.hits, cache.misses) == (1, 1)
+    cache.reset_stats()
+    assert (cache.hits, cache.misses, cache.evictions, cache.expirations) == (0, 0, 0, 0)
+
+
+def test_budget_evicts_least_valuable_entry_of_any_cache():
+    manager = MemoryManager(budget_bytes=3000)
+    traverse = manager.register('traverse', ComputationCache())
+    figures = manager.register('figures', ComputationCache())
+    traverse.put('poligonal', 1, nbytes=1000, cost=1.0)
+    figures.put('figura', 2, nbytes=1000, cost=0.001)
+    traverse.put('otra', 3, nbytes=1500, cost=1.0)
+    assert manager.nbytes == 2500
+    assert 'figura' not in figures and figures.evictions == 1 and traverse.evictions == 0
+    assert manager.usage() == {'traverse': {'entries': 2, 'bytes': 2500}, 'figures': {'entries': 0, 'bytes': 0}}
+
+
+def test_trim_and_enforce():
+    manager = MemoryManager(budget_bytes=4000)
+    cache = manager.register('traverse', ComputationCache())
+    for key, cost in (('a', 0.1), ('b', 0.3), ('c', 0.2), ('d', 0.4)):
+        cache.put(key, key, nbytes=1000, cost=cost)
+    assert manager.enforce() == 0
+    assert manager.trim(0.5) == 2
+    assert [key in cache for key in 'abcd'] == [False, True, False, True]
+    assert manager.nbytes <= 2000
@@ -0,0 +1,32 @@
+import azimuth_cli
+
+
+def run(tmp_path, capsys, content, *args):
+    path = tmp_path / 'legs.csv'
+    path.write_text(content, encoding='utf-8')
+    status = azimuth_cli.main([str(path), *args])
+    return status, capsys.readouterr()
+
+
+def test_convert(tmp_path, capsys):
+    status, output = run(tmp_path, capsys, "Azimuth,Distance\n90 0 0,1\n", '--ref-x', '0', '--ref-y', '0')
+    assert status == 0
+    assert output.out.splitlines() == ['pt,x,y', '1,1.000,0.000']
+
+
+def test_missing_columns(tmp_path, capsys):
+    status, output = run(tmp_path, capsys, "Az,Distance\n10,1\n")
+    assert status == 1
+    assert output.err.startswith('Error:')
+
+
+def test_multi_missing_traverse(tmp_path, capsys):
+    status, output = run(tmp_path, capsys, "Azimuth,Distance\n10,1\n", '--multi')
+    assert status == 1
+    assert "'Traverse'" in output.err
+
+
+def test_multi_all_invalid(tmp_path, capsys):
+    status, output = run(tmp_path, capsys, "Traverse,Azimuth,Distance\nA,abc,1\nB,400,2\n", '--multi')
+    assert status == 0
+    assert output.out.splitlines() == ['traverse,pt,x,y']
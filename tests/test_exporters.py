@@ -0,0 +1,168 @@
+"""Salida de los exportadores por bloques frente a las implementaciones originales"""
+import json
+import os
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from azimuth_core import EXPORT_CHUNK_POINTS, export_to_dxf, export_to_json, export_to_kml, write_dxf, write_kml
+
+METADATA = {"created_at": "2026-01-01T00:00:00", "version": "2.0", "software": "Azimuth Converter"}
+
+
+def baseline_dxf(coordinates):
+    dxf_content = """0
+SECTION
+2
+HEADER
+9
+$ACADVER
+1
+AC1015
+0
+ENDSEC
+0
+SECTION
+2
+ENTITIES
+"""
+    for i, (x, y) in enumerate(coordinates):
+        dxf_content += f"""0
+POINT
+8
+0
+10
+{x}
+20
+{y}
+30
+0.0
+"""
+    if len(coordinates) > 1:
+        for i in range(len(coordinates)):
+            x1, y1 = coordinates[i]
+            x2, y2 = coordinates[(i + 1) % len(coordinates)]
+            dxf_content += f"""0
+LINE
+8
+1
+10
+{x1}
+20
+{y1}
+30
+0.0
+11
+{x2}
+21
+{y2}
+31
+0.0
+"""
+    dxf_content += """0
+ENDSEC
+0
+EOF
+"""
+    return dxf_content
+
+
+def baseline_json(data, metadata=None):
+    export_data = {
+        "metadata": metadata or {
+            "created_at": datetime.now().isoformat(),
+            "version": "2.0",
+            "software": "Azimuth Converter"
+        },
+        "data": data.to_dict('records') if hasattr(data, 'to_dict') else data
+    }
+    return json.dumps(export_data, indent=2, ensure_ascii=False)
+
+
+def baseline_kml(coordinates, name="Survey Points"):
+    kml_content = f"""<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2">
+<Document>
+<name>{name}</name>
+"""
+    for i, (x, y) in enumerate(coordinates):
+        kml_content += f"""<Placemark>
+<name>Point {i+1}</name>
+<Point>
+<coordinates>{x},{y},0</coordinates>
+</Point>
+</Placemark>
+"""
+    kml_content += """</Document>
+</kml>"""
+    return kml_content
+
+
+rng = np.random.default_rng(0)
+COORDINATES = {
+    'empty': [],
+    'single': [(1000.0, 2000.0)],
+    'float_tuples': [(1000.123, 999.5), (0.1 + 0.2, -3.75), (1e-7, 1e16)],
+    'int_tuples': [(3, 4), (0, -2), (10, 10)],
+    'mixed': [(3, 4.5), (np.int64(7), np.float64(2.25)), (np.float32(1.1), 8)],
+    'float_array': rng.random((EXPORT_CHUNK_POINTS + 17, 2)) * 1000,
+    'int_array': rng.integers(-500, 500, (25, 2)),
+    'float32_array': rng.random((10, 2)).astype(np.float32),
+    'exact_chunk_array': rng.random((EXPORT_CHUNK_POINTS, 2)) * 1000,
+    'tuples_over_two_chunks': [tuple(point) for point in rng.integers(0, 1000, (2 * EXPORT_CHUNK_POINTS + 1, 2))],
+    'same_tuple_twice': [(1.5, 2)] * 2,
+}
+
+
+@pytest.mark.parametrize('name', COORDINATES)
+def test_dxf_matches_baseline(name):
+    coordinates = COORDINATES[name]
+    assert export_to_dxf(coordinates) == baseline_dxf(coordinates)
+
+
+@pytest.mark.parametrize('name', COORDINATES)
+def test_kml_matches_baseline(name):
+    coordinates = COORDINATES[name]
+    assert export_to_kml(coordinates, "Parcela ñ") == baseline_kml(coordinates, "Parcela ñ")
+
+
+def test_iterator_input_matches_baseline():
+    coordinates = COORDINATES['tuples_over_two_chunks']
+    assert export_to_dxf(iter(coordinates)) == baseline_dxf(coordinates)
+    assert export_to_kml(iter(coordinates)) == baseline_kml(coordinates)
+
+
+@pytest.mark.parametrize('writer', [write_dxf, write_kml])
+def test_writers_convert_one_chunk_at_a_time(writer):
+    # Convertir las 40k filas a listas de Python ocuparía ~5.6 MB
+    coordinates = rng.random((40_000, 2)) * 1000
+    with open(os.devnull, 'w') as fh:
+        tracemalloc.start()
+        try:
+            writer(coordinates, fh)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    assert peak < 3_000_000
+
+
+JSON_DATA = {
+    'frame': pd.DataFrame({
+        'Row': np.arange(1, EXPORT_CHUNK_POINTS + 6),
+        'Azimuth_Original': [f"{k % 360} 30 0 ñ" for k in range(EXPORT_CHUNK_POINTS + 5)],
+        'X_Coordinate': rng.random(EXPORT_CHUNK_POINTS + 5) * 1000,
+    }),
+    'empty_frame': pd.DataFrame(columns=['Row', 'X_Coordinate']),
+    'dict': {'area': 12.5, 'vertices': 4, 'name': 'Parcela ñ'},
+    'list_of_scalars': [1, 2.5, 'tres'],
+    'list_of_records': [{'x': 1, 'y': 2.0}, {'x': 3, 'y': None}],
+}
+
+
+@pytest.mark.parametrize('name', JSON_DATA)
+def test_json_matches_baseline(name):
+    data = JSON_DATA[name]
+    assert export_to_json(data, METADATA) == baseline_json(data, METADATA)
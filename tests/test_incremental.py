@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import azimuth_core
+from azimuth_core import IncrementalTraverse, calculate_traverse
+
+
+def make_batch(legs=200):
+    rng = np.random.default_rng(3)
+    return pd.DataFrame({
+        'Azimuth': [f"{d} {m} {s}" for d, m, s in zip(rng.integers(0, 360, legs), rng.integers(0, 60, legs),
+                                                      rng.integers(0, 60, legs))],
+        'Distance': np.round(rng.random(legs) * 50 + 1, 3),
+    })
+
+
+@pytest.mark.parametrize('precision', ['standard', 'high'])
+def test_update_matches_full_calculation(precision):
+    batch = make_batch()
+    traverse = IncrementalTraverse.from_frame(batch, 1500.0, 2500.0)
+    traverse.results_frame(precision)
+    for index, azimuth, distance in ((150, '12 30 0', 7.5), (0, '200-0-0', 3.25), (199, '359:59:59', 0.5)):
+        traverse.update(index, azimuth, distance)
+        batch.loc[index, ['Azimuth', 'Distance']] = [azimuth, distance]
+        expected, _ = calculate_traverse(batch, 1500.0, 2500.0, precision=precision)
+        pd.testing.assert_frame_equal(traverse.results_frame(precision), expected,
+                                      check_dtype=False, atol=1e-6, rtol=0)
+
+
+def test_update_only_touches_the_suffix(monkeypatch):
+    traverse = IncrementalTraverse.from_frame(make_batch(1000), 1000.0, 1000.0)
+    frame = traverse.results_frame()
+
+    sizes = []
+    original_cumsum = np.cumsum
+
+    def counting_cumsum(values, *args, **kwargs):
+        sizes.append(len(values))
+        return original_cumsum(values, *args, **kwargs)
+
+    monkeypatch.setattr(azimuth_core.np, 'cumsum', counting_cumsum)
+    traverse.update(995, '45 0 0', 2.0)
+    # Se corrige la misma tabla y solo se acumulan los 5 últimos tramos
+    assert traverse.results_frame() is frame
+    assert sizes and max(sizes) == 5
+
+
+def test_update_of_invalid_leg_adds_its_row():
+    batch = make_batch(20)
+    batch.loc[5, 'Azimuth'] = 'abc'
+    traverse = IncrementalTraverse.from_frame(batch, 0.0, 0.0)
+    assert len(traverse.results_frame()) == 19
+    traverse.update(5, '90 0 0', 1.0)
+    batch.loc[5, ['Azimuth', 'Distance']] = ['90 0 0', 1.0]
+    expected, _ = calculate_traverse(batch, 0.0, 0.0)
+    pd.testing.assert_frame_equal(traverse.results_frame(), expected, check_dtype=False)
+
+
+def test_insert_and_delete_match_full_calculation():
+    batch = make_batch(30)
+    batch.loc[7, 'Azimuth'] = 'abc'
+    traverse = IncrementalTraverse.from_frame(batch, 100.0, 200.0)
+    traverse.results_frame()
+    for index in (0, 12, 31):
+        traverse.insert(index, '123 45 6', 4.5)
+        batch = pd.concat([batch.iloc[:index], pd.DataFrame({'Azimuth': ['123 45 6'], 'Distance': [4.5]}),
+                           batch.iloc[index:]], ignore_index=True)
+    for index in (32, 0, 7):
+        traverse.delete(index)
+        batch = batch.drop(index).reset_index(drop=True)
+    expected, _ = calculate_traverse(batch, 100.0, 200.0)
+    pd.testing.assert_frame_equal(traverse.results_frame(), expected, check_dtype=False, atol=1e-6, rtol=0)
+
+
+@pytest.mark.parametrize('call', [
+    lambda t: t.update(-1, '45 0 0', 1.0),
+    lambda t: t.update(10, '45 0 0', 1.0),
+    lambda t: t.insert(-1, '45 0 0', 1.0),
+    lambda t: t.insert(11, '45 0 0', 1.0),
+    lambda t: t.delete(-1),
+    lambda t: t.delete(10),
+    lambda t: t.vertex(-1),
+])
+def test_out_of_range_index_raises(call):
+    traverse = IncrementalTraverse.from_frame(make_batch(10))
+    frame = traverse.results_frame().copy()
+    with pytest.raises(IndexError):
+        call(traverse)
+    pd.testing.assert_frame_equal(traverse.results_frame(), frame)
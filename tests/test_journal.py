@@ -0,0 +1,140 @@
+import json
+
+import pandas as pd
+import pytest
+
+from azimuth_core import LEG_COLUMNS, BatchJournal, PointStore
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return tmp_path / 'prev_batch.json', tmp_path / 'prev_batch.journal'
+
+
+def apply(journal, store, op, index=None, **values):
+    """Aplicar un cambio al almacén y registrarlo, como save_previous_batch_data"""
+    if op == 'append':
+        store.append(**values)
+    elif op == 'extend':
+        store.extend(values)
+    elif op == 'set_row':
+        store.set_row(index, **values)
+    elif op == 'insert':
+        store.insert(index, **values)
+    else:
+        store.delete(index)
+    journal.record(store, op, index, **values)
+
+
+def edit_all_operations(journal, store):
+    apply(journal, store, 'append', Azimuth='10 0 0', Distance=1.0)
+    apply(journal, store, 'extend', Azimuth=pd.Series(['20 0 0', '30-0-0', 'abc']),
+          Distance=pd.Series([2.0, 3.5, 4.0]))
+    apply(journal, store, 'set_row', 1, Azimuth='25 30 0', Distance=2.25)
+    apply(journal, store, 'insert', 0, Azimuth='5 0 0', Distance=0.5)
+    apply(journal, store, 'delete', 3)
+
+
+def journal_lines(path):
+    return path.read_text(encoding='utf-8').splitlines()
+
+
+def test_replays_every_operation(paths):
+    snapshot, journal_path = paths
+    journal = BatchJournal(snapshot, compact_every=100)
+    store = PointStore(LEG_COLUMNS)
+    journal.snapshot(store.to_frame(), store)
+    edit_all_operations(journal, store)
+    # Todo quedó en el diario, no en instantáneas
+    assert [json.loads(line)['op'] for line in journal_lines(journal_path)] == list(BatchJournal.OPERATIONS)
+    assert journal.pending == 5
+
+    pd.testing.assert_frame_equal(BatchJournal(snapshot).load(), store.to_frame())
+
+
+def test_torn_last_line_is_dropped_and_truncated(paths):
+    snapshot, journal_path = paths
+    journal = BatchJournal(snapshot, compact_every=100)
+    store = PointStore(LEG_COLUMNS)
+    journal.snapshot(store.to_frame(), store)
+    edit_all_operations(journal, store)
+    complete = journal_path.read_bytes()
+    with open(journal_path, 'ab') as f:
+        f.write(b'{"seq": 99, "op": "append", "values": {"Azimuth": "9')
+
+    reopened = BatchJournal(snapshot)
+    assert reopened.pending == 5
+    assert journal_path.read_bytes() == complete
+    pd.testing.assert_frame_equal(reopened.load(), store.to_frame())
+
+
+def test_crash_between_snapshot_and_truncate_does_not_replay_twice(paths):
+    snapshot, journal_path = paths
+    journal = BatchJournal(snapshot, compact_every=100)
+    store = PointStore(LEG_COLUMNS)
+    journal.snapshot(store.to_frame(), store)
+    edit_all_operations(journal, store)
+    stale = journal_path.read_bytes()
+    journal.snapshot(store.to_frame(), store)
+    # La instantánea ya incluye los cambios pero el diario no llegó a vaciarse
+    journal_path.write_bytes(stale)
+
+    reopened = BatchJournal(snapshot)
+    assert reopened.pending == 0
+    pd.testing.assert_frame_equal(reopened.load(), store.to_frame())
+
+    # Las líneas nuevas siguen la secuencia de la instantánea
+    store = PointStore.from_frame(reopened.load(), LEG_COLUMNS)
+    reopened.snapshot(store.to_frame(), store)
+    apply(reopened, store, 'append', Azimuth='45 0 0', Distance=9.0)
+    assert json.loads(journal_lines(journal_path)[-1])['seq'] == 6
+    pd.testing.assert_frame_equal(BatchJournal(snapshot).load(), store.to_frame())
+
+
+def test_other_store_or_skipped_change_writes_a_snapshot(paths):
+    snapshot, journal_path = paths
+    journal = BatchJournal(snapshot, compact_every=100)
+    store = PointStore(LEG_COLUMNS)
+    apply(journal, store, 'append', Azimuth='10 0 0', Distance=1.0)
+    # Primer registro: no hay estado guardado del que partir
+    assert journal.pending == 0 and journal_lines(journal_path) == []
+    apply(journal, store, 'append', Azimuth='20 0 0', Distance=2.0)
+    assert journal.pending == 1
+
+    # Un cambio que no se registró
+    store.append(Azimuth='30 0 0', Distance=3.0)
+    apply(journal, store, 'append', Azimuth='40 0 0', Distance=4.0)
+    assert journal.pending == 0
+
+    # Otro almacén (otra sesión o un reemplazo)
+    other = PointStore.from_frame(store.to_frame().iloc[:1], LEG_COLUMNS)
+    apply(journal, other, 'set_row', 0, Azimuth='15 0 0', Distance=1.5)
+    assert journal.pending == 0
+    pd.testing.assert_frame_equal(BatchJournal(snapshot).load(), other.to_frame())
+
+
+def test_compacts_every_n_changes(paths):
+    snapshot, journal_path = paths
+    journal = BatchJournal(snapshot, compact_every=3)
+    store = PointStore(LEG_COLUMNS)
+    journal.snapshot(store.to_frame(), store)
+    for k in range(7):
+        apply(journal, store, 'append', Azimuth=f'{k} 0 0', Distance=float(k))
+    assert journal.pending == 1 and len(journal_lines(journal_path)) == 1
+    saved = json.loads(snapshot.read_text(encoding='utf-8'))
+    assert saved['seq'] == 6 and len(saved['data']) == 6
+    pd.testing.assert_frame_equal(BatchJournal(snapshot).load(), store.to_frame())
+
+
+def test_loads_old_snapshot_without_sequence(paths):
+    snapshot, journal_path = paths
+    snapshot.write_text(json.dumps({'app': 'azimuth_converter', 'version': '1.0',
+                                    'data': [{'Azimuth': '10 0 0', 'Distance': 1.0}]}), encoding='utf-8')
+    journal = BatchJournal(snapshot)
+    assert journal.load().to_dict('records') == [{'Azimuth': '10 0 0', 'Distance': 1.0}]
+    assert not journal_path.exists()
+
+
+def test_nothing_saved_loads_none(paths):
+    snapshot, _ = paths
+    assert BatchJournal(snapshot).load() is None
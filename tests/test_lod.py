@@ -0,0 +1,118 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from azimuth_core import decimate_polyline, snap_window, thin_points
+
+
+def random_walk(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.cumsum(rng.normal(size=count)), np.cumsum(rng.normal(size=count))
+
+
+def test_decimate_short_polyline_is_unchanged():
+    x, y = random_walk(50)
+    dx, dy, index = decimate_polyline(x, y, 100)
+    assert index.tolist() == list(range(50))
+    assert dx.tolist() == x.tolist() and dy.tolist() == y.tolist()
+
+
+def test_decimate_keeps_ends_and_extremes():
+    x, y = random_walk(100_000)
+    dx, dy, index = decimate_polyline(x, y, 2000)
+    assert len(index) <= 2000 and np.all(np.diff(index) > 0)
+    assert index[0] == 0 and index[-1] == len(x) - 1
+    # La envolvente de la forma no cambia
+    assert (dx.min(), dx.max(), dy.min(), dy.max()) == (x.min(), x.max(), y.min(), y.max())
+    assert not np.isnan(dx).any()
+
+
+def test_decimate_window_keeps_crossing_segments_and_breaks_runs():
+    x = np.arange(20, dtype=np.float64)
+    y = np.zeros(20)
+    window = (4.5, -1.0, 8.5, 1.0)
+    x[12:15] = [6.0, 7.0, 6.5]  # la polilínea vuelve a entrar en la ventana
+    dx, dy, index = decimate_polyline(x, y, 100, window)
+    inside = np.flatnonzero((x >= 4.5) & (x <= 8.5))
+    neighbours = np.unique(np.clip(np.concatenate((inside - 1, inside, inside + 1)), 0, 19))
+    assert index.tolist() == neighbours.tolist()
+    # Un NaN entre tramos no consecutivos para que plotly corte la línea
+    assert np.isnan(dx).sum() == np.count_nonzero(np.diff(index) != 1)
+    assert dx[~np.isnan(dx)].tolist() == x[index].tolist()
+
+
+def test_decimate_empty_window():
+    x, y = random_walk(100)
+    dx, dy, index = decimate_polyline(x, y, 10, window=(1e6, 1e6, 2e6, 2e6))
+    assert len(dx) == len(dy) == len(index) == 0
+
+
+def test_thin_few_points_are_kept():
+    x, y = random_walk(30)
+    index, counts = thin_points(x, y, 100)
+    assert index.tolist() == list(range(30)) and counts.tolist() == [1] * 30
+
+
+def test_thin_keeps_one_point_per_cell():
+    rng = np.random.default_rng(1)
+    x, y = rng.uniform(0, 100, 50_000), rng.uniform(0, 50, 50_000)
+    index, counts = thin_points(x, y, 400)
+    assert len(index) <= 400 and counts.sum() == len(x)
+    assert np.all(np.diff(index) > 0)
+    # Rejilla de 20 x 20 celdas cuadradas desde la esquina de los datos: ningún
+    # representante comparte celda
+    span = max(np.ptp(x), np.ptp(y))
+    ci = np.minimum(((x[index] - x.min()) / span * 20).astype(int), 19)
+    cj = np.minimum(((y[index] - y.min()) / span * 20).astype(int), 19)
+    assert len(np.unique(ci * 20 + cj)) == len(index)
+
+
+def test_thin_window_only_counts_points_inside():
+    rng = np.random.default_rng(2)
+    x, y = rng.uniform(0, 100, 20_000), rng.uniform(0, 100, 20_000)
+    window = (10.0, 20.0, 40.0, 30.0)
+    index, counts = thin_points(x, y, 100, window)
+    inside = (x >= 10) & (x <= 40) & (y >= 20) & (y <= 30)
+    assert inside[index].all() and counts.sum() == inside.sum()
+
+
+@pytest.mark.parametrize('max_points', [10, 10_000])
+def test_thin_skips_non_finite_points(max_points):
+    rng = np.random.default_rng(3)
+    x, y = rng.uniform(0, 100, 5000), rng.uniform(0, 100, 5000)
+    x[::100] = np.nan
+    y[7] = np.inf
+    x[8] = -np.inf
+    finite = np.isfinite(x) & np.isfinite(y)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        index, counts = thin_points(x, y, max_points)
+    assert finite[index].all() and counts.sum() == finite.sum()
+
+
+def test_snap_window_covers_request_with_tiles():
+    extent = (0.0, 0.0, 1000.0, 500.0)
+    window = (123.0, 45.0, 180.0, 70.0)
+    level, snapped = snap_window(window, extent)
+    tile = 1000.0 / 2 ** level
+    assert tile >= 57.0 > tile / 2
+    assert snapped[0] <= window[0] and snapped[1] <= window[1]
+    assert snapped[2] >= window[2] and snapped[3] >= window[3]
+    # Bordes en múltiplos de la tesela desde la esquina de la extensión (0, 0)
+    assert all(value / tile == pytest.approx(round(value / tile)) for value in snapped)
+
+
+def test_snap_window_shares_tiles_between_nearby_windows():
+    extent = (0.0, 0.0, 1000.0, 1000.0)
+    level, snapped = snap_window((130.0, 130.0, 180.0, 180.0), extent)
+    assert snap_window((135.0, 132.0, 182.0, 179.0), extent) == (level, snapped)
+    # Ajustar una ventana ya ajustada no la cambia
+    assert snap_window(snapped, extent)[1] == snapped
+
+
+def test_snap_window_level_limits():
+    extent = (0.0, 0.0, 100.0, 100.0)
+    assert snap_window((-50.0, -50.0, 500.0, 500.0), extent)[0] == 0
+    level, snapped = snap_window((10.0, 10.0, 10.0, 10.0), extent, max_level=8)
+    assert level == 8 and snapped[2] > snapped[0]
@@ -0,0 +1,70 @@
+import math
+
+import numpy as np
+import pytest
+
+import azimuth_core
+from azimuth_core import parse_dms_column, parse_dms_to_decimal
+
+VALID = {
+    '10': 10.0,
+    '-10': -10.0,
+    '+5': 5.0,
+    '.5': 0.5,
+    '5.': 5.0,
+    '1e3': 1000.0,
+    '1,5': 1.5,
+    ' 45.25 ': 45.25,
+    '10 30 0': 10.5,
+    '26-56-7.00': 26 + 56 / 60 + 7 / 3600,
+    '180:30:15.5': 180 + 30 / 60 + 15.5 / 3600,
+    '270_45_30': 270 + 45 / 60 + 30 / 3600,
+    '45°30\'15"': 45 + 30 / 60 + 15 / 3600,
+    'N 45d30m15s E': 45 + 30 / 60 + 15 / 3600,
+    '10\xa030\xa00': 10.5,  # espacios de no separación (copiados de una hoja de cálculo)
+}
+
+# float() los aceptaba y pd.to_numeric no (o al revés): ahora ambos los rechazan
+INVALID = ['1_0', 'nan', 'NaN', 'inf', '-inf', 'Infinity', '٣٠', '１２', '٣٠ ١٥ ٠',
+           '', '  ', 'abc', '0x10', '10 30', '1 2 3 4', '²']
+
+
+@pytest.mark.parametrize('text', VALID)
+def test_valid_azimuths_agree(text):
+    decimals, invalid = parse_dms_column([text])
+    assert not invalid[0]
+    assert decimals[0] == parse_dms_to_decimal(text)
+    assert math.isclose(decimals[0], VALID[text])
+
+
+@pytest.mark.parametrize('text', INVALID)
+def test_invalid_azimuths_agree(text):
+    decimals, invalid = parse_dms_column([text])
+    assert invalid[0] and np.isnan(decimals[0])
+    assert parse_dms_to_decimal(text) is None
+
+
+@pytest.fixture(params=[True, False], ids=['pyarrow', 'python'])
+def column_path(request, monkeypatch):
+    """Ejecuta la prueba con la pasada vectorizada de pyarrow y sin ella"""
+    if request.param and not azimuth_core.PYARROW_AVAILABLE:
+        pytest.skip('pyarrow no está instalado')
+    monkeypatch.setattr(azimuth_core, 'PYARROW_AVAILABLE', request.param)
+    monkeypatch.setattr(azimuth_core, 'ARROW_MIN_AZIMUTHS', 0)
+
+
+def test_column_matches_scalar_on_mixed_values(column_path):
+    # 1, 1.0 y True (o 0.0, -0.0 y False) son iguales en Python pero no como texto
+    values = (list(VALID) + INVALID + [1.5, 0, None, float('nan'), 1, 1.0, True, -0.0, False, '-0', '\ud800']) * 3
+    decimals, invalid = parse_dms_column(values)
+    scalars = [parse_dms_to_decimal(value) for value in values]
+    assert invalid.tolist() == [scalar is None for scalar in scalars]
+    valid = [scalar for scalar in scalars if scalar is not None]
+    assert decimals[~invalid].tolist() == valid
+    assert np.signbit(decimals[~invalid]).tolist() == np.signbit(valid).tolist()
+
+
+def test_column_parses_repeated_azimuths(column_path):
+    decimals, invalid = parse_dms_column(['10 30 0', 'x', '10 30 0', '10,5', 'x'] * 1000)
+    assert invalid.tolist() == [False, True, False, False, True] * 1000
+    assert (decimals[~invalid] == 10.5).all()
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from azimuth_core import calculate_traverse, open_project, save_project
+
+
+def make_project(tmp_path, legs=50):
+    batch = pd.DataFrame({
+        'Azimuth': [f"{k * 7 % 360} 30 0" for k in range(legs)],
+        'Distance': np.arange(1, legs + 1, dtype=np.float64),
+    })
+    results, _ = calculate_traverse(batch, 1000.0, 1000.0)
+    path = tmp_path / 'proyecto.azp'
+    save_project(path, batch, results, {'ref_x': 1000.0, 'ref_y': 1000.0})
+    return path, batch, results
+
+
+def test_round_trip(tmp_path):
+    path, batch, results = make_project(tmp_path)
+    with open_project(path) as project:
+        pd.testing.assert_frame_equal(project.observations(), batch, check_dtype=False)
+        np.testing.assert_allclose(project.results()['X_Coordinate'], results['X_Coordinate'])
+
+
+def test_column_survives_close(tmp_path):
+    path, batch, _ = make_project(tmp_path)
+    project = open_project(path)
+    distances = project.column('obs.distance')
+    project.close()
+    # La vista mantiene vivo el mapa: leerla después de close() no debe fallar
+    assert distances.sum() == batch['Distance'].sum()
+    np.testing.assert_array_equal(distances, batch['Distance'].to_numpy())
+
+
+def test_open_from_bytes(tmp_path):
+    path, batch, results = make_project(tmp_path)
+    with open_project(path.read_bytes()) as project:
+        assert len(project) == len(batch)
+        pd.testing.assert_frame_equal(project.observations(), batch, check_dtype=False)
+        np.testing.assert_allclose(project.results()['Y_Coordinate'], results['Y_Coordinate'])
+
+
+def test_invalid_file(tmp_path):
+    path = tmp_path / 'vacio.azp'
+    path.write_bytes(b'')
+    with pytest.raises(ValueError):
+        open_project(path)
+    with pytest.raises(ValueError):
+        open_project(b'x' * 40)
+
+
+def test_results_of_other_batch_are_not_saved(tmp_path):
+    # Resultados de 4 tramos guardados con un lote de 1 tramo (tras limpiar y agregar)
+    _, _, results = make_project(tmp_path, legs=4)
+    batch = pd.DataFrame({'Azimuth': ['45 0 0'], 'Distance': [2.0]})
+    path = tmp_path / 'otro.azp'
+    save_project(path, batch, results)
+    with open_project(path) as project:
+        assert project.result_count == 0
+        np.testing.assert_array_equal(project.column('obs.azimuth_decimal'), [45.0])
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from azimuth_core import SpatialIndex
+
+
+def random_points(count, seed=0):
+    """Puntos uniformes y un grupo denso, para celdas vacías y celdas llenas"""
+    rng = np.random.default_rng(seed)
+    uniform = rng.uniform(-500.0, 1500.0, (count - count // 4, 2))
+    cluster = rng.normal(200.0, 3.0, (count // 4, 2))
+    points = np.concatenate((uniform, cluster))
+    rng.shuffle(points)
+    return points[:, 0], points[:, 1]
+
+
+def queries(seed=1, count=100):
+    rng = np.random.default_rng(seed)
+    # Dentro de la nube y lejos de ella (barrido vectorizado)
+    return np.concatenate((rng.uniform(-600.0, 1600.0, (count, 2)), rng.uniform(-1e5, 1e5, (20, 2))))
+
+
+def brute_distances(x, y, qx, qy):
+    return np.hypot(x - qx, y - qy)
+
+
+@pytest.fixture(params=[None, 25.0], ids=['auto', 'fixed'])
+def cell_size(request):
+    return request.param
+
+
+def assert_matches_brute_force(index, x, y):
+    for qx, qy in queries():
+        distances = brute_distances(x, y, qx, qy)
+        found, distance = index.nearest(qx, qy)
+        assert distance == pytest.approx(np.nanmin(distances), abs=1e-9)
+        assert distances[found] == pytest.approx(distance, abs=1e-9)
+
+        radius = 40.0
+        inside = np.flatnonzero(distances <= radius)
+        result = index.within_radius(qx, qy, radius)
+        assert sorted(result.tolist()) == inside.tolist()
+        assert np.all(np.diff(distances[result]) >= 0)
+
+        box = (qx - 30.0, qy - 20.0, qx + 50.0, qy + 10.0)
+        expected = np.flatnonzero((x >= box[0]) & (x <= box[2]) & (y >= box[1]) & (y <= box[3]))
+        assert index.within_bbox(*box).tolist() == expected.tolist()
+
+
+def test_queries_match_brute_force(cell_size):
+    x, y = random_points(3000)
+    assert_matches_brute_force(SpatialIndex(x, y, cell_size=cell_size), x, y)
+
+
+def test_incremental_extend_matches_brute_force(cell_size):
+    x, y = random_points(3000, seed=2)
+    index = SpatialIndex(cell_size=cell_size)
+    sizes = set()
+    start = 0
+    for stop in (1, 2, 10, 70, 71, 400, 1500, 3000):
+        if stop - start == 1:
+            assert index.add(x[start], y[start]) == start
+        else:
+            index.extend(x[start:stop], y[start:stop])
+        start = stop
+        sizes.add(index.cell_size)
+        assert len(index) == stop
+        assert_matches_brute_force(index, x[:stop], y[:stop])
+    # Con tamaño automático la rejilla se reconstruyó al crecer
+    assert len(sizes) > 1 if cell_size is None else sizes == {cell_size}
+
+
+def test_non_finite_points_are_skipped():
+    x, y = random_points(500, seed=3)
+    x[::50] = np.nan
+    y[7] = np.inf
+    index = SpatialIndex(x, y)
+    finite = np.isfinite(x) & np.isfinite(y)
+    for qx, qy in queries(count=50):
+        distances = np.where(finite, brute_distances(x, y, qx, qy), np.nan)
+        found, distance = index.nearest(qx, qy)
+        assert finite[found] and distance == pytest.approx(np.nanmin(distances), abs=1e-9)
+        assert np.isfinite(x[index.within_radius(qx, qy, 60.0)]).all()
+
+
+def test_find_duplicate_uses_tolerance(cell_size):
+    x, y = random_points(1000, seed=4)
+    index = SpatialIndex(x, y, cell_size=cell_size)
+    for k in (0, 123, 999):
+        found = index.find_duplicate(x[k] + 0.003, y[k] - 0.004, tolerance=0.01)
+        assert found is not None and np.hypot(x[found] - x[k], y[found] - y[k]) <= 0.02
+    distances = brute_distances(x, y, 5000.0, 5000.0)
+    assert index.find_duplicate(5000.0, 5000.0, tolerance=np.min(distances) - 1e-6) is None
+    assert index.find_duplicate(5000.0, 5000.0, tolerance=np.min(distances) + 1e-6) == int(np.argmin(distances))
+
+
+def test_empty_index():
+    index = SpatialIndex()
+    assert index.nearest(0.0, 0.0) is None
+    assert index.find_duplicate(0.0, 0.0) is None
+    assert index.within_radius(0.0, 0.0, 10.0).tolist() == []
+    assert index.within_bbox(-1.0, -1.0, 1.0, 1.0).tolist() == []
@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from azimuth_core import (
+    MULTI_RESULT_COLUMNS, TRAVERSE_CHUNK_SIZE, AsyncProcessor, adjust_traverse, calculate_traverse,
+    calculate_traverses, polygon_geometry, traverse_coordinates, traverse_misclosure,
+)
+
+
+def test_calculate_traverses():
+    batch = pd.DataFrame({
+        'Traverse': ['A', 'A', 'B', 'A'],
+        'Azimuth': ['0 0 0', '90-0-0', '180:0:0', '180 0 0'],
+        'Distance': [1.0, 1.0, 2.0, 1.0],
+    })
+    results, summary, errors = calculate_traverses(batch, 10.0, 20.0)
+    assert errors == []
+    assert results['Traverse'].tolist() == ['A', 'A', 'A', 'B']
+    np.testing.assert_allclose(results['X_Coordinate'], [10.0, 11.0, 11.0, 10.0])
+    np.testing.assert_allclose(results['Y_Coordinate'], [21.0, 21.0, 20.0, 18.0])
+    assert summary['Vertices'].tolist() == [3, 1]
+
+
+def test_calculate_traverses_all_invalid():
+    batch = pd.DataFrame({
+        'Traverse': ['A', 'A', 'B'],
+        'Azimuth': ['abc', '400', 'x y z'],
+        'Distance': [1.0, 1.0, 1.0],
+    })
+    results, summary, errors = calculate_traverses(batch, 0.0, 0.0)
+    assert results.empty
+    assert list(results.columns) == MULTI_RESULT_COLUMNS
+    assert summary['Vertices'].tolist() == [0, 0]
+    assert len(errors) == 3
+
+
+def test_processor_falls_back_to_sync(monkeypatch):
+    rng = np.random.default_rng(0)
+    azimuths = rng.random(3 * TRAVERSE_CHUNK_SIZE) * 360
+    distances = rng.random(3 * TRAVERSE_CHUNK_SIZE) * 50
+    expected = traverse_coordinates(azimuths, distances, 1000.0, 1000.0)
+
+    # Por debajo del umbral, o con un solo núcleo, no se crea el pool
+    below = AsyncProcessor(4, min_legs=len(azimuths) + 1)
+    monkeypatch.setattr(os, 'cpu_count', lambda: 1)
+    single_cpu = AsyncProcessor(4, min_legs=0)
+    for processor in (below, single_cpu):
+        with processor:
+            result = traverse_coordinates(azimuths, distances, 1000.0, 1000.0, processor)
+            assert processor._executor is None
+        np.testing.assert_array_equal(result, expected)
+
+
+def test_processor_pool_matches_sync(monkeypatch):
+    rng = np.random.default_rng(1)
+    azimuths = rng.random(3 * TRAVERSE_CHUNK_SIZE) * 360
+    distances = rng.random(3 * TRAVERSE_CHUNK_SIZE) * 50
+    monkeypatch.setattr(os, 'cpu_count', lambda: 2)
+    with AsyncProcessor(2, min_legs=0) as processor:
+        result = traverse_coordinates(azimuths, distances, 1000.0, 1000.0, processor)
+        assert processor._executor is not None
+    np.testing.assert_array_equal(result, traverse_coordinates(azimuths, distances, 1000.0, 1000.0))
+
+
+def test_misclosure_uses_unrounded_vertices():
+    # 0.4 µm de error: desaparece al redondear a 6 decimales, no en el ajuste
+    batch = pd.DataFrame({'Azimuth': ['0 0 0', '180 0 0'], 'Distance': [1.0000004, 1.0]})
+    results, _ = calculate_traverse(batch, 0.0, 0.0)
+    x = np.concatenate(([0.0], results['X_Coordinate']))
+    y = np.concatenate(([0.0], results['Y_Coordinate']))
+    assert polygon_geometry(x, y)['closure'] == (0.0, 0.0)
+
+    for precision in ('standard', 'high'):
+        misclosure_x, misclosure_y = traverse_misclosure(results, 0.0, 0.0, precision=precision)
+        _, summary = adjust_traverse(results, 0.0, 0.0, precision=precision)
+        assert (misclosure_x, misclosure_y) == (summary['misclosure_x'], summary['misclosure_y'])
+        np.testing.assert_allclose(misclosure_y, 4e-7, rtol=1e-6)